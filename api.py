@@ -1,28 +1,58 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from fastapi.responses import JSONResponse
+from typing import Any, Callable, Dict, List, Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from sse_starlette.sse import EventSourceResponse
-from ifood_scraper import scrape_ifood_mercados
-from progresso import progresso_lock, progresso_por_task
+from ifood_scraper import (
+    carregar_config, executar_scraping_supervisionado, pasta_da_tarefa, remover_saidas_antigas, resultado_do_cache, separar_tipos_busca
+)
+from aquecimento import AquecedorCache, FrequenciaConsultas
+from cache_itens import cache_itens
+from localizacao import Localizacao, resolver_localizacao
+from supervisor import rss_processo
+from concurrent.futures import Future, ThreadPoolExecutor
+from fila import STATUS_CONCLUIDO, STATUS_ERRO, criar_fila
+from limitador import limitador
+from logs import configurar_logging
+from metricas import Histograma, Medidor, registro as registro_metricas
+from perfilador import EXTENSOES as MODOS_PERFIL, localizar_perfil
+import progresso
+from progresso import (
+    STATUS_CONCLUIDO as TAREFA_CONCLUIDA, STATUS_ERRO as TAREFA_COM_ERRO, STATUS_EXECUTANDO as TAREFA_EXECUTANDO,
+    atualizar_progresso, definir_status, obter_eventos, obter_progresso, obter_resultado, publicar_evento
+)
 import asyncio
+import shutil
+import tempfile
 import os
 import json
 import logging
+import threading
 import uuid
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()]
-)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="iFood Scraping API")
 
+@app.on_event("startup")
+async def iniciar_logging() -> None:
+    # Seção `logs` do config.yaml: console e arquivo rotativo escritos por uma thread de fundo. Fica no
+    # startup, e não no import, para quem só importa o módulo (ex.: testes) não abrir o arquivo de log
+    config = await asyncio.to_thread(carregar_config)
+    configurar_logging(config.get("logs"))
+
+@app.on_event("startup")
+async def verificar_backends() -> None:
+    # Com a fila, progresso e eventos parciais (mercado, estimativa) são gravados pelo worker; num
+    # armazenamento em memória eles ficam no processo do worker e o SSE da API nunca os recebe
+    if fila is not None and not progresso.armazenamento.compartilhado:
+        raise RuntimeError(
+            "IFOOD_FILA exige um armazenamento de progresso compartilhado com os workers "
+            "(ex.: IFOOD_PROGRESSO=sqlite:///dados_ifood/progresso.db)."
+        )
+
 # Configuração de CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,7 +66,8 @@ app.add_middleware(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "dados_ifood")
 IMAGENS_DIR = os.path.join(BASE_DIR, "imagens_ifood")
-OUTPUT_FILE = os.path.join(DATA_DIR, "ifood_data.json")
+# Cada tarefa grava em TAREFAS_DIR/<task_id>.json e IMAGENS_DIR/<task_id>/, pois várias rodam ao mesmo tempo
+TAREFAS_DIR = os.path.join(DATA_DIR, "tarefas")
 
 # Criar os diretórios se não existirem
 if not os.path.exists(DATA_DIR):
@@ -44,6 +75,16 @@ if not os.path.exists(DATA_DIR):
 if not os.path.exists(IMAGENS_DIR):
     os.makedirs(IMAGENS_DIR)
 
+def saidas_da_tarefa(task_id: str) -> tuple:
+    """Arquivo de resultado e pasta de imagens próprios do task_id."""
+    return pasta_da_tarefa(TAREFAS_DIR, task_id) + ".json", pasta_da_tarefa(IMAGENS_DIR, task_id)
+
+def remover_saidas_expiradas(config: Dict[str, Any]) -> None:
+    """Apaga resultados e imagens de tarefas mais antigos que `saidas.retencao_horas`."""
+    retencao_horas = float(config.get("saidas", {}).get("retencao_horas", 24))
+    remover_saidas_antigas(TAREFAS_DIR, retencao_horas)
+    remover_saidas_antigas(IMAGENS_DIR, retencao_horas)
+
 # Montar o diretório de imagens estáticas
 app.mount("/imagens_ifood", StaticFiles(directory=IMAGENS_DIR), name="imagens_ifood")
 # Modelos para os itens de entrada
@@ -52,6 +93,13 @@ class ProdutoItem(BaseModel):
     quantidade: int
 
 # Modelos para a resposta
+class MedidaProduto(BaseModel):
+    quantidade: float
+    unidade: str
+    embalagens: int = 1
+    preco_por_unidade: Optional[float] = None
+    unidade_referencia: str
+
 class ProdutoDetalhe(BaseModel):
     id: int
     nome: str
@@ -59,6 +107,8 @@ class ProdutoDetalhe(BaseModel):
     detalhes: str
     imagem_url: Optional[str] = None
     imagem_local: Optional[str] = None
+    medida: Optional[MedidaProduto] = None
+    relevancia: Optional[float] = None
 
 class ProdutoEscolhido(BaseModel):
     item: str
@@ -73,6 +123,10 @@ class Combinacao(BaseModel):
     custo: float
     diferenca: float
 
+class FalhaMercado(BaseModel):
+    motivo: str
+    itens_ignorados: List[str]
+
 class Mercado(BaseModel):
     id: int
     nome: str
@@ -87,64 +141,336 @@ class Mercado(BaseModel):
     custo_total: str
     produtos_escolhidos: List[ProdutoEscolhido]
     combinacoes: List[Combinacao]
+    itens_faltantes: List[str] = []
+    falha: Optional[FalhaMercado] = None
+    vertical: Optional[str] = None
 
 class MelhorCompra(BaseModel):
     mercado: str
     custo_total: str
     produtos_escolhidos: List[ProdutoEscolhido]
+    vertical: Optional[str] = None
+
+class MercadoDivisao(BaseModel):
+    mercado: str
+    custo_entrega: str
+    subtotal: str
+    produtos_escolhidos: List[ProdutoEscolhido]
+
+class MelhorCompraMulti(BaseModel):
+    mercados: List[MercadoDivisao]
+    custo_total: str
+    metodo: str
+    otimo: bool
+    itens_faltantes: List[str] = []
+
+class PosicaoRanking(BaseModel):
+    posicao: int
+    vertical: Optional[str] = None
+    mercado: str
+    custo_total: str
+    itens_faltantes: List[str] = []
+
+class SecaoVertical(BaseModel):
+    nome: str
+    mercados: int
+    melhor_compra: Optional[MelhorCompra] = None
+    melhor_compra_multi: Optional[MelhorCompraMulti] = None
+    tempos: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
 
 class ScrapingResponse(BaseModel):
     status: str
-    melhor_compra: MelhorCompra
-    mercados: List[Mercado]
-    output_file: str
+    melhor_compra: Optional[MelhorCompra] = None
+    melhor_compra_multi: Optional[MelhorCompraMulti] = None
+    mercados: List[Mercado] = []
+    output_file: Optional[str] = None
+    tempos: Optional[Dict[str, Any]] = None
+    comandos_webdriver: Optional[Dict[str, Any]] = None
+    localizacao: Optional[Dict[str, Any]] = None
+    ranking: Optional[List[PosicaoRanking]] = None
+    verticais: Optional[Dict[str, SecaoVertical]] = None
+    cache: Optional[Dict[str, Any]] = None
     task_id: str
 
+class ResultadoLocalizacao(BaseModel):
+    localizacao: Dict[str, Any]
+    melhor_compra: Optional[MelhorCompra] = None
+    melhor_compra_multi: Optional[MelhorCompraMulti] = None
+    mercados: List[Mercado] = []
+    tempos: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+
+class ScrapingLoteResponse(BaseModel):
+    status: str
+    localizacoes: Dict[str, ResultadoLocalizacao] = {}
+    output_file: Optional[str] = None
+    task_id: str
+
+# Com IFOOD_FILA definido (ex.: sqlite:///dados_ifood/fila.db), o scraping é executado pelos workers
+# (`python ifood_scraper.py --worker`) e a API só enfileira e acompanha as tarefas. Exige IFOOD_PROGRESSO
+# compartilhado (verificado no startup).
+fila = criar_fila(os.environ["IFOOD_FILA"]) if os.environ.get("IFOOD_FILA") else None
+
+# Saúde do processo da API, exposta em /metrics para os testes de carga (teste_carga.py)
+INTERVALO_MONITOR_LOOP = 0.1
+
+class ExecutorMonitorado(ThreadPoolExecutor):
+    """ThreadPoolExecutor que conta as chamadas enviadas, iniciadas e terminadas, para medir a fila de espera."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "") -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self._lock_contagem = threading.Lock()
+        self.enviadas = 0
+        self.iniciadas = 0
+        self.terminadas = 0
+
+    def _contar(self, campo: str, valor: int = 1) -> None:
+        with self._lock_contagem:
+            setattr(self, campo, getattr(self, campo) + valor)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        def executar() -> Any:
+            self._contar("iniciadas")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._contar("terminadas")
+
+        self._contar("enviadas")
+        try:
+            futuro = super().submit(executar)
+        except BaseException:
+            self._contar("enviadas", -1)
+            raise
+        # Cancelada antes de começar (ex.: shutdown com cancel_futures) nunca vai iniciar
+        futuro.add_done_callback(lambda f: f.cancelled() and self._contar("enviadas", -1))
+        return futuro
+
+    def esperando(self) -> int:
+        with self._lock_contagem:
+            return self.enviadas - self.iniciadas
+
+executor_padrao = ExecutorMonitorado(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="api")
+atraso_loop = registro_metricas.registrar(Histograma(
+    "ifood_api_atraso_loop_segundos", "Atraso do event loop em acordar de um sleep curto.",
+    limites=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+scrapes_em_execucao = registro_metricas.registrar(Medidor("ifood_api_scrapes_em_execucao", "Scrapes ocupando uma thread do executor."))
+registro_metricas.registrar(Medidor(
+    "ifood_api_fila_executor", "Chamadas esperando uma thread livre no executor (saturação).",
+    funcao=executor_padrao.esperando
+))
+registro_metricas.registrar(Medidor("ifood_api_threads_executor", "Threads do executor.", funcao=lambda: executor_padrao.max_workers))
+registro_metricas.registrar(Medidor("ifood_api_rss_bytes", "Memória residente do processo da API.", funcao=lambda: rss_processo(os.getpid())))
+
+async def monitorar_event_loop() -> None:
+    """Mede quanto o loop demora além do previsto para acordar; atrasos altos indicam trabalho bloqueante no loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(INTERVALO_MONITOR_LOOP)
+        atraso_loop.observar(max(0.0, loop.time() - inicio - INTERVALO_MONITOR_LOOP))
+
+def executar_aquecimento(type_search: str, itens_pesquisa: List[dict], max_items: int, max_produtos: int, localizacao: Localizacao) -> None:
+    """Scrape do aquecimento: só interessa o cache de itens que ele grava, então saída e imagens são temporárias."""
+    pasta = tempfile.mkdtemp(prefix="ifood_aquecimento_")
+    try:
+        executar_scraping_supervisionado(
+            type_search, max_items, max_produtos, itens_pesquisa, os.path.join(pasta, "resultado.json"),
+            os.path.join(pasta, "imagens"), None, None, None, [localizacao]
+        )
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+# Popularidade das consultas ao /scrape/ e agendador que mantém as mais pedidas no cache de itens
+frequencias = FrequenciaConsultas()
+aquecedor = AquecedorCache(
+    frequencias, cache_itens, executar_aquecimento,
+    ocupado=lambda: sum(scrapes_em_execucao.exportar().values()) > 0
+)
+
+@app.on_event("startup")
+async def iniciar_monitoramento() -> None:
+    # Executor explícito (mesmo tamanho do padrão do asyncio) para a fila de espera ser observável
+    asyncio.get_running_loop().set_default_executor(executor_padrao)
+    tarefa = asyncio.create_task(monitorar_event_loop())
+    tarefas_em_segundo_plano.add(tarefa)
+
+@app.on_event("startup")
+async def iniciar_aquecimento() -> None:
+    config = await asyncio.to_thread(carregar_config)
+    aquecedor.configurar(config.get("aquecimento"), config.get("cache_itens"))
+    if not aquecedor.opcoes["habilitado"] or not config.get("cache_itens", {}).get("habilitado", False):
+        return
+    if fila is not None:
+        # O cache fica no disco de quem faz o scrape; com workers em outras máquinas a API não o veria
+        logger.info("Aquecimento de cache desligado: scraping feito pelos workers da fila.")
+        return
+    await asyncio.to_thread(frequencias.carregar)
+    tarefa = asyncio.create_task(aquecedor.rodar())
+    tarefas_em_segundo_plano.add(tarefa)
+
+async def executar_scraping(
+    type_search: str,
+    max_produtos: int,
+    itens_pesquisa: List[dict],
+    task_id: str,
+    perfil: Optional[str] = None,
+    localizacoes: Optional[List[Localizacao]] = None
+) -> dict:
+    """Executa o scraping (em um thread local ou via fila de workers) e retorna o resultado."""
+    if fila is not None:
+        await asyncio.to_thread(fila.enfileirar, task_id, {
+            "type_search": type_search,
+            "max_items": 100,
+            "max_produtos": max_produtos,
+            "itens_pesquisa": itens_pesquisa,
+            "perfil": perfil,
+            "localizacoes": [localizacao.como_dict() for localizacao in localizacoes or []]
+        })
+        while True:
+            estado = await asyncio.to_thread(fila.obter, task_id)
+            # O estado final da fila é espelhado no armazenamento local, que a API marcou como executando
+            if estado and estado["status"] == STATUS_CONCLUIDO:
+                await asyncio.to_thread(definir_status, task_id, TAREFA_CONCLUIDA, estado["resultado"])
+                return estado["resultado"]
+            if estado and estado["status"] == STATUS_ERRO:
+                await asyncio.to_thread(definir_status, task_id, TAREFA_COM_ERRO, None, estado["erro"])
+                raise Exception(estado["erro"])
+            await asyncio.sleep(1)
+
+    output_file, imagens_pasta = saidas_da_tarefa(task_id)
+    try:
+        # Executar o scraping diretamente no mesmo processo, mas em um thread separado
+        os.makedirs(TAREFAS_DIR, exist_ok=True)
+        scrapes_em_execucao.inc()
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: executar_scraping_supervisionado(type_search, 100, max_produtos, itens_pesquisa, output_file, imagens_pasta, None, task_id, perfil, localizacoes)
+            )
+        finally:
+            scrapes_em_execucao.dec()
+
+        # Verificar se o arquivo JSON foi gerado
+        if not os.path.exists(output_file):
+            raise FileNotFoundError(f"O arquivo de saída {output_file} não foi gerado.")
+
+        # Carregar os dados do arquivo
+        with open(output_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        await asyncio.to_thread(definir_status, task_id, TAREFA_COM_ERRO, None, str(e))
+        raise
+    logger.info(f"Scraping concluído, resultado lido de {output_file}")
+    await asyncio.to_thread(definir_status, task_id, TAREFA_CONCLUIDA, data)
+    return data
+
+async def executar_scraping_em_segundo_plano(type_search: str, max_produtos: int, itens_pesquisa: List[dict], task_id: str, *args: Any) -> None:
+    """Executa o scraping sem bloquear a resposta; os resultados chegam pelo SSE."""
+    try:
+        await executar_scraping(type_search, max_produtos, itens_pesquisa, task_id, *args)
+    except Exception as e:
+        logger.error(f"Erro no scraping em segundo plano (task_id={task_id}): {e}")
+
+async def obter_progresso_task(task_id: str) -> dict:
+    """Progresso e status do task_id; tarefas enfileiradas são lidas da fila, que é atualizada pelo worker."""
+    if fila is not None:
+        estado = await asyncio.to_thread(fila.obter, task_id)
+        if estado:
+            return {"percentual": estado["percentual"], "mensagem": estado["mensagem"], "status": estado["status"], "erro": estado["erro"]}
+    return await asyncio.to_thread(obter_progresso, task_id)
+
+def validar_produtos(produtos: List[ProdutoItem]) -> List[dict]:
+    """Valida os itens da lista e converte para o formato esperado por scrape_ifood_mercados."""
+    for item in produtos:
+        if not item.produto or item.produto.strip() == "":
+            raise ValueError("O campo 'produto' é obrigatório e não pode ser vazio.")
+        if item.quantidade < 1:
+            raise ValueError("A quantidade deve ser um número inteiro positivo.")
+    return [{"item": p.produto, "quantidade": p.quantidade} for p in produtos]
+
+tarefas_em_segundo_plano = set()
+
 @app.post("/scrape/", response_model=ScrapingResponse)
-async def scrape_ifood(type_search: str,produtos: List[ProdutoItem], max_produtos: int = 10, task_id: Optional[str] = None):
+async def scrape_ifood(
+    type_search: str,
+    produtos: List[ProdutoItem],
+    max_produtos: int = 10,
+    task_id: Optional[str] = None,
+    aguardar: bool = True,
+    perfil: Optional[str] = None,
+    localizacao: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    usar_cache: bool = True
+):
+    """Executa o scraping; com aguardar=false retorna só o task_id e os resultados chegam por /progresso/{task_id}.
+
+    Com perfil=amostragem (pilhas colapsadas para flame graph) ou perfil=deterministico (cProfile),
+    a tarefa é perfilada e o arquivo fica disponível em /perfis/{task_id}.
+    A busca usa `localizacao` (nome da seção `localizacoes` do config) ou latitude/longitude
+    explícitas; sem nenhum dos dois, a localização padrão. Com vários tipos em type_search
+    ("M,D"), as verticais são pesquisadas ao mesmo tempo e a resposta traz `ranking` e `verticais`.
+    Uma cesta de um só tipo cujos itens estão todos no cache de itens é respondida na hora (campo
+    `cache` com a idade dos dados); usar_cache=false força o scraping.
+    """
     logger.info(f"Iniciando scrape_ifood com produtos no(a): {[p.dict() for p in produtos]}, max_produtos: {max_produtos}, task_id: {task_id}")
     if not task_id:
         task_id = str(uuid.uuid4())
     try:
-        # Validar os itens da lista
-        for item in produtos:
-            if not item.produto or item.produto.strip() == "":
-                raise ValueError("O campo 'produto' é obrigatório e não pode ser vazio.")
-            if item.quantidade < 1:
-                raise ValueError("A quantidade deve ser um número inteiro positivo.")
+        itens_pesquisa = validar_produtos(produtos)
+        tipos = separar_tipos_busca(type_search)
+        if perfil is not None and perfil not in MODOS_PERFIL:
+            raise ValueError(f"Perfil inválido: '{perfil}'. Use {' ou '.join(MODOS_PERFIL)}.")
+        config = await asyncio.to_thread(carregar_config)
+        local = resolver_localizacao(config, localizacao, latitude, longitude)
+        for tipo in tipos:
+            frequencias.registrar(local, tipo, itens_pesquisa, max_produtos)
 
-        # Converter os itens para o formato esperado por scrape_ifood_mercados
-        itens_pesquisa = [{"item": p.produto, "quantidade": p.quantidade} for p in produtos]
+        if usar_cache and len(tipos) == 1 and perfil is None:
+            data = await asyncio.to_thread(resultado_do_cache, type_search, 100, max_produtos, itens_pesquisa, config, local)
+            if data is not None:
+                logger.info(f"Cesta respondida do cache de itens (task_id={task_id}, idade {data['cache']['idade_segundos']}s)")
+                await asyncio.to_thread(publicar_evento, task_id, "concluido", {"melhor_compra": data["melhor_compra"], "output_file": None})
+                await asyncio.to_thread(definir_status, task_id, TAREFA_CONCLUIDA, data)
+                return {
+                    "status": "success",
+                    "melhor_compra": data["melhor_compra"],
+                    "melhor_compra_multi": data.get("melhor_compra_multi"),
+                    "mercados": data["mercados"],
+                    "localizacao": data["localizacao"],
+                    "cache": data["cache"],
+                    "task_id": task_id
+                }
 
-        # Criar o diretório de saída se não existir
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-            logger.info(f"Criado diretório {DATA_DIR}")
+        await asyncio.to_thread(remover_saidas_expiradas, config)
 
         # Inicializar progresso para este task_id
-        with progresso_lock:
-            progresso_por_task[task_id] = {"percentual": 0, "mensagem": "Iniciando scraping..."}
-            
-        # Executar o scraping diretamente no mesmo processo, mas em um thread separado
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: scrape_ifood_mercados(type_search, 100, max_produtos, itens_pesquisa, OUTPUT_FILE, IMAGENS_DIR, None, task_id)
-        )
+        await asyncio.to_thread(definir_status, task_id, TAREFA_EXECUTANDO)
+        await asyncio.to_thread(atualizar_progresso, task_id, 0, "Iniciando scraping...")
 
-        # Verificar se o arquivo JSON foi gerado
-        if not os.path.exists(OUTPUT_FILE):
-            raise FileNotFoundError(f"O arquivo de saída {OUTPUT_FILE} não foi gerado.")
+        if not aguardar:
+            tarefa = asyncio.create_task(executar_scraping_em_segundo_plano(type_search, max_produtos, itens_pesquisa, task_id, perfil, [local]))
+            tarefas_em_segundo_plano.add(tarefa)
+            tarefa.add_done_callback(tarefas_em_segundo_plano.discard)
+            return {"status": "em_andamento", "task_id": task_id}
 
-        # Carregar os dados do arquivo
-        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = await executar_scraping(type_search, max_produtos, itens_pesquisa, task_id, perfil, [local])
 
-        logger.info(f"Scraping concluído, resultado lido de {OUTPUT_FILE}")
         response = {
             "status": "success",
             "melhor_compra": data["melhor_compra"],
+            "melhor_compra_multi": data.get("melhor_compra_multi"),
             "mercados": data["mercados"],
-            "output_file": OUTPUT_FILE,
+            "output_file": saidas_da_tarefa(task_id)[0] if fila is None else None,
+            "tempos": data.get("tempos"),
+            "comandos_webdriver": data.get("comandos_webdriver"),
+            "localizacao": data.get("localizacao"),
+            "ranking": data.get("ranking"),
+            "verticais": data.get("verticais"),
             "task_id": task_id
         }
         return response
@@ -157,20 +483,114 @@ async def scrape_ifood(type_search: str,produtos: List[ProdutoItem], max_produto
         logger.error(f"Erro geral ao executar scraper: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao executar scraper: {str(e)}")
 
+@app.post("/scrape/lote/", response_model=ScrapingLoteResponse)
+async def scrape_lote(
+    type_search: str,
+    produtos: List[ProdutoItem],
+    localizacoes: List[str] = Query(...),
+    max_produtos: int = 10,
+    task_id: Optional[str] = None,
+    aguardar: bool = True
+):
+    """Pesquisa a mesma cesta em várias localizações do config ao mesmo tempo (?localizacoes=a&localizacoes=b).
+
+    Cada localização tem seu resultado (ou erro) em `localizacoes`; com aguardar=false o SSE de
+    /progresso/{task_id} envia um evento `localizacao` a cada uma concluída.
+    """
+    logger.info(f"Iniciando scrape_lote em {localizacoes} com produtos: {[p.dict() for p in produtos]}, task_id: {task_id}")
+    if not task_id:
+        task_id = str(uuid.uuid4())
+    try:
+        itens_pesquisa = validar_produtos(produtos)
+        if len(separar_tipos_busca(type_search)) > 1:
+            raise ValueError("Busca em lote de localizações aceita um único tipo de busca.")
+        config = await asyncio.to_thread(carregar_config)
+        locais = [resolver_localizacao(config, nome) for nome in localizacoes]
+
+        await asyncio.to_thread(remover_saidas_expiradas, config)
+        await asyncio.to_thread(definir_status, task_id, TAREFA_EXECUTANDO)
+        await asyncio.to_thread(atualizar_progresso, task_id, 0, "Iniciando scraping em lote...")
+
+        if not aguardar:
+            tarefa = asyncio.create_task(executar_scraping_em_segundo_plano(type_search, max_produtos, itens_pesquisa, task_id, None, locais))
+            tarefas_em_segundo_plano.add(tarefa)
+            tarefa.add_done_callback(tarefas_em_segundo_plano.discard)
+            return {"status": "em_andamento", "task_id": task_id}
+
+        data = await executar_scraping(type_search, max_produtos, itens_pesquisa, task_id, None, locais)
+        if "localizacoes" not in data:
+            # Uma única localização distinta roda como scraping comum
+            data = {"localizacoes": {locais[0].nome: data}}
+        return {"status": "success", "localizacoes": data["localizacoes"], "output_file": saidas_da_tarefa(task_id)[0] if fila is None else None, "task_id": task_id}
+
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Erro geral ao executar scraper em lote: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao executar scraper: {str(e)}")
+
 @app.get("/progresso/{task_id}", response_class=EventSourceResponse, response_model=None)
-async def progresso_endpoint(task_id: str):
-    """Endpoint SSE para enviar atualizações de progresso em tempo real para um task_id específico."""
+async def progresso_endpoint(task_id: str, desde: int = 0):
+    """Endpoint SSE para enviar atualizações de progresso em tempo real para um task_id específico.
+
+    Além do evento `progresso`, envia os resultados parciais à medida que ficam prontos:
+    `mercado` (cabeçalho de cada mercado), `produtos` (lista de produtos por mercado e item),
+    `estimativa` (melhor compra parcial) e `concluido` (melhor compra final). O parâmetro
+    `desde` permite retomar a partir do último id de evento recebido.
+    """
     async def evento_progresso():
+        proximo_evento = desde
         try:
             while True:
-                with progresso_lock:
-                    progresso = progresso_por_task.get(task_id, {"percentual": 0, "mensagem": "Aguardando..."})
+                progresso = await obter_progresso_task(task_id)
+                for evento in await asyncio.to_thread(obter_eventos, task_id, proximo_evento):
+                    proximo_evento = evento["id"] + 1
                     yield {
-                        "event": "progresso",
-                        "data": json.dumps(progresso)
+                        "event": evento["tipo"],
+                        "id": str(evento["id"]),
+                        "data": json.dumps(evento["dados"], ensure_ascii=False)
                     }
+                yield {
+                    "event": "progresso",
+                    "data": json.dumps(progresso)
+                }
+                # O progresso foi lido antes dos eventos, então nenhum evento final fica para trás
+                if progresso.get("status") in (TAREFA_CONCLUIDA, TAREFA_COM_ERRO):
+                    break
                 await asyncio.sleep(1)
         except asyncio.CancelledError:
             pass
 
-    return EventSourceResponse(evento_progresso())
\ No newline at end of file
+    return EventSourceResponse(evento_progresso())
+
+@app.get("/tarefas/{task_id}")
+async def tarefa_endpoint(task_id: str):
+    """Status, progresso e (quando concluída) resultado de uma tarefa, em qualquer instância da API."""
+    progresso = await obter_progresso_task(task_id)
+    if not progresso.get("status"):
+        raise HTTPException(status_code=404, detail=f"Tarefa {task_id} não encontrada.")
+    resultado = None
+    if progresso["status"] == TAREFA_CONCLUIDA:
+        resultado = await asyncio.to_thread(obter_resultado, task_id)
+        if resultado is None and fila is not None:
+            estado = await asyncio.to_thread(fila.obter, task_id)
+            resultado = estado["resultado"] if estado else None
+    return {"task_id": task_id, **progresso, "resultado": resultado}
+
+@app.get("/perfis/{task_id}")
+async def perfil_endpoint(task_id: str):
+    """Baixa o perfil gravado para a tarefa (.folded para flamegraph.pl/speedscope, .prof para snakeviz)."""
+    caminho = await asyncio.to_thread(localizar_perfil, task_id)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail=f"Nenhum perfil gravado para a tarefa {task_id}.")
+    return FileResponse(caminho, media_type="application/octet-stream", filename=os.path.basename(caminho))
+
+@app.get("/limitador")
+async def limitador_endpoint():
+    """Taxa atual, requisições, erros e tempo de espera na fila do limitador de cada host."""
+    return limitador.metricas()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Histogramas de duração por fase e contadores (páginas, retentativas, caches, drivers) no formato texto do Prometheus."""
+    return PlainTextResponse(registro_metricas.texto_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,190 @@
+# aquecimento.py
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from cache_itens import CacheItens, normalizar_item
+from localizacao import Localizacao
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIAS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "frequencias.json")
+
+PADRAO = {
+    "habilitado": False,
+    "intervalo_segundos": 30,          # entre verificações do agendador
+    "ocioso_segundos": 120,            # sem consultas nem scrapes há pelo menos isso para aquecer
+    "top_n": 20,                       # combinações (localização, vertical, item) mantidas aquecidas
+    "consultas_minimas": 2.0,          # pontuação mínima (consultas com decaimento) para entrar no top
+    "meia_vida_segundos": 86400,       # decaimento da pontuação de cada combinação
+    "antecedencia_segundos": 600,      # renova quando faltar menos que isso para o cache expirar
+    "max_itens_por_execucao": 10,      # itens de uma mesma localização e vertical pesquisados juntos
+    "scrapes_por_hora": 4,             # orçamento de navegador do aquecimento
+    "max_items": 100
+}
+
+
+class FrequenciaConsultas:
+    """Pontuação de cada (localização, vertical, item) consultada no /scrape/, com decaimento exponencial.
+
+    Cada consulta soma 1 e a pontuação cai pela metade a cada `meia_vida` segundos, então o top
+    acompanha o que está sendo pedido agora. É gravada em disco para sobreviver a reinícios da API.
+    """
+
+    def __init__(self, meia_vida: float = 86400, arquivo: str = FREQUENCIAS_FILE) -> None:
+        self.meia_vida = meia_vida
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._combinacoes: Dict[str, Dict[str, Any]] = {}
+        self.ultima_consulta = 0.0
+
+    def _decair(self, combinacao: Dict[str, Any], agora: float) -> float:
+        return combinacao["pontos"] * math.pow(0.5, (agora - combinacao["atualizado_em"]) / self.meia_vida)
+
+    def registrar(self, localizacao: Localizacao, type_search: str, itens_pesquisa: List[Dict[str, Any]], max_produtos: int) -> None:
+        agora = time.time()
+        with self._lock:
+            self.ultima_consulta = agora
+            for item_data in itens_pesquisa:
+                chave = CacheItens.chave(localizacao.chave, type_search, item_data["item"])
+                combinacao = self._combinacoes.setdefault(chave, {
+                    "localizacao": localizacao.como_dict(),
+                    "type_search": type_search,
+                    "item": normalizar_item(item_data["item"]),
+                    "max_produtos": max_produtos,
+                    "pontos": 0.0,
+                    "atualizado_em": agora
+                })
+                combinacao["pontos"] = self._decair(combinacao, agora) + 1
+                combinacao["atualizado_em"] = agora
+                combinacao["max_produtos"] = max(combinacao["max_produtos"], max_produtos)
+
+    def populares(self, n: int, minimo: float = 0.0) -> List[Dict[str, Any]]:
+        """Até `n` combinações com pontuação atual >= `minimo`, da mais para a menos consultada."""
+        agora = time.time()
+        with self._lock:
+            atuais = [{**combinacao, "pontos": self._decair(combinacao, agora)} for combinacao in self._combinacoes.values()]
+        atuais = [combinacao for combinacao in atuais if combinacao["pontos"] >= minimo]
+        return sorted(atuais, key=lambda c: -c["pontos"])[:n]
+
+    def salvar(self, minimo: float = 0.01) -> None:
+        """Grava as combinações em disco, descartando as que já decaíram abaixo de `minimo`."""
+        agora = time.time()
+        with self._lock:
+            for chave in [chave for chave, combinacao in self._combinacoes.items() if self._decair(combinacao, agora) < minimo]:
+                del self._combinacoes[chave]
+            combinacoes = dict(self._combinacoes)
+        try:
+            os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+            with open(self.arquivo + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(combinacoes, f, ensure_ascii=False)
+            os.replace(self.arquivo + ".tmp", self.arquivo)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar as frequências de consulta: {e}")
+
+    def carregar(self) -> None:
+        if not os.path.exists(self.arquivo):
+            return
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                combinacoes = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Frequências de consulta inválidas em {self.arquivo}, ignorando: {e}")
+            return
+        with self._lock:
+            self._combinacoes.update(combinacoes)
+
+
+class AquecedorCache:
+    """Renova no cache de itens as combinações mais consultadas antes que expirem.
+
+    Só roda com a API ociosa (nenhum scrape em andamento e nenhuma consulta há `ocioso_segundos`)
+    e dentro do orçamento de `scrapes_por_hora`; os itens de uma mesma localização e vertical são
+    pesquisados em um único scrape. `executar(type_search, itens_pesquisa, max_items, max_produtos,
+    localizacao)` faz a busca, que grava o cache como qualquer outra.
+    """
+
+    def __init__(
+        self,
+        frequencias: FrequenciaConsultas,
+        cache: CacheItens,
+        executar: Callable[[str, List[Dict[str, Any]], int, int, Localizacao], None],
+        ocupado: Callable[[], bool]
+    ) -> None:
+        self.frequencias = frequencias
+        self.cache = cache
+        self.executar = executar
+        self.ocupado = ocupado
+        self.opcoes = dict(PADRAO)
+        self._execucoes: Deque[float] = deque()
+
+    def configurar(self, config: Optional[Dict[str, Any]], config_cache: Optional[Dict[str, Any]] = None) -> None:
+        self.opcoes = {**PADRAO, **(config or {})}
+        self.frequencias.meia_vida = float(self.opcoes["meia_vida_segundos"])
+        self.cache.configurar(config_cache)
+
+    def pendentes(self) -> List[Dict[str, Any]]:
+        """Buscas necessárias para renovar o top: uma por (localização, vertical), as mais populares primeiro."""
+        limite = self.cache.ttl - float(self.opcoes["antecedencia_segundos"])
+        grupos: Dict[str, Dict[str, Any]] = {}
+        for combinacao in self.frequencias.populares(int(self.opcoes["top_n"]), float(self.opcoes["consultas_minimas"])):
+            localizacao = Localizacao.de_dict(combinacao["localizacao"])
+            idade = self.cache.idade(localizacao.chave, combinacao["type_search"], combinacao["item"])
+            if idade is not None and idade < limite:
+                continue
+            grupo = grupos.setdefault(f"{localizacao.chave}|{combinacao['type_search']}", {
+                "localizacao": localizacao,
+                "type_search": combinacao["type_search"],
+                "itens_pesquisa": [],
+                "max_produtos": 0
+            })
+            if len(grupo["itens_pesquisa"]) < int(self.opcoes["max_itens_por_execucao"]):
+                grupo["itens_pesquisa"].append({"item": combinacao["item"], "quantidade": 1})
+                grupo["max_produtos"] = max(grupo["max_produtos"], int(combinacao["max_produtos"]))
+        return list(grupos.values())
+
+    def _tem_orcamento(self) -> bool:
+        agora = time.monotonic()
+        while self._execucoes and agora - self._execucoes[0] > 3600:
+            self._execucoes.popleft()
+        return len(self._execucoes) < int(self.opcoes["scrapes_por_hora"])
+
+    def ocioso(self) -> bool:
+        return not self.ocupado() and time.time() - self.frequencias.ultima_consulta >= float(self.opcoes["ocioso_segundos"])
+
+    async def ciclo(self) -> int:
+        """Uma verificação: renova o que estiver pendente enquanto houver ociosidade e orçamento. Retorna os scrapes feitos."""
+        feitos = 0
+        if not self.ocioso() or not self._tem_orcamento():
+            return feitos
+        for busca in await asyncio.to_thread(self.pendentes):
+            if not self.ocioso() or not self._tem_orcamento():
+                break
+            self._execucoes.append(time.monotonic())
+            itens = ", ".join(item["item"] for item in busca["itens_pesquisa"])
+            logger.info(f"Aquecendo cache de {busca['type_search']} em {busca['localizacao'].nome}: {itens}")
+            try:
+                await asyncio.to_thread(
+                    self.executar, busca["type_search"], busca["itens_pesquisa"], int(self.opcoes["max_items"]),
+                    busca["max_produtos"], busca["localizacao"]
+                )
+                feitos += 1
+            except Exception as e:
+                logger.warning(f"Aquecimento de {busca['type_search']} em {busca['localizacao'].nome} falhou: {e}")
+        return feitos
+
+    async def rodar(self) -> None:
+        """Laço do agendador, para rodar como tarefa de fundo da API."""
+        while True:
+            await asyncio.sleep(float(self.opcoes["intervalo_segundos"]))
+            try:
+                await self.ciclo()
+                await asyncio.to_thread(self.frequencias.salvar)
+            except Exception as e:
+                logger.error(f"Erro no agendador de aquecimento: {e}")
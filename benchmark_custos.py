@@ -0,0 +1,150 @@
+# benchmark_custos.py
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ifood_scraper import calcular_melhor_compra
+from parser_produtos import converter_preco
+from scraper_simulado import ENTREGAS, gerar_preco
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "benchmarks", "custos_baseline.json")
+# (mercados, itens, produtos por item)
+CENARIOS_PADRAO = [(10, 5, 10), (100, 20, 20), (1000, 20, 50), (10000, 10, 10)]
+
+
+def gerar_dados(num_mercados: int, num_itens: int, produtos_por_item: int, semente: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """`dados` e `itens_pesquisa` sintéticos no formato produzido por scrape_ifood_mercados."""
+    gerador = random.Random(semente)
+    itens_pesquisa = [{"item": f"item {i}", "quantidade": gerador.randint(1, 6)} for i in range(num_itens)]
+    dados = []
+    for m in range(num_mercados):
+        produtos: Dict[str, List[Dict[str, Any]]] = {}
+        for item_data in itens_pesquisa:
+            # Alguns mercados não têm o item
+            quantidade = 0 if gerador.random() < 0.1 else gerador.randint(1, produtos_por_item)
+            produtos[item_data["item"]] = [
+                {"id": p + 1, "nome": f"{item_data['item']} marca {p}", "preco": gerar_preco(gerador), "detalhes": "", "imagem_url": None}
+                for p in range(quantidade)
+            ]
+        dados.append({"id": m + 1, "nome": f"Mercado {m}", "custo_entrega": gerador.choice(ENTREGAS), "produtos": produtos})
+    return dados, itens_pesquisa
+
+
+def medir(funcao: Callable[[Any], Any], repeticoes: int, preparar: Callable[[], Any] = lambda: None) -> Dict[str, float]:
+    """Mediana do tempo e pico de memória alocada (tracemalloc, numa execução separada).
+
+    `preparar` roda fora da medição e seu retorno é passado a `funcao`.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        entrada = preparar()
+        inicio = time.perf_counter()
+        funcao(entrada)
+        tempos.append(time.perf_counter() - inicio)
+    entrada = preparar()
+    tracemalloc.start()
+    try:
+        funcao(entrada)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"tempo": statistics.median(tempos), "pico_mb": pico / 1024 / 1024}
+
+
+def executar_cenario(num_mercados: int, num_itens: int, produtos_por_item: int, repeticoes: int) -> Dict[str, Dict[str, float]]:
+    dados, itens_pesquisa = gerar_dados(num_mercados, num_itens, produtos_por_item)
+    precos = [p["preco"] for m in dados for lista in m["produtos"].values() for p in lista]
+
+    def conversao_precos(_: Any) -> None:
+        converter_preco.cache_clear()
+        for preco in precos:
+            converter_preco(preco)
+
+    # calcular_melhor_compra escreve o resumo dentro de cada mercado; cada execução parte de uma cópia limpa
+    nova_copia = lambda: copy.deepcopy(dados)
+    resultado = calcular_melhor_compra(nova_copia(), itens_pesquisa, 3)
+    return {
+        "conversao_precos": medir(conversao_precos, repeticoes),
+        "ranking": medir(lambda copia: calcular_melhor_compra(copia, itens_pesquisa, 3), repeticoes, nova_copia),
+        "serializacao": medir(lambda _: json.dumps(resultado, ensure_ascii=False), repeticoes)
+    }
+
+
+def comparar_com_baseline(
+    resultados: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    limiar: float
+) -> List[str]:
+    """Mensagens de regressão: métricas que passaram de baseline × (1 + limiar)."""
+    regressoes = []
+    for cenario, medicoes in resultados.items():
+        for nome, valores in medicoes.items():
+            base = baseline.get(cenario, {}).get(nome)
+            if not base:
+                continue
+            for metrica in ("tempo", "pico_mb"):
+                if base.get(metrica) and valores[metrica] > base[metrica] * (1 + limiar):
+                    regressoes.append(
+                        f"{cenario} {nome} {metrica}: {valores[metrica]:.4f} contra {base[metrica]:.4f} "
+                        f"(+{(valores[metrica] / base[metrica] - 1) * 100:.0f}%)"
+                    )
+    return regressoes
+
+
+def interpretar_cenarios(texto: Optional[str]) -> List[Tuple[int, int, int]]:
+    """'1000x20x50,10x5x10' -> [(1000, 20, 50), (10, 5, 10)]."""
+    if not texto:
+        return CENARIOS_PADRAO
+    return [tuple(int(v) for v in parte.strip().split("x")) for parte in texto.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de conversão de preços, ranking e serialização em escala sintética.")
+    parser.add_argument("--cenarios", type=str, default=None, help="Lista 'mercadosxitensxprodutos' separada por vírgula (ex.: 1000x20x50)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--baseline", type=str, default=BASELINE_PADRAO)
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova baseline em vez de comparar")
+    parser.add_argument("--limiar", type=float, default=0.2, help="Regressão tolerada sobre a baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    resultados: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for num_mercados, num_itens, produtos_por_item in interpretar_cenarios(args.cenarios):
+        cenario = f"{num_mercados}x{num_itens}x{produtos_por_item}"
+        resultados[cenario] = executar_cenario(num_mercados, num_itens, produtos_por_item, args.repeticoes)
+        for nome, valores in resultados[cenario].items():
+            print(f"{cenario:<16} {nome:<18} {valores['tempo'] * 1000:10.2f} ms {valores['pico_mb']:9.2f} MB")
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Baseline gravada em {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Sem baseline em {args.baseline}; rode com --salvar-baseline para criar uma.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressoes = comparar_com_baseline(resultados, baseline, args.limiar)
+    if regressoes:
+        print("Regressões acima do limiar:")
+        for mensagem in regressoes:
+            print(f"  {mensagem}")
+        sys.exit(1)
+    print(f"Sem regressões acima de {args.limiar:.0%} em relação à baseline.")
+
+
+if __name__ == "__main__":
+    main()
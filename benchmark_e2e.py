@@ -0,0 +1,233 @@
+# benchmark_e2e.py
+import argparse
+import copy
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+import ifood_scraper
+from progresso import registrar_ouvinte
+from site_fixture import ConfigFixture, ServidorFixture
+from supervisor import rss_arvore
+
+logger = logging.getLogger(__name__)
+
+RESULTADOS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "benchmarks", "e2e.jsonl")
+# Marcos de progresso publicados por scrape_ifood_mercados e a fase que começa em cada um
+FASES = [(5, "sessao"), (10, "mercados"), (50, "produtos"), (95, "custos"), (100, None)]
+
+
+class ContadorComandos:
+    """Conta os comandos WebDriver (round-trips ao chromedriver) por nome enquanto estiver ativo."""
+
+    def __init__(self) -> None:
+        self.contagem: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._original = None
+
+    def __enter__(self) -> "ContadorComandos":
+        self._original = WebDriver.execute
+        contador = self
+
+        def execute(driver: WebDriver, comando: str, params: Optional[dict] = None) -> Any:
+            with contador._lock:
+                contador.contagem[comando] = contador.contagem.get(comando, 0) + 1
+            return contador._original(driver, comando, params)
+
+        WebDriver.execute = execute
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        WebDriver.execute = self._original
+
+    @property
+    def total(self) -> int:
+        return sum(self.contagem.values())
+
+
+class MonitorRSS(threading.Thread):
+    """Amostra a memória do processo e de seus filhos (Chrome, chromedriver) e guarda o pico."""
+
+    def __init__(self, intervalo: float = 0.2) -> None:
+        super().__init__(name="monitor-rss", daemon=True)
+        self.intervalo = intervalo
+        self.pico = 0
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        while not self._parar.is_set():
+            self.pico = max(self.pico, rss_arvore(os.getpid()))
+            self._parar.wait(self.intervalo)
+
+    def parar(self) -> int:
+        self._parar.set()
+        self.join()
+        return self.pico
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        resultado = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        return resultado.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def tempos_por_fase(marcos: List[tuple], inicio: float, fim: float) -> Dict[str, float]:
+    """Duração de cada fase a partir do primeiro instante em que o progresso alcançou cada marco."""
+    instantes: Dict[int, float] = {}
+    for instante, percentual in marcos:
+        for marco, _ in FASES:
+            if percentual >= marco and marco not in instantes:
+                instantes[marco] = instante
+    tempos = {"inicializacao": round(instantes.get(5, fim) - inicio, 3)}
+    for (marco, fase), (proximo, _) in zip(FASES, FASES[1:]):
+        if marco in instantes:
+            tempos[fase] = round(instantes.get(proximo, fim) - instantes[marco], 3)
+    return tempos
+
+
+def executar_benchmark(
+    servidor: ServidorFixture,
+    config_base: Dict[str, Any],
+    itens_pesquisa: List[Dict[str, Any]],
+    max_items: int,
+    max_produtos: int
+) -> Dict[str, Any]:
+    """Roda scrape_ifood_mercados contra o site fixture e mede tempo, fases, round-trips e pico de memória."""
+    config = copy.deepcopy(config_base)
+    config["urls"] = servidor.urls()
+    # O site local não precisa de limitação; mantém o limitador ativo para medir seu custo, mas folgado
+    config.setdefault("limitador", {}).setdefault("hosts", {})["127.0.0.1"] = {"taxa_inicial": 100.0, "taxa_maxima": 200.0, "rajada": 100}
+    # Com isolamento habilitado o configurar_driver não mata Chrome de outros processos
+    config.setdefault("isolamento", {})["habilitado"] = True
+
+    task_id = f"benchmark-{uuid.uuid4().hex[:8]}"
+    marcos: List[tuple] = []
+    registrar_ouvinte(lambda tid, percentual, mensagem: marcos.append((time.perf_counter(), percentual)) if tid == task_id else None)
+    requisicoes_antes = servidor.requisicoes
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_e2e_") as pasta:
+        monitor = MonitorRSS()
+        monitor.start()
+        erro = None
+        inicio = time.perf_counter()
+        with ContadorComandos() as contador:
+            try:
+                ifood_scraper.scrape_ifood_mercados(
+                    "M", max_items, max_produtos, itens_pesquisa,
+                    os.path.join(pasta, "resultado.json"), os.path.join(pasta, "imagens"), config, task_id
+                )
+            except Exception as e:
+                erro = f"{type(e).__name__}: {e}"
+        fim = time.perf_counter()
+        pico_rss = monitor.parar()
+
+    requisicoes = {k: v - requisicoes_antes.get(k, 0) for k, v in servidor.requisicoes.items()}
+    return {
+        "tempo_total": round(fim - inicio, 3),
+        "fases": tempos_por_fase(marcos, inicio, fim),
+        "comandos_webdriver": contador.total,
+        "comandos_por_tipo": dict(sorted(contador.contagem.items(), key=lambda c: -c[1])),
+        "requisicoes_http": requisicoes,
+        "pico_rss_mb": round(pico_rss / 1024 / 1024, 1),
+        "erro": erro
+    }
+
+
+def salvar_resultado(resultado: Dict[str, Any], caminho: str = RESULTADOS_PADRAO) -> None:
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+def ultimo_resultado(caminho: str, parametros: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Execução anterior mais recente com os mesmos parâmetros, para comparação."""
+    if not os.path.exists(caminho):
+        return None
+    anterior = None
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            if registro.get("parametros") == parametros:
+                anterior = registro
+    return anterior
+
+
+def imprimir_comparacao(atual: Dict[str, Any], anterior: Optional[Dict[str, Any]]) -> None:
+    metricas = atual["metricas"]
+    print(f"Commit {atual['commit']}: {metricas['tempo_total']:.2f}s, {metricas['comandos_webdriver']} comandos WebDriver, pico {metricas['pico_rss_mb']} MB")
+    for fase, tempo in metricas["fases"].items():
+        print(f"  {fase:<14} {tempo:8.2f}s")
+    if metricas["erro"]:
+        print(f"  erro: {metricas['erro']}")
+    if anterior is None:
+        return
+    base = anterior["metricas"]
+    variacao = (metricas["tempo_total"] - base["tempo_total"]) / base["tempo_total"] * 100 if base["tempo_total"] else 0.0
+    print(
+        f"Comparado a {anterior['commit']} ({anterior['data']}): tempo {variacao:+.1f}%, "
+        f"comandos {metricas['comandos_webdriver'] - base['comandos_webdriver']:+d}, "
+        f"pico {metricas['pico_rss_mb'] - base['pico_rss_mb']:+.1f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do scraper contra o site fixture local.")
+    parser.add_argument("--mercados", type=int, default=10, help="Mercados servidos e raspados")
+    parser.add_argument("--produtos-por-busca", type=int, default=40)
+    parser.add_argument("--max-produtos", type=int, default=10)
+    parser.add_argument("--item", type=str, default="leite:2,arroz 5kg:1,coca 350:6", help="Itens no formato 'item:quantidade' separados por vírgula")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Atraso de cada requisição HTTP do site, em segundos")
+    parser.add_argument("--latencia-busca", type=float, default=0.2, help="Atraso até a busca devolver resultados, em segundos")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--config", type=str, default="./config.yaml")
+    parser.add_argument("--saida", type=str, default=RESULTADOS_PADRAO, help="Arquivo JSONL onde os resultados são acumulados")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    itens_pesquisa = []
+    for item_str in args.item.split(","):
+        item, quantidade = item_str.strip().rsplit(":", 1)
+        itens_pesquisa.append({"item": item.strip(), "quantidade": int(quantidade)})
+    parametros = {
+        "mercados": args.mercados,
+        "produtos_por_busca": args.produtos_por_busca,
+        "max_produtos": args.max_produtos,
+        "itens": itens_pesquisa,
+        "latencia": args.latencia,
+        "latencia_busca": args.latencia_busca
+    }
+    fixture = ConfigFixture(args.mercados, args.produtos_por_busca, latencia=args.latencia, latencia_busca=args.latencia_busca)
+    config = ifood_scraper.carregar_config(args.config)
+
+    with ServidorFixture(fixture, config["selectors"]) as servidor:
+        for _ in range(args.repeticoes):
+            anterior = ultimo_resultado(args.saida, parametros)
+            resultado = {
+                "commit": commit_atual(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "parametros": parametros,
+                "metricas": executar_benchmark(servidor, config, itens_pesquisa, args.mercados, args.max_produtos)
+            }
+            salvar_resultado(resultado, args.saida)
+            imprimir_comparacao(resultado, anterior)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# cache_itens.py
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from metricas import acertos_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "cache_itens")
+# Cabeçalho do mercado guardado junto dos produtos (imagem_local fica de fora: a próxima busca apaga as imagens)
+CAMPOS_MERCADO = ("id", "nome", "rating", "distancia", "tempo_entrega", "custo_entrega", "imagem_url", "url")
+
+
+def normalizar_item(item: str) -> str:
+    return " ".join(item.lower().split())
+
+
+class CacheItens:
+    """Produtos encontrados por mercado para cada (localização, vertical, item), em memória e em disco.
+
+    Toda busca concluída grava um registro por item da cesta; uma cesta cujos itens estão todos
+    no cache é montada e calculada sem abrir o navegador. O disco permite que a API leia o que
+    um processo isolado (ou o aquecimento) gravou.
+    """
+
+    def __init__(self, pasta: str = CACHE_DIR, ttl: float = 3600) -> None:
+        self.pasta = pasta
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # chave -> (registro, mtime do arquivo lido ou gravado)
+        self._memoria: Dict[str, tuple] = {}
+
+    @staticmethod
+    def chave(localizacao: str, type_search: str, item: str) -> str:
+        return f"{localizacao}|{type_search}|{normalizar_item(item)}"
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, hashlib.sha1(chave.encode("utf-8")).hexdigest() + ".json.gz")
+
+    def guardar(
+        self,
+        localizacao: str,
+        type_search: str,
+        mercados: List[Dict[str, Any]],
+        itens_pesquisa: List[Dict[str, Any]],
+        max_produtos: int
+    ) -> None:
+        """Grava os produtos de cada item; mercados em que o item não foi pesquisado (falha) ficam de fora.
+
+        Os produtos são indexados pela URL do mercado, então mercados sem URL também ficam de fora.
+        """
+        mercados = [mercado for mercado in mercados if mercado.get("url")]
+        cabecalhos = [{campo: mercado.get(campo) for campo in CAMPOS_MERCADO} for mercado in mercados]
+        for item_data in itens_pesquisa:
+            item = item_data["item"]
+            chave = self.chave(localizacao, type_search, item)
+            registro = {
+                "chave": chave,
+                "criado_em": time.time(),
+                "max_produtos": max_produtos,
+                "mercados": cabecalhos,
+                "produtos": {
+                    mercado["url"]: [
+                        {campo: valor for campo, valor in produto.items() if campo != "imagem_local"}
+                        for produto in mercado["produtos"][item]
+                    ]
+                    for mercado in mercados
+                    if item in mercado.get("produtos", {}) and not mercado.get("falha")
+                }
+            }
+            mtime = None
+            try:
+                os.makedirs(self.pasta, exist_ok=True)
+                temporario = self._caminho(chave) + ".tmp"
+                with gzip.open(temporario, "wt", encoding="utf-8") as f:
+                    json.dump(registro, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(temporario, self._caminho(chave))
+                mtime = os.path.getmtime(self._caminho(chave))
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o cache de '{item}' ({type_search}, {localizacao}): {e}")
+            with self._lock:
+                self._memoria[chave] = (registro, mtime)
+
+    def _ler(self, chave: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            registro, mtime_lido = self._memoria.get(chave, (None, None))
+        caminho = self._caminho(chave)
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            return registro
+        if registro is not None and mtime == mtime_lido:
+            return registro
+        # Gravado por outro processo (isolado, worker, aquecimento) ou ainda não lido
+        try:
+            with gzip.open(caminho, "rt", encoding="utf-8") as f:
+                registro = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de item inválido em {caminho}, ignorando: {e}")
+            return None
+        with self._lock:
+            self._memoria[chave] = (registro, mtime)
+        return registro
+
+    def idade(self, localizacao: str, type_search: str, item: str) -> Optional[float]:
+        """Segundos desde a gravação do item (mesmo expirado), ou None se nunca foi gravado."""
+        registro = self._ler(self.chave(localizacao, type_search, item))
+        return None if registro is None else time.time() - registro["criado_em"]
+
+    def montar_mercados(
+        self,
+        localizacao: str,
+        type_search: str,
+        itens_pesquisa: List[Dict[str, Any]],
+        max_produtos: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Mercados no formato do scraper com os produtos de cada item, ou None se algum item não estiver válido."""
+        if not itens_pesquisa:
+            return None
+        registros = []
+        for item_data in itens_pesquisa:
+            registro = self._ler(self.chave(localizacao, type_search, item_data["item"]))
+            if registro is None or time.time() - registro["criado_em"] > self.ttl or registro["max_produtos"] < max_produtos:
+                acertos_cache.inc(cache="itens", resultado="falta")
+                return None
+            registros.append(registro)
+        acertos_cache.inc(cache="itens", resultado="acerto")
+        # Lista de mercados da gravação mais recente; mercado sem o item conta como item faltante
+        recente = max(registros, key=lambda r: r["criado_em"])
+        mercados = []
+        for cabecalho in recente["mercados"]:
+            mercado = dict(cabecalho)
+            mercado["produtos"] = {
+                item_data["item"]: registro["produtos"][mercado["url"]][:max_produtos]
+                for item_data, registro in zip(itens_pesquisa, registros)
+                if mercado["url"] in registro["produtos"]
+            }
+            mercados.append(mercado)
+        return mercados
+
+    def idade_maxima(self, localizacao: str, type_search: str, itens_pesquisa: List[Dict[str, Any]]) -> Optional[float]:
+        idades = [self.idade(localizacao, type_search, item_data["item"]) for item_data in itens_pesquisa]
+        return None if not idades or None in idades else max(idades)
+
+    def configurar(self, config: Optional[Dict[str, Any]]) -> None:
+        if config:
+            self.ttl = float(config.get("ttl_segundos", self.ttl))
+
+
+cache_itens = CacheItens()
@@ -0,0 +1,136 @@
+# catalogo.py
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from parser_produtos import analisar_produto, compilar_filtro
+from relevancia import compilar_indice, similaridade, tokens
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "catalogos")
+CAMPOS = ("nome", "preco", "detalhes", "imagem_url")
+
+
+class SnapshotCatalogo:
+    """Catálogo completo de um mercado com índice invertido de palavras para busca local.
+
+    Cada item da cesta é respondido em memória (relevância + filtro de tamanho), sem voltar
+    ao site; o snapshot vale até `ttl` segundos depois de `criado_em`.
+    """
+
+    def __init__(self, url: str, produtos: List[Dict[str, Any]], criado_em: Optional[float] = None) -> None:
+        self.url = url
+        self.produtos = produtos
+        self.criado_em = criado_em if criado_em is not None else time.time()
+        self.indice: Dict[str, List[int]] = {}
+        for posicao, produto in enumerate(produtos):
+            for palavra in set(tokens(produto.get("nome") or "")):
+                self.indice.setdefault(palavra, []).append(posicao)
+
+    def expirado(self, ttl: float) -> bool:
+        return time.time() - self.criado_em > ttl
+
+    def _candidatos(self, termos: List[str]) -> List[int]:
+        """Produtos com ao menos uma palavra parecida com algum termo pesquisado."""
+        posicoes = set()
+        for palavra, lista in self.indice.items():
+            if any(similaridade(termo, palavra) > 0 for termo in termos):
+                posicoes.update(lista)
+        return sorted(posicoes)
+
+    def buscar(self, item_pesquisa: str, max_produtos: int, limiar: float = 0.5) -> List[Dict[str, Any]]:
+        """Até `max_produtos` produtos do catálogo para o item, do mais ao menos relevante (empate: mais barato)."""
+        filtro = compilar_filtro(item_pesquisa)
+        indice = compilar_indice(filtro.termo_principal)
+        posicoes = self._candidatos(indice.termos) if indice.termos else range(len(self.produtos))
+        encontrados = []
+        for posicao in posicoes:
+            produto = self.produtos[posicao]
+            relevancia = indice.pontuar(produto.get("nome"))
+            if relevancia < limiar:
+                continue
+            info = analisar_produto(produto.get("nome") or "", produto.get("detalhes") or "", produto.get("preco") or "")
+            if not filtro.aceita(info):
+                continue
+            encontrados.append((-relevancia, info.preco, posicao, info))
+        encontrados.sort(key=lambda e: e[:3])
+        resultado = []
+        for i, (relevancia_neg, _, posicao, info) in enumerate(encontrados[:max_produtos], 1):
+            produto = dict(self.produtos[posicao])
+            produto["id"] = i
+            produto["relevancia"] = round(-relevancia_neg, 3)
+            produto["medida"] = info.como_dict()
+            resultado.append(produto)
+        return resultado
+
+
+class ArmazemCatalogos:
+    """Snapshots por mercado em memória e em disco (JSON gzip compacto: uma lista por produto)."""
+
+    def __init__(self, pasta: str = CATALOGO_DIR, ttl: float = 6 * 3600) -> None:
+        self.pasta = pasta
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memoria: Dict[str, SnapshotCatalogo] = {}
+
+    def _caminho(self, url: str) -> str:
+        return os.path.join(self.pasta, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json.gz")
+
+    def obter(self, url: str) -> Optional[SnapshotCatalogo]:
+        """Snapshot ainda válido do mercado, ou None."""
+        with self._lock:
+            snapshot = self._memoria.get(url)
+        if snapshot is None:
+            snapshot = self._ler(url)
+        if snapshot is None or snapshot.expirado(self.ttl):
+            return None
+        with self._lock:
+            self._memoria[url] = snapshot
+        return snapshot
+
+    def salvar(self, url: str, produtos: List[Dict[str, Any]]) -> SnapshotCatalogo:
+        snapshot = SnapshotCatalogo(url, produtos)
+        with self._lock:
+            self._memoria[url] = snapshot
+        conteudo = {
+            "url": url,
+            "criado_em": snapshot.criado_em,
+            "campos": list(CAMPOS),
+            "produtos": [[produto.get(campo) for campo in CAMPOS] for produto in produtos]
+        }
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            temporario = self._caminho(url) + ".tmp"
+            with gzip.open(temporario, "wt", encoding="utf-8") as f:
+                json.dump(conteudo, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporario, self._caminho(url))
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o snapshot do catálogo de {url}: {e}")
+        return snapshot
+
+    def _ler(self, url: str) -> Optional[SnapshotCatalogo]:
+        caminho = self._caminho(url)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with gzip.open(caminho, "rt", encoding="utf-8") as f:
+                conteudo = json.load(f)
+            campos = conteudo["campos"]
+            produtos = [dict(zip(campos, valores)) for valores in conteudo["produtos"]]
+            return SnapshotCatalogo(conteudo["url"], produtos, conteudo["criado_em"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Snapshot do catálogo inválido em {caminho}, ignorando: {e}")
+            return None
+
+    def configurar(self, config: Optional[Dict[str, Any]]) -> None:
+        if config:
+            self.ttl = float(config.get("ttl_segundos", self.ttl))
+
+
+armazem_catalogos = ArmazemCatalogos()
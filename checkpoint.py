@@ -0,0 +1,110 @@
+# checkpoint.py
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "checkpoints")
+
+
+class CheckpointScraping:
+    """Guarda o progresso de um scraping por task_id para que uma nova tentativa continue de onde parou.
+
+    Cada unidade concluída (lista de mercados, depois cada mercado × item) é acrescentada como
+    uma linha JSON no arquivo `<task_id>.jsonl`; a leitura reexecuta as linhas em ordem.
+    """
+
+    def __init__(self, task_id: str, parametros: Dict[str, Any], pasta: str = CHECKPOINT_DIR) -> None:
+        self.task_id = task_id
+        self.parametros = parametros
+        nome_arquivo = "".join(c for c in task_id if c.isalnum() or c in "_-")[:100]
+        self.caminho = os.path.join(pasta, f"{nome_arquivo}.jsonl")
+        self._lock = threading.Lock()
+        self._mercados: Optional[List[Dict[str, Any]]] = None
+        self._produtos: Dict[str, List[Dict[str, Any]]] = {}
+        os.makedirs(pasta, exist_ok=True)
+        self._carregar()
+
+    @staticmethod
+    def _chave(mercado_id: int, item: str) -> str:
+        return f"{mercado_id}|{item}"
+
+    def _carregar(self) -> None:
+        """Lê o checkpoint existente; descarta se foi gerado com outros parâmetros."""
+        if not os.path.exists(self.caminho):
+            self._registrar({"tipo": "parametros", "dados": self.parametros})
+            return
+        registros = []
+        invalidas = 0
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registros.append(json.loads(linha))
+                    except json.JSONDecodeError:
+                        # Última linha pode ter ficado incompleta se o processo morreu durante a escrita
+                        logger.warning(f"Linha inválida ignorada no checkpoint {self.caminho}")
+                        invalidas += 1
+        except OSError as e:
+            logger.error(f"Erro ao ler checkpoint {self.caminho}: {e}")
+
+        if not registros or registros[0].get("tipo") != "parametros" or registros[0].get("dados") != self.parametros:
+            logger.info(f"Checkpoint de {self.task_id} não corresponde aos parâmetros atuais, descartando.")
+            self.remover()
+            self._registrar({"tipo": "parametros", "dados": self.parametros})
+            return
+        if invalidas:
+            # Regrava sem a linha cortada, que não termina em quebra de linha e engoliria o próximo registro
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.caminho)
+
+        for registro in registros[1:]:
+            if registro.get("tipo") == "mercados":
+                self._mercados = registro["dados"]
+            elif registro.get("tipo") == "produtos":
+                dados = registro["dados"]
+                self._produtos[self._chave(dados["mercado_id"], dados["item"])] = dados["produtos"]
+        logger.info(
+            f"Checkpoint de {self.task_id} carregado: "
+            f"{len(self._mercados or [])} mercados, {len(self._produtos)} pesquisas concluídas."
+        )
+
+    def _registrar(self, registro: Dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def mercados(self) -> Optional[List[Dict[str, Any]]]:
+        """Retorna a lista de mercados salva, ou None se ainda não foi coletada."""
+        if self._mercados is None:
+            return None
+        return [dict(m) for m in self._mercados]
+
+    def salvar_mercados(self, mercados: List[Dict[str, Any]]) -> None:
+        self._mercados = [dict(m) for m in mercados]
+        self._registrar({"tipo": "mercados", "dados": self._mercados})
+
+    def produtos(self, mercado_id: int, item: str) -> Optional[List[Dict[str, Any]]]:
+        """Retorna os produtos já coletados para o mercado × item, ou None."""
+        return self._produtos.get(self._chave(mercado_id, item))
+
+    def salvar_produtos(self, mercado_id: int, item: str, produtos: List[Dict[str, Any]]) -> None:
+        self._produtos[self._chave(mercado_id, item)] = produtos
+        self._registrar({"tipo": "produtos", "dados": {"mercado_id": mercado_id, "item": item, "produtos": produtos}})
+
+    def remover(self) -> None:
+        """Apaga o checkpoint (scraping concluído ou parâmetros incompatíveis)."""
+        try:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+        except OSError as e:
+            logger.warning(f"Erro ao remover checkpoint {self.caminho}: {e}")
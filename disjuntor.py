@@ -0,0 +1,93 @@
+# disjuntor.py
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DisjuntorMercados:
+    """Circuit breaker por mercado: após N falhas seguidas o mercado é ignorado durante o resfriamento.
+
+    O estado é compartilhado entre requisições do mesmo processo. Passado o resfriamento, o
+    mercado recebe uma nova tentativa (meio-aberto); uma falha nela reabre o disjuntor.
+    """
+
+    def __init__(self, falhas_para_abrir: int = 3, tempo_resfriamento: float = 600.0) -> None:
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_resfriamento = tempo_resfriamento
+        self._lock = threading.Lock()
+        self._estado: Dict[str, Dict[str, Any]] = {}
+
+    def configurar(self, config: Optional[Dict[str, Any]]) -> None:
+        """Aplica os limites da seção `resiliencia` do config.yaml."""
+        if not config:
+            return
+        with self._lock:
+            self.falhas_para_abrir = int(config.get("falhas_para_abrir", self.falhas_para_abrir))
+            self.tempo_resfriamento = float(config.get("tempo_resfriamento", self.tempo_resfriamento))
+
+    def motivo_abertura(self, chave: str) -> Optional[str]:
+        """Retorna o motivo se o disjuntor do mercado está aberto, ou None se pode tentar."""
+        with self._lock:
+            estado = self._estado.get(chave)
+            if not estado or estado["aberto_ate"] is None:
+                return None
+            if time.monotonic() >= estado["aberto_ate"]:
+                # Meio-aberto: permite uma tentativa; uma nova falha reabre imediatamente
+                estado["aberto_ate"] = None
+                estado["falhas"] = self.falhas_para_abrir - 1
+                logger.info(f"Disjuntor de {chave} em meio-aberto após resfriamento.")
+                return None
+            return estado["motivo"]
+
+    def registrar_falha(self, chave: str, motivo: str) -> None:
+        with self._lock:
+            estado = self._estado.setdefault(chave, {"falhas": 0, "aberto_ate": None, "motivo": None})
+            estado["falhas"] += 1
+            estado["motivo"] = motivo
+            if estado["falhas"] >= self.falhas_para_abrir and estado["aberto_ate"] is None:
+                estado["aberto_ate"] = time.monotonic() + self.tempo_resfriamento
+                logger.warning(
+                    f"Disjuntor aberto para {chave} após {estado['falhas']} falhas "
+                    f"(resfriamento de {self.tempo_resfriamento:.0f}s): {motivo}"
+                )
+
+    def registrar_sucesso(self, chave: str) -> None:
+        with self._lock:
+            self._estado.pop(chave, None)
+
+    def exportar(self) -> Dict[str, Dict[str, Any]]:
+        """Cópia do estado para repassar a outro processo do mesmo host (time.monotonic é do sistema)."""
+        with self._lock:
+            return {chave: dict(estado) for chave, estado in self._estado.items()}
+
+    def importar(self, estado: Optional[Dict[str, Dict[str, Any]]], enviado: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Mescla o estado vindo de outro processo; para cada mercado vale a versão recebida.
+
+        `enviado` é o estado que aquele processo recebeu ao começar: mercados que estavam nele e
+        sumiram do retorno tiveram um sucesso lá (registrar_sucesso) e são zerados aqui também.
+        """
+        estado = estado or {}
+        with self._lock:
+            for chave in set(enviado or {}) - set(estado):
+                self._estado.pop(chave, None)
+            for chave, valores in estado.items():
+                self._estado[chave] = dict(valores)
+
+    def resumo(self) -> Dict[str, Dict[str, Any]]:
+        """Estado atual de cada mercado com falhas registradas."""
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                chave: {
+                    "falhas": estado["falhas"],
+                    "aberto": estado["aberto_ate"] is not None and agora < estado["aberto_ate"],
+                    "motivo": estado["motivo"]
+                }
+                for chave, estado in self._estado.items()
+            }
+
+
+disjuntor_mercados = DisjuntorMercados()
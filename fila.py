@@ -0,0 +1,274 @@
+# fila.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+
+class FilaTarefas:
+    """Interface da fila de scraping compartilhada entre os nós da API e os workers.
+
+    A API enfileira tarefas e lê status/progresso/resultado; os workers reservam tarefas,
+    publicam progresso e gravam o resultado final.
+    """
+
+    def enfileirar(self, task_id: str, parametros: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def reservar(self, worker_id: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        """Retorna a próxima tarefa ({"task_id", "parametros"}) ou None se nada chegou no timeout."""
+        raise NotImplementedError
+
+    def atualizar_progresso(self, task_id: str, percentual: float, mensagem: str) -> None:
+        raise NotImplementedError
+
+    def concluir(self, task_id: str, resultado: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def falhar(self, task_id: str, erro: str) -> None:
+        raise NotImplementedError
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Status, progresso, resultado e erro da tarefa, ou None se não existe."""
+        raise NotImplementedError
+
+
+class FilaSQLite(FilaTarefas):
+    """Fila em arquivo SQLite, compartilhável entre processos do mesmo host.
+
+    Tarefas em execução cujo worker parou de dar sinal por `tempo_reserva` segundos voltam a ser
+    reservadas por outro worker, que continua a partir do checkpoint do task_id.
+    """
+
+    def __init__(self, caminho: str, tempo_reserva: float = 900.0) -> None:
+        self.caminho = caminho
+        self.tempo_reserva = tempo_reserva
+        self._local = threading.local()
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pasta, exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute(
+                """CREATE TABLE IF NOT EXISTS tarefas (
+                    task_id TEXT PRIMARY KEY,
+                    parametros TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    percentual REAL NOT NULL DEFAULT 0,
+                    mensagem TEXT,
+                    resultado TEXT,
+                    erro TEXT,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )"""
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, criado_em)")
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def enfileirar(self, task_id: str, parametros: Dict[str, Any]) -> None:
+        agora = time.time()
+        self._conexao().execute(
+            """INSERT OR REPLACE INTO tarefas (task_id, parametros, status, percentual, mensagem, criado_em, atualizado_em)
+               VALUES (?, ?, ?, 0, 'Aguardando worker...', ?, ?)""",
+            (task_id, json.dumps(parametros, ensure_ascii=False), STATUS_PENDENTE, agora, agora)
+        )
+
+    def reservar(self, worker_id: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        limite = time.monotonic() + timeout
+        conexao = self._conexao()
+        while True:
+            agora = time.time()
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                linha = conexao.execute(
+                    """SELECT task_id, parametros FROM tarefas
+                       WHERE status = ? OR (status = ? AND atualizado_em < ?)
+                       ORDER BY criado_em LIMIT 1""",
+                    (STATUS_PENDENTE, STATUS_EXECUTANDO, agora - self.tempo_reserva)
+                ).fetchone()
+                if linha:
+                    conexao.execute(
+                        "UPDATE tarefas SET status = ?, worker_id = ?, atualizado_em = ? WHERE task_id = ?",
+                        (STATUS_EXECUTANDO, worker_id, agora, linha[0])
+                    )
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+            if linha:
+                return {"task_id": linha[0], "parametros": json.loads(linha[1])}
+            if time.monotonic() >= limite:
+                return None
+            time.sleep(min(0.5, max(0.0, limite - time.monotonic())))
+
+    def atualizar_progresso(self, task_id: str, percentual: float, mensagem: str) -> None:
+        self._conexao().execute(
+            "UPDATE tarefas SET percentual = ?, mensagem = ?, atualizado_em = ? WHERE task_id = ?",
+            (percentual, mensagem, time.time(), task_id)
+        )
+
+    def concluir(self, task_id: str, resultado: Dict[str, Any]) -> None:
+        self._conexao().execute(
+            "UPDATE tarefas SET status = ?, percentual = 100, resultado = ?, atualizado_em = ? WHERE task_id = ?",
+            (STATUS_CONCLUIDO, json.dumps(resultado, ensure_ascii=False), time.time(), task_id)
+        )
+
+    def falhar(self, task_id: str, erro: str) -> None:
+        self._conexao().execute(
+            "UPDATE tarefas SET status = ?, erro = ?, mensagem = ?, atualizado_em = ? WHERE task_id = ?",
+            (STATUS_ERRO, erro, f"Erro: {erro}", time.time(), task_id)
+        )
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        linha = self._conexao().execute(
+            "SELECT status, percentual, mensagem, resultado, erro FROM tarefas WHERE task_id = ?",
+            (task_id,)
+        ).fetchone()
+        if not linha:
+            return None
+        return {
+            "status": linha[0],
+            "percentual": linha[1],
+            "mensagem": linha[2],
+            "resultado": json.loads(linha[3]) if linha[3] else None,
+            "erro": linha[4]
+        }
+
+
+class FilaRedis(FilaTarefas):
+    """Fila em Redis para workers em outros hosts.
+
+    A reserva move a tarefa (BRPOPLPUSH) para a lista `<prefixo>:processando` e marca `reservado_em`;
+    o progresso renova a marca. Como na FilaSQLite, tarefas sem sinal por `tempo_reserva` segundos
+    voltam para a fila e outro worker continua a partir do checkpoint. Usa só comandos de lista e de
+    hash, então qualquer cliente com essa interface (um Redis local ou um substituto em memória como o
+    fakeredis) pode ser passado em `cliente`.
+    """
+
+    def __init__(self, url: Optional[str] = None, prefixo: str = "ifood", cliente: Any = None, tempo_reserva: float = 900.0) -> None:
+        if cliente is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("O pacote 'redis' é necessário para usar FilaRedis (pip install redis).") from e
+            cliente = redis.Redis.from_url(url, decode_responses=True)
+        self.cliente = cliente
+        self.chave_fila = f"{prefixo}:fila"
+        self.chave_processando = f"{prefixo}:processando"
+        self.prefixo = prefixo
+        self.tempo_reserva = tempo_reserva
+
+    def _chave(self, task_id: str) -> str:
+        return f"{self.prefixo}:tarefa:{task_id}"
+
+    def enfileirar(self, task_id: str, parametros: Dict[str, Any]) -> None:
+        self.cliente.hset(self._chave(task_id), mapping={
+            "status": STATUS_PENDENTE,
+            "percentual": 0,
+            "mensagem": "Aguardando worker...",
+            "parametros": json.dumps(parametros, ensure_ascii=False)
+        })
+        self.cliente.lpush(self.chave_fila, task_id)
+
+    def reservar(self, worker_id: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        self.recuperar_expiradas()
+        task_id = self.cliente.brpoplpush(self.chave_fila, self.chave_processando, timeout=max(1, int(timeout)))
+        if not task_id:
+            return None
+        if isinstance(task_id, bytes):
+            task_id = task_id.decode("utf-8")
+        dados = self._hgetall(task_id)
+        self.cliente.hset(self._chave(task_id), mapping={
+            "status": STATUS_EXECUTANDO, "worker_id": worker_id, "reservado_em": time.time()
+        })
+        return {"task_id": task_id, "parametros": json.loads(dados.get("parametros", "{}"))}
+
+    def recuperar_expiradas(self) -> int:
+        """Devolve à fila as tarefas em processamento cujo worker parou de dar sinal; retorna quantas."""
+        agora = time.time()
+        recuperadas = 0
+        for task_id in self.cliente.lrange(self.chave_processando, 0, -1):
+            if isinstance(task_id, bytes):
+                task_id = task_id.decode("utf-8")
+            dados = self._hgetall(task_id)
+            if dados.get("status") in (STATUS_CONCLUIDO, STATUS_ERRO) or not dados:
+                self.cliente.lrem(self.chave_processando, 0, task_id)
+                continue
+            if "reservado_em" not in dados:
+                # Worker caiu entre mover a tarefa e marcar a reserva: a contagem começa agora
+                self.cliente.hsetnx(self._chave(task_id), "reservado_em", agora)
+                continue
+            if float(dados["reservado_em"]) >= agora - self.tempo_reserva:
+                continue
+            # Só quem remove a entrada a devolve, então dois workers não duplicam a tarefa
+            if self.cliente.lrem(self.chave_processando, 1, task_id):
+                self.cliente.hset(self._chave(task_id), mapping={"status": STATUS_PENDENTE, "mensagem": "Aguardando worker..."})
+                self.cliente.hdel(self._chave(task_id), "reservado_em")
+                # RPUSH: a tarefa recuperada é a próxima a sair (a fila consome pela direita)
+                self.cliente.rpush(self.chave_fila, task_id)
+                logger.warning(f"Tarefa {task_id} sem sinal do worker {dados.get('worker_id')} há mais de {self.tempo_reserva:.0f}s; devolvida à fila")
+                recuperadas += 1
+        return recuperadas
+
+    def atualizar_progresso(self, task_id: str, percentual: float, mensagem: str) -> None:
+        self.cliente.hset(self._chave(task_id), mapping={"percentual": percentual, "mensagem": mensagem, "reservado_em": time.time()})
+
+    def concluir(self, task_id: str, resultado: Dict[str, Any]) -> None:
+        self.cliente.hset(self._chave(task_id), mapping={
+            "status": STATUS_CONCLUIDO,
+            "percentual": 100,
+            "resultado": json.dumps(resultado, ensure_ascii=False)
+        })
+        self.cliente.lrem(self.chave_processando, 0, task_id)
+
+    def falhar(self, task_id: str, erro: str) -> None:
+        self.cliente.hset(self._chave(task_id), mapping={"status": STATUS_ERRO, "erro": erro, "mensagem": f"Erro: {erro}"})
+        self.cliente.lrem(self.chave_processando, 0, task_id)
+
+    def _hgetall(self, task_id: str) -> Dict[str, str]:
+        dados = self.cliente.hgetall(self._chave(task_id)) or {}
+        return {
+            (k.decode("utf-8") if isinstance(k, bytes) else k): (v.decode("utf-8") if isinstance(v, bytes) else v)
+            for k, v in dados.items()
+        }
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        dados = self._hgetall(task_id)
+        if not dados:
+            return None
+        return {
+            "status": dados.get("status"),
+            "percentual": float(dados.get("percentual", 0)),
+            "mensagem": dados.get("mensagem"),
+            "resultado": json.loads(dados["resultado"]) if dados.get("resultado") else None,
+            "erro": dados.get("erro")
+        }
+
+
+def criar_fila(url: str) -> FilaTarefas:
+    """Cria a fila a partir de uma URL: 'sqlite:///caminho/fila.db' ou 'redis://host:6379/0'."""
+    esquema = urlparse(url).scheme
+    if esquema == "sqlite":
+        caminho = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):]
+        return FilaSQLite(caminho)
+    if esquema in ("redis", "rediss"):
+        return FilaRedis(url)
+    raise ValueError(f"Backend de fila não suportado: {url}")
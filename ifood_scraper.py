@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Any
+from typing import Iterator, List, Dict, Optional, Any
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
@@ -9,16 +9,33 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from urllib3.exceptions import InsecureRequestWarning
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, stop_any, wait_exponential, retry_if_exception_type
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from progresso import progresso_lock , progresso_por_task
+from progresso import (
+    STATUS_CONCLUIDO, STATUS_ERRO, armazenamento, atualizar_progresso, definir_status,
+    limpar_task, publicar_evento, registrar_ouvinte
+)
+from fila import FilaTarefas, criar_fila
+from checkpoint import CheckpointScraping
+from disjuntor import disjuntor_mercados
+from limitador import limitador
+from motor_custos import MatrizPrecos
+from otimizador_multi import calcular_melhor_compra_multi
+from parser_produtos import analisar_produto, compilar_filtro
+from relevancia import compilar_indice
+from catalogo import SnapshotCatalogo, armazem_catalogos
+from cache_itens import cache_itens
+from supervisor import encerrar_processos, executar_isolado, processos_descendentes, rss_arvore
+from logs import configurar_logging, contexto_tarefa, registrar_html
+from perfilador import executar_com_perfil
+from rastreamento import instrumentar_driver, rastrear_tarefa
+from localizacao import Localizacao, resolver_localizacao
+from metricas import acertos_cache, cronometrado, drivers_ativos, medir_fase, paginas_carregadas, registrar_retentativa, tempos_da_tarefa
 from datetime import datetime
 import os
 import logging
 import argparse
-import re
-import random
 import time
 import requests
 import warnings
@@ -29,15 +46,13 @@ import subprocess  # Adicionado aqui
 import tempfile
 import shutil
 import platform
+import contextvars
+import atexit
+import threading
 if platform.system() != "Windows":
     from xvfbwrapper import Xvfb
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("./ifood_scraping.log", mode='w'), logging.StreamHandler()]
-)
+# Os handlers (fila + arquivo rotativo) são configurados por configurar_logging no main ou na API, não na importação
 logger = logging.getLogger(__name__)
 
 warnings.simplefilter("ignore", InsecureRequestWarning)
@@ -54,27 +69,50 @@ def carregar_config(caminho_config: str = "./config.yaml") -> Dict[str, Any]:
         logger.error(f"Erro ao carregar configuração: {e}")
         raise
 
+def navegar(driver: webdriver.Chrome, url: str) -> None:
+    """Abre a URL no driver respeitando o limitador de taxa do host."""
+    with limitador.requisicao(url):
+        driver.get(url)
+    driver.paginas_carregadas = getattr(driver, "paginas_carregadas", 0) + 1
+    paginas_carregadas.inc()
+
+# Campos aceitos por add_cookie (get_cookies devolve também campos só de leitura)
+CAMPOS_COOKIE = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")
+
+# type_search -> chave de `urls` no config
+TIPOS_BUSCA = {
+    "M": "markets",
+    "P": "pharmacies",
+    "R": "restaurants",
+    "D": "drinks"
+}
+
+def separar_tipos_busca(type_search: str) -> List[str]:
+    """Tipos de busca de um type_search como "M,D" (sem repetições, na ordem informada)."""
+    tipos = list(dict.fromkeys(tipo.strip() for tipo in type_search.split(",") if tipo.strip()))
+    if len(tipos) > 1:
+        desconhecidos = [tipo for tipo in tipos if tipo not in TIPOS_BUSCA]
+        if desconhecidos:
+            raise ValueError(f"Tipos de busca desconhecidos: {', '.join(desconhecidos)}. Use {', '.join(TIPOS_BUSCA)}.")
+    return tipos or [type_search]
+
+def url_lista(type_search: str, config: Dict[str, Any]) -> Optional[str]:
+    """URL da lista de estabelecimentos do tipo de busca."""
+    return config["urls"].get(TIPOS_BUSCA.get(type_search, "markets"))
+
+@cronometrado("validar_seletores")
 def validar_seletores(type_search: str, driver: webdriver.Chrome, config: Dict[str, Any]) -> bool:
     """Valida se os seletores do config.yaml estão funcionando."""
     try:
-        # Mapear type_search para a chave correta no config
-        type_mapping = {
-            "M": "markets",
-            "P": "pharmacies",
-            "R": "restaurants",
-            "D": "drinks"
-        }
-        config_key = type_mapping.get(type_search, "markets")
-        
-        url = config["urls"].get(config_key)
+        url = url_lista(type_search, config)
         if not url:
             logger.error(f"URL não encontrada para type_search='{type_search}' no config.yaml")
             return False
         
         logger.info(f"Navegando para {url} para validar seletores...")
-        driver.get(url)
+        navegar(driver, url)
         time.sleep(2)  # Dar tempo para a página carregar
-        logger.info(f"HTML inicial da página: {driver.page_source[:2000]}")  # Log para debug
+        registrar_html(driver, "HTML inicial da página", registrador=logger)
         
         location_button_selector = config["selectors"]["location_button"]
         logger.info(f"Esperando o elemento com classe '{location_button_selector}'...")
@@ -85,7 +123,7 @@ def validar_seletores(type_search: str, driver: webdriver.Chrome, config: Dict[s
         return True
     except TimeoutException as e:
         logger.error(f"Seletores do config.yaml não encontrados: {e}")
-        logger.info(f"HTML da página: {driver.page_source[:2000]}")
+        registrar_html(driver, "HTML da página", falha=True, registrador=logger)
         return False
     except Exception as e:
         logger.error(f"Erro inesperado ao validar seletores: {e}")
@@ -177,7 +215,8 @@ def configurar_driver(headless: bool = True) -> webdriver.Chrome:
             logger.warning(f"Erro ao limpar user-data-dir {user_data_dir}: {e}")
 '''
 
-def configurar_driver(headless: bool = True) -> webdriver.Chrome:
+@cronometrado("configurar_driver")
+def configurar_driver(headless: bool = True, limpeza_global: bool = True) -> webdriver.Chrome:
     import subprocess
     import random
     import tempfile
@@ -185,8 +224,9 @@ def configurar_driver(headless: bool = True) -> webdriver.Chrome:
     # Usar headless=True para Docker
     headless = True
     
-    # Limpar processos e arquivos residuais
-    if platform.system() != "Windows":
+    # Limpar processos e arquivos residuais. Com scrapes isolados em processos próprios a limpeza
+    # global é desligada, pois mataria o Chrome das outras tarefas; cada supervisor reapa o seu.
+    if limpeza_global and platform.system() != "Windows":
         try:
             subprocess.run(["killall", "-9", "chrome"], check=False)
             subprocess.run(["killall", "-9", "chromedriver"], check=False)
@@ -251,10 +291,11 @@ def configurar_driver(headless: bool = True) -> webdriver.Chrome:
 
     try:
         time.sleep(2)
-        driver = webdriver.Chrome(service=servico, options=chrome_options)
+        driver = instrumentar_driver(webdriver.Chrome(service=servico, options=chrome_options))
         driver.set_window_size(1280, 720)
         # Remover a propriedade webdriver para evitar detecção
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        drivers_ativos.inc()
         logger.info(f"Driver configurado com sucesso (headless={headless}).")
         return driver
     except WebDriverException as e:
@@ -284,12 +325,35 @@ def limpar_diretorio_imagens(pasta: str = "imagens_ifood") -> None:
         os.makedirs(pasta)
         logger.info(f"Diretório {pasta} criado, pois não existia.")
 
+def pasta_da_tarefa(pasta: str, task_id: str) -> str:
+    """Subpasta própria do task_id, para tarefas simultâneas não apagarem nem sobrescreverem as imagens umas das outras."""
+    return os.path.join(pasta, "".join(c for c in task_id if c.isalnum() or c in "_-")[:100])
+
+def remover_saidas_antigas(pasta: str, retencao_horas: float) -> None:
+    """Apaga as saídas por tarefa (arquivos e subpastas de imagens) modificadas há mais de `retencao_horas`."""
+    if not os.path.isdir(pasta):
+        return
+    limite = time.time() - retencao_horas * 3600
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) >= limite:
+                continue
+            if os.path.isdir(caminho):
+                shutil.rmtree(caminho, ignore_errors=True)
+            else:
+                os.remove(caminho)
+            logger.info(f"Saída antiga removida: {caminho}")
+        except OSError as e:
+            logger.warning(f"Não foi possível remover a saída antiga {caminho}: {e}")
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
     retry=retry_if_exception_type((TimeoutException, WebDriverException)),
-    before_sleep=lambda retry_state: logger.info(f"Tentativa {retry_state.attempt_number} falhou, retrying...")
+    before_sleep=registrar_retentativa("definir_localizacao_automatica")
 )
+@cronometrado("definir_localizacao")
 def definir_localizacao_automatica(type_search: str, driver: webdriver.Chrome, config: Optional[Dict[str, Any]] = None) -> None:
     """Clica no botão 'Usar minha localização' e espera a lista de mercados carregar."""
     if config is None:
@@ -307,7 +371,7 @@ def definir_localizacao_automatica(type_search: str, driver: webdriver.Chrome, c
         logger.info("Botão de localização clicado, aguardando resposta...")
         time.sleep(5)  # Dar tempo para a ação ser processada
         
-        logger.info(f"HTML após clique no botão: {driver.page_source[:2000]}")
+        registrar_html(driver, "HTML após clique no botão", registrador=logger)
         
         logger.info("Aguardando a lista de mercados carregar...")
         WebDriverWait(driver, 30, poll_frequency=0.2).until(  # Aumentado para 30 segundos
@@ -317,12 +381,13 @@ def definir_localizacao_automatica(type_search: str, driver: webdriver.Chrome, c
         
     except TimeoutException as e:
         logger.error(f"Erro ao definir localização automática: {e}")
-        logger.info(f"HTML da página: {driver.page_source[:2000]}")
+        registrar_html(driver, "HTML da página", falha=True, registrador=logger)
         raise
     except WebDriverException as e:
         logger.error(f"Erro de WebDriver ao definir localização: {e}")
         raise
 
+@cronometrado("rolar_pagina")
 def rolar_pagina(driver: webdriver.Chrome, max_items: int, classe_cards: str) -> List[Any]:
     """Rola a página até carregar o número desejado de itens e retorna os elementos."""
     logger.info(f"Rolando a página para carregar até {max_items} itens...")
@@ -343,6 +408,15 @@ def rolar_pagina(driver: webdriver.Chrome, max_items: int, classe_cards: str) ->
         altura_atual += 500
         time.sleep(0.1)
 
+def url_imagem_local(caminho: str) -> str:
+    """Caminho servido pela API (/imagens_ifood) para uma imagem gravada na pasta de imagens ou em uma subpasta dela."""
+    partes = os.path.abspath(caminho).split(os.sep)
+    if "imagens_ifood" in partes:
+        inicio = len(partes) - partes[::-1].index("imagens_ifood")
+        return "/imagens_ifood/" + "/".join(partes[inicio:])
+    return f"/imagens_ifood/{os.path.basename(caminho)}"
+
+@cronometrado("baixar_imagem")
 def baixar_imagem(url_imagem: Optional[str], nome_arquivo: str, pasta: str = "imagens_ifood") -> Optional[str]:
     """Baixa a imagem da URL ou decodifica base64 e salva localmente sem alterar o fundo."""
     if url_imagem is None:
@@ -365,19 +439,21 @@ def baixar_imagem(url_imagem: Optional[str], nome_arquivo: str, pasta: str = "im
             with open(caminho_final, "wb") as f:
                 f.write(imagem_data)
             logger.info(f"Imagem base64 salva em: {caminho_final}")
-            return f"/imagens_ifood/{nome_arquivo}.png"  # Caminho relativo para o FastAPI
+            return url_imagem_local(caminho_final)  # Caminho relativo para o FastAPI
         except Exception as e:
             logger.error(f"Erro ao decodificar imagem base64 {imagem_url[:50]}...: {e}")
             return None
 
     try:
-        response = requests.get(imagem_url, timeout=10, verify=False)
-        response.raise_for_status()
+        with limitador.requisicao(imagem_url) as registro:
+            response = requests.get(imagem_url, timeout=10, verify=False)
+            registro.status = response.status_code
+            response.raise_for_status()
         
         with open(caminho_final, "wb") as f:
             f.write(response.content)
         logger.info(f"Imagem salva em: {caminho_final}")
-        return f"/imagens_ifood/{nome_arquivo}.png"  # Caminho relativo para o FastAPI
+        return url_imagem_local(caminho_final)  # Caminho relativo para o FastAPI
     except requests.exceptions.SSLError as e:
         logger.error(f"Erro SSL ao baixar a imagem {imagem_url}: {e}")
         return None
@@ -385,11 +461,13 @@ def baixar_imagem(url_imagem: Optional[str], nome_arquivo: str, pasta: str = "im
         logger.error(f"Erro ao baixar a imagem {imagem_url}: {e}")
         return None
 
+@cronometrado("baixar_imagens")
 def baixar_imagens_em_paralelo(imagens: List[Dict[str, str]], pasta: str = "imagens_ifood") -> None:
     """Baixa várias imagens em paralelo usando threads."""
     with ThreadPoolExecutor(max_workers=4) as executor:
         futures = {
-            executor.submit(baixar_imagem, img["url"], img["nome"], pasta): img
+            # Cada thread roda numa cópia do contexto para somar ao detalhamento de tempos da tarefa
+            executor.submit(contextvars.copy_context().run, baixar_imagem, img["url"], img["nome"], pasta): img
             for img in imagens if img["url"]
         }
         for future in as_completed(futures):
@@ -400,12 +478,165 @@ def baixar_imagens_em_paralelo(imagens: List[Dict[str, str]], pasta: str = "imag
                 logger.error(f"Erro ao baixar imagem {img_data['url']}: {e}")
                 img_data["caminho"] = None
 
+def processar_card(
+    item: Any,
+    id_produto: int,
+    nome_produto: Optional[str],
+    relevancia: Optional[float],
+    filtro: Any,
+    nome_mercado: str,
+    imagens_para_baixar: List[Dict[str, Any]],
+    config: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Extrai preço, detalhes e imagem de um card; retorna None se o produto não passa no filtro de tamanho."""
+    try:
+        produto_data: Dict[str, Any] = {"id": id_produto}
+        
+        nome_produto = nome_produto if nome_produto is not None else "Nome não encontrado"
+        produto_data["nome"] = nome_produto
+        if relevancia is not None:
+            produto_data["relevancia"] = round(relevancia, 3)
+        
+        try:
+            produto_data["preco"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['price']}").text
+        except NoSuchElementException:
+            produto_data["preco"] = "Não disponível"
+        
+        try:
+            produto_data["detalhes"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['details']}").text
+        except NoSuchElementException:
+            produto_data["detalhes"] = "Não disponível"
+        
+        info = analisar_produto(nome_produto, produto_data["detalhes"], produto_data["preco"])
+        if not filtro.aceita(info):
+            return None
+        produto_data["medida"] = info.como_dict()
+        
+        try:
+            imagem_url = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['image']}").get_attribute("src")
+            produto_data["imagem_url"] = imagem_url
+            imagens_para_baixar.append({"url": imagem_url, "nome": f"produto_{nome_mercado}_{nome_produto}", "caminho": None, "produto": produto_data})
+        except NoSuchElementException:
+            produto_data["imagem_url"] = None
+            logger.warning(f"Imagem não encontrada para o produto {produto_data['nome']} em {nome_mercado}")
+        return produto_data
+    
+    except Exception as e:
+        logger.error(f"Erro ao processar produto {id_produto}: {e}")
+        return None
+
+def rolar_em_lotes(driver: webdriver.Chrome, max_items: int, classe_cards: str) -> Iterator[List[Any]]:
+    """Como rolar_pagina, mas entrega os cards novos a cada rolagem para o chamador poder parar antes."""
+    vistos = 0
+    altura_atual = 0
+    while vistos < max_items:
+        items = driver.find_elements(By.CLASS_NAME, classe_cards)
+        if len(items) > vistos:
+            novos = items[vistos:max_items]
+            vistos += len(novos)
+            yield novos
+            continue
+        
+        altura_total = driver.execute_script("return document.body.scrollHeight")
+        if altura_atual >= altura_total:
+            logger.info("Fim da página alcançado.")
+            return
+        
+        driver.execute_script("window.scrollBy(0, 500);")
+        altura_atual += 500
+        time.sleep(0.1)
+
+def candidatos_por_relevancia(driver: webdriver.Chrome, termo_principal: str, max_produtos: int, config: Dict[str, Any]) -> List[tuple]:
+    """(card, nome, relevância) dos max_produtos primeiros cards, na ordem em que devem ser extraídos.
+
+    Os nomes vêm de uma única leitura barata; com relevância, os cards são ordenados pela pontuação
+    do nome e os que não tratam do item são descartados antes de ler preço e imagem.
+    """
+    items = rolar_pagina(driver, max_produtos, config["selectors"]["products"]["card"])
+    logger.info(f"Total de produtos encontrados para '{termo_principal}': {len(items)}")
+    nomes = ler_nomes_cards(driver, items, config["selectors"]["products"]["name"])
+    config_relevancia = config.get("relevancia", {})
+    if not config_relevancia.get("habilitado", False):
+        return [(item, nome, None) for item, nome in zip(items, nomes)]
+    ranking = compilar_indice(termo_principal).ranquear(nomes, float(config_relevancia.get("limiar", 0.5)))
+    return [(items[posicao], nomes[posicao], relevancia) for posicao, relevancia in ranking]
+
+def pagina_do_mercado_ativa(driver: webdriver.Chrome, url_mercado: str, config: Dict[str, Any]) -> bool:
+    """A aba está na página do mercado, carregada e com o campo de busca? (sem esperar o implicit wait)"""
+    try:
+        url_atual = driver.current_url.split("#")[0].split("?")[0].rstrip("/")
+        if not url_atual.startswith(url_mercado.split("?")[0].rstrip("/")):
+            return False
+        return bool(driver.execute_script(
+            "return document.readyState === 'complete' && document.getElementsByClassName(arguments[0]).length > 0;",
+            config["selectors"]["products"]["search_field"]
+        ))
+    except WebDriverException:
+        return False
+
+def estado_resultados(driver: webdriver.Chrome, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Primeiro card e texto do total de resultados atuais, para detectar quando a lista mudar."""
+    seletores = config["selectors"]["products"]
+    primeiro, texto = driver.execute_script(
+        "const c = document.getElementsByClassName(arguments[0]); const t = document.getElementsByClassName(arguments[1]);"
+        "return [c.length ? c[0] : null, t.length ? t[0].innerText : null];",
+        seletores["card"], seletores["total_records"]
+    )
+    return {"primeiro_card": primeiro, "total": texto}
+
+def aguardar_novos_resultados(driver: webdriver.Chrome, marcador: Dict[str, Any], config: Dict[str, Any]) -> bool:
+    """Espera o primeiro card antigo sair do DOM ou o total de resultados mudar; False se nada mudou."""
+    def mudou(d: webdriver.Chrome) -> bool:
+        if marcador["primeiro_card"] is not None and EC.staleness_of(marcador["primeiro_card"])(d):
+            return True
+        return estado_resultados(d, config)["total"] != marcador["total"]
+    try:
+        WebDriverWait(driver, config.get("navegacao", {}).get("espera_resultados", 5), poll_frequency=0.1).until(mudou)
+        return True
+    except TimeoutException:
+        return False
+
+def pesquisar_no_mercado(driver: webdriver.Chrome, termo: str, config: Dict[str, Any]) -> None:
+    """Limpa o campo de busca do mercado, digita o termo e envia."""
+    campo_pesquisa = WebDriverWait(driver, 10, poll_frequency=0.2).until(
+        EC.presence_of_element_located((By.CLASS_NAME, config["selectors"]["products"]["search_field"]))
+    )
+    campo_pesquisa.clear()
+    # clear() nem sempre zera inputs controlados pelo React quando a página é reutilizada
+    campo_pesquisa.send_keys(Keys.CONTROL, "a")
+    campo_pesquisa.send_keys(Keys.DELETE)
+    campo_pesquisa.send_keys(termo)
+    WebDriverWait(driver, 2, poll_frequency=0.1).until(
+        EC.element_to_be_clickable((By.CLASS_NAME, config["selectors"]["products"]["search_field"]))
+    )
+    campo_pesquisa.send_keys(Keys.ENTER)
+
+def ler_nomes_cards(driver: webdriver.Chrome, items: List[Any], classe_nome: str) -> List[Optional[str]]:
+    """Nomes de todos os cards em uma única chamada ao navegador (None onde o card não tem nome)."""
+    if not items:
+        return []
+    try:
+        return driver.execute_script(
+            "return arguments[0].map(c => { const e = c.querySelector(arguments[1]); return e ? e.innerText : null; });",
+            items, f".{classe_nome}"
+        )
+    except WebDriverException as e:
+        logger.warning(f"Leitura em lote dos nomes falhou, lendo card a card: {resumir_erro(e)}")
+    nomes: List[Optional[str]] = []
+    for item in items:
+        try:
+            nomes.append(item.find_element(By.CSS_SELECTOR, f".{classe_nome}").text)
+        except NoSuchElementException:
+            nomes.append(None)
+    return nomes
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
     retry=retry_if_exception_type((TimeoutException, WebDriverException)),
-    before_sleep=lambda retry_state: logger.info(f"Tentativa {retry_state.attempt_number} falhou, retrying...")
+    before_sleep=registrar_retentativa("scrape_produtos_mercado")
 )
+@cronometrado("scrape_produtos_mercado")
 def scrape_produtos_mercado(
     driver: webdriver.Chrome,
     nome_mercado: str,
@@ -420,23 +651,26 @@ def scrape_produtos_mercado(
         config = carregar_config()
     produtos: List[Dict[str, Any]] = []
     try:
-        logger.info(f"Acessando o mercado: {url_mercado}")
-        driver.get(url_mercado)
+        # O tamanho pedido ("350", "1l", "6x350ml") vira um filtro sobre a medida extraída de cada produto
+        filtro = compilar_filtro(item_pesquisa)
+        termo_principal = filtro.termo_principal
         
-        termos = item_pesquisa.split()
-        termo_principal = " ".join([t for t in termos if not t.isdigit()])
-        filtro_num = next((t for t in termos if t.isdigit()), None)
+        # Entre itens do mesmo mercado a página continua aberta: basta refazer a busca
+        reutilizar = config.get("navegacao", {}).get("reutilizar_pagina", False) and pagina_do_mercado_ativa(driver, url_mercado, config)
+        marcador = None
+        if reutilizar:
+            logger.info(f"Reutilizando a página aberta de {nome_mercado}")
+            marcador = estado_resultados(driver, config)
+        else:
+            logger.info(f"Acessando o mercado: {url_mercado}")
+            navegar(driver, url_mercado)
         
-        logger.info(f"Pesquisando por '{termo_principal}' em {nome_mercado} (filtro numérico: {filtro_num})")
-        campo_pesquisa = WebDriverWait(driver, 10, poll_frequency=0.2).until(
-            EC.presence_of_element_located((By.CLASS_NAME, config["selectors"]["products"]["search_field"]))
-        )
-        campo_pesquisa.clear()
-        campo_pesquisa.send_keys(termo_principal)
-        WebDriverWait(driver, 2, poll_frequency=0.1).until(
-            EC.element_to_be_clickable((By.CLASS_NAME, config["selectors"]["products"]["search_field"]))
-        )
-        campo_pesquisa.send_keys(Keys.ENTER)
+        logger.info(f"Pesquisando por '{termo_principal}' em {nome_mercado} (filtro de tamanho: {filtro.texto})")
+        pesquisar_no_mercado(driver, termo_principal, config)
+        if marcador is not None and not aguardar_novos_resultados(driver, marcador, config):
+            logger.info(f"Resultados de {nome_mercado} não mudaram após a busca; recarregando a página do mercado.")
+            navegar(driver, url_mercado)
+            pesquisar_no_mercado(driver, termo_principal, config)
         
         logger.info("Aguardando primeiros resultados da pesquisa...")
         wait = WebDriverWait(driver, 10)
@@ -458,57 +692,19 @@ def scrape_produtos_mercado(
             EC.presence_of_element_located((By.CLASS_NAME, config["selectors"]["products"]["card"]))
         )
         
-        items = rolar_pagina(driver, max_produtos, config["selectors"]["products"]["card"])
-        
-        logger.info(f"Total de produtos encontrados para '{termo_principal}': {len(items)}")
-        
-        imagens_para_baixar = []
-        for i, item in enumerate(items, 1):
-            try:
-                produto_data: Dict[str, Any] = {"id": i}
-                
-                try:
-                    nome_produto = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['name']}").text
-                    produto_data["nome"] = nome_produto
-                except NoSuchElementException:
-                    nome_produto = "Nome não encontrado"
-                    produto_data["nome"] = nome_produto
-                
-                try:
-                    produto_data["preco"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['price']}").text
-                except NoSuchElementException:
-                    produto_data["preco"] = "Não disponível"
-                
-                try:
-                    produto_data["detalhes"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['details']}").text
-                except NoSuchElementException:
-                    produto_data["detalhes"] = "Não disponível"
-                
-                if filtro_num:
-                    padroes = [filtro_num, f"{filtro_num}ml", f"{filtro_num}g", f"{filtro_num} gramas", f"{filtro_num} gr"]
-                    if not any(re.search(r'\b' + re.escape(p) + r'\b', nome_produto.lower()) for p in padroes):
-                        continue
-                
-                if len(produtos) < max_produtos:
-                    try:
-                        imagem_url = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['products']['image']}").get_attribute("src")
-                        produto_data["imagem_url"] = imagem_url
-                        imagens_para_baixar.append({"url": imagem_url, "nome": f"produto_{nome_mercado}_{nome_produto}", "caminho": None})
-                    except NoSuchElementException:
-                        produto_data["imagem_url"] = None
-                        logger.warning(f"Imagem não encontrada para o produto {produto_data['nome']} em {nome_mercado}")
-                    
-                    produtos.append(produto_data)
-                    logger.info(f"Produto {len(produtos)} processado: {produto_data['nome']}")
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar produto {i}: {e}")
-                continue
-        
+        imagens_para_baixar: List[Dict[str, Any]] = []
+        for i, (item, nome, relevancia) in enumerate(candidatos_por_relevancia(driver, termo_principal, max_produtos, config), 1):
+            if len(produtos) >= max_produtos:
+                break
+            produto_data = processar_card(item, i, nome, relevancia, filtro, nome_mercado, imagens_para_baixar, config)
+            if produto_data is not None:
+                produtos.append(produto_data)
+                logger.info(f"Produto {len(produtos)} processado: {produto_data['nome']}")
+    
         if imagens_para_baixar:
             baixar_imagens_em_paralelo(imagens_para_baixar, imagens_pasta)
-            for produto, img_data in zip(produtos, imagens_para_baixar):
-                produto["imagem_local"] = img_data["caminho"]
+            for img_data in imagens_para_baixar:
+                img_data["produto"]["imagem_local"] = img_data["caminho"]
         
         logger.info(f"Total de produtos filtrados: {len(produtos)}")
         return produtos
@@ -519,12 +715,508 @@ def scrape_produtos_mercado(
     except WebDriverException as e:
         logger.error(f"Erro de WebDriver ao raspar produtos do mercado {url_mercado}: {e}")
         raise
+
+def ler_dados_cards(driver: webdriver.Chrome, items: List[Any], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Nome, preço, detalhes e imagem de vários cards em uma única chamada ao navegador."""
+    seletores = config["selectors"]["products"]
+    valores = driver.execute_script(
+        "const texto = (c, s) => { const e = c.querySelector(s); return e ? e.innerText : null; };"
+        "return arguments[0].map(c => { const img = c.querySelector(arguments[4]);"
+        " return [texto(c, arguments[1]), texto(c, arguments[2]), texto(c, arguments[3]), img ? img.getAttribute('src') : null]; });",
+        items, f".{seletores['name']}", f".{seletores['price']}", f".{seletores['details']}", f".{seletores['image']}"
+    )
+    return [
+        {
+            "nome": nome or "Nome não encontrado",
+            "preco": preco or "Não disponível",
+            "detalhes": detalhes or "Não disponível",
+            "imagem_url": imagem_url
+        }
+        for nome, preco, detalhes, imagem_url in valores
+    ]
+
+def carregar_catalogo_mercado(driver: webdriver.Chrome, url_mercado: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Abre a listagem do mercado uma vez e extrai todos os cards carregados pela rolagem."""
+    config_catalogo = config.get("catalogo", {})
+    url_listagem = url_mercado + config_catalogo.get("sufixo_url", "")
+    logger.info(f"Carregando catálogo completo de {url_listagem}")
+    navegar(driver, url_listagem)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, config["selectors"]["products"]["card"]))
+    )
+    produtos: List[Dict[str, Any]] = []
+    for lote in rolar_em_lotes(driver, int(config_catalogo.get("max_cards", 3000)), config["selectors"]["products"]["card"]):
+        produtos.extend(ler_dados_cards(driver, lote, config))
+    logger.info(f"Catálogo de {url_mercado}: {len(produtos)} produtos")
+    return produtos
+
+def obter_catalogo(driver: webdriver.Chrome, mercado_data: Dict[str, Any], config: Dict[str, Any]) -> Optional[SnapshotCatalogo]:
+    """Snapshot válido do catálogo do mercado, carregando do site se não houver; None se o carregamento falhar."""
+    snapshot = armazem_catalogos.obter(mercado_data["url"])
+    acertos_cache.inc(cache="catalogo", resultado="acerto" if snapshot is not None else "falta")
+    if snapshot is not None:
+        logger.info(f"Usando snapshot do catálogo de {mercado_data['nome']} ({len(snapshot.produtos)} produtos)")
+        return snapshot
+    try:
+        produtos = carregar_catalogo_mercado(driver, mercado_data["url"], config)
+    except (TimeoutException, WebDriverException) as e:
+        logger.warning(f"Catálogo de {mercado_data['nome']} indisponível, pesquisando item a item: {resumir_erro(e)}")
+        return None
+    if not produtos:
+        return None
+    return armazem_catalogos.salvar(mercado_data["url"], produtos)
+
+def buscar_no_catalogo(
+    snapshot: SnapshotCatalogo,
+    nome_mercado: str,
+    item_pesquisa: str,
+    max_produtos: int,
+    imagens_pasta: str,
+    config: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Responde um item com o snapshot em memória e baixa só as imagens dos produtos escolhidos."""
+    produtos = snapshot.buscar(item_pesquisa, max_produtos, float(config.get("relevancia", {}).get("limiar", 0.5)))
+    imagens = [
+        {"url": p["imagem_url"], "nome": f"produto_{nome_mercado}_{p['nome']}", "caminho": None, "produto": p}
+        for p in produtos if p.get("imagem_url")
+    ]
+    if imagens:
+        baixar_imagens_em_paralelo(imagens, imagens_pasta)
+        for img_data in imagens:
+            img_data["produto"]["imagem_local"] = img_data["caminho"]
+    logger.info(f"'{item_pesquisa}' em {nome_mercado} respondido pelo catálogo local: {len(produtos)} produtos")
+    return produtos
+
+def resumir_erro(erro: BaseException) -> str:
+    """Primeira linha da mensagem de erro, sem o stacktrace que o Selenium anexa."""
+    mensagem = str(erro).strip().splitlines()
+    return f"{type(erro).__name__}: {mensagem[0]}" if mensagem else type(erro).__name__
+
+def scrape_produtos_com_disjuntor(
+    driver: webdriver.Chrome,
+    nome_mercado: str,
+    url_mercado: str,
+    item_pesquisa: str,
+    max_produtos: int = 10,
+    imagens_pasta: str = "imagens_ifood",
+    config: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Chama scrape_produtos_mercado com o orçamento de tentativas do config, registrando cada falha
+    no disjuntor do mercado e desistindo assim que ele abrir."""
+    if config is None:
+        config = carregar_config()
+    tentativas = int(config.get("resiliencia", {}).get("tentativas_por_item", 3))
+
+    def registrar_falha(retry_state) -> None:
+        disjuntor_mercados.registrar_falha(url_mercado, resumir_erro(retry_state.outcome.exception()))
+
+    produtos = scrape_produtos_mercado.retry_with(
+        stop=stop_any(
+            stop_after_attempt(tentativas),
+            lambda retry_state: disjuntor_mercados.motivo_abertura(url_mercado) is not None
+        ),
+        after=registrar_falha,
+        reraise=True
+    )(driver, nome_mercado, url_mercado, item_pesquisa, max_produtos, imagens_pasta, config)
+    disjuntor_mercados.registrar_sucesso(url_mercado)
+    return produtos
     
+def iniciar_sessao(
+    type_search: str,
+    config: Dict[str, Any],
+    localizacao: Optional[Localizacao] = None,
+    limpeza_global: Optional[bool] = None
+) -> webdriver.Chrome:
+    """Abre um driver, valida os seletores e define a localização, deixando a lista de mercados carregada."""
+    localizacao = localizacao or resolver_localizacao(config)
+    logger.info("Configurando o driver...")
+    isolamento = config.get("isolamento", {})
+    if limpeza_global is None:
+        limpeza_global = not isolamento.get("habilitado", False)
+    driver = configurar_driver(headless=True, limpeza_global=limpeza_global)
+    try:
+        driver.implicitly_wait(config.get("resiliencia", {}).get("espera_implicita", 30))
+
+        if not validar_seletores(type_search, driver, config):
+            raise Exception("Validação de seletores falhou. Abortando execução.")
+
+        # Esperar a página carregar completamente
+        logger.info("Aguardando o carregamento completo da página...")
+        wait = WebDriverWait(driver, 30)
+        wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
+        registrar_html(driver, "HTML após carregamento inicial", registrador=logger)
+
+        with medir_fase("definir_localizacao"):
+            logger.info(f"Simulando geolocalização para {localizacao.nome} ({localizacao.chave})...")
+            driver.execute_cdp_cmd("Emulation.setGeolocationOverride", {
+                "latitude": localizacao.latitude,
+                "longitude": localizacao.longitude,
+                "accuracy": localizacao.precisao
+            })
+
+            # Clicar no botão de localização para usar a geolocalização simulada
+            logger.info("Clicando no botão 'Usar minha localização'...")
+            botao_localizacao = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, config["selectors"]["location_button"])))
+            botao_localizacao.click()
+            time.sleep(10)  # Dar tempo para a página atualizar
+            registrar_html(driver, "HTML após definir localização", registrador=logger)
+
+            # Aguardar a lista de mercados carregar
+            logger.info("Aguardando a lista de mercados carregar...")
+            wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, config["selectors"]["markets"]["card"])))
+            logger.info("Lista de mercados carregada com sucesso!")
+        driver.localizacao = localizacao
+        return driver
+    except Exception:
+        encerrar_driver(driver)
+        raise
+
+def reabrir_lista(driver: webdriver.Chrome, type_search: str, config: Dict[str, Any]) -> None:
+    """Volta à lista de estabelecimentos num driver cuja localização já foi definida."""
+    navegar(driver, url_lista(type_search, config))
+    WebDriverWait(driver, 20, poll_frequency=0.2).until(
+        EC.presence_of_all_elements_located((By.CLASS_NAME, config["selectors"]["markets"]["card"]))
+    )
+
+def capturar_estado_sessao(driver: webdriver.Chrome) -> Dict[str, Any]:
+    """Cookies e localStorage de um driver com a localização definida (o endereço escolhido fica neles)."""
+    return {
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script("return Object.assign({}, window.localStorage);") or {}
+    }
+
+def clonar_sessao(type_search: str, config: Dict[str, Any], localizacao: Localizacao, estado: Dict[str, Any]) -> webdriver.Chrome:
+    """Abre um driver novo já na localização, copiando o estado de outra sessão em vez de refazer o bootstrap.
+
+    Todas as verticais ficam no mesmo domínio, então o endereço escolhido em uma vale para as
+    outras; se a lista não carregar com o estado copiado, levanta a exceção e quem chamou faz o bootstrap.
+    """
+    driver = configurar_driver(headless=True, limpeza_global=False)
+    try:
+        driver.implicitly_wait(config.get("resiliencia", {}).get("espera_implicita", 30))
+        with medir_fase("definir_localizacao"):
+            navegar(driver, url_lista(type_search, config))
+            for cookie in estado["cookies"]:
+                try:
+                    driver.add_cookie({chave: valor for chave, valor in cookie.items() if chave in CAMPOS_COOKIE})
+                except WebDriverException as e:
+                    logger.debug(f"Cookie {cookie.get('name')} não copiado: {resumir_erro(e)}")
+            driver.execute_script(
+                "for (const [chave, valor] of Object.entries(arguments[0])) window.localStorage.setItem(chave, valor);",
+                estado["local_storage"]
+            )
+            reabrir_lista(driver, type_search, config)
+        driver.localizacao = localizacao
+        return driver
+    except Exception:
+        encerrar_driver(driver)
+        raise
+
+class PoolSessoes:
+    """Drivers com a localização já definida, guardados por localização para a próxima tarefa.
+
+    Definir a localização custa um Chrome novo, a validação dos seletores e o clique com espera;
+    um driver devolvido ao pool só precisa voltar à lista de estabelecimentos. Com isolamento
+    habilitado cada tarefa roda em um processo próprio, então o reaproveitamento acontece entre
+    as localizações de um mesmo lote e as verticais de uma mesma busca.
+
+    O estado (cookies e localStorage) da última sessão localizada também fica guardado por
+    localização: sem driver ocioso, um Chrome novo copia esse estado em vez de refazer o bootstrap.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ociosos: Dict[str, List[tuple]] = {}
+        self._estados: Dict[str, tuple] = {}
+        self._em_uso = 0
+
+    def obter(self, type_search: str, config: Dict[str, Any], localizacao: Localizacao) -> webdriver.Chrome:
+        secao = config.get("sessoes", {})
+        ttl = float(secao.get("ttl_ocioso", 600))
+        expirados = []
+        driver = None
+        with self._lock:
+            ociosos = self._ociosos.get(localizacao.chave, [])
+            while ociosos and driver is None:
+                candidato, devolvido_em = ociosos.pop()
+                if time.monotonic() - devolvido_em > ttl:
+                    expirados.append(candidato)
+                else:
+                    driver = candidato
+            # A limpeza global (killall chrome) só é segura sem nenhum outro driver vivo neste processo
+            vivos = self._em_uso + sum(len(lista) for lista in self._ociosos.values())
+            self._em_uso += 1
+        for candidato in expirados:
+            encerrar_driver(candidato)
+        try:
+            if driver is not None:
+                try:
+                    reabrir_lista(driver, type_search, config)
+                    logger.info(f"Reaproveitando sessão já localizada em {localizacao.nome}")
+                    # O rastreador da tarefa que abriu o driver já foi encerrado; os comandos passam à tarefa atual
+                    return instrumentar_driver(driver)
+                except (TimeoutException, WebDriverException) as e:
+                    logger.warning(f"Sessão guardada para {localizacao.nome} não respondeu, abrindo outra: {resumir_erro(e)}")
+                    encerrar_driver(driver)
+            with self._lock:
+                estado, capturado_em = self._estados.get(localizacao.chave, (None, 0.0))
+            if estado is not None and secao.get("copiar_estado", True) and time.monotonic() - capturado_em <= ttl:
+                try:
+                    driver = clonar_sessao(type_search, config, localizacao, estado)
+                    logger.info(f"Sessão em {localizacao.nome} aberta com o estado de outra já localizada")
+                    return instrumentar_driver(driver)
+                except (TimeoutException, WebDriverException) as e:
+                    logger.warning(f"Estado copiado não localizou a sessão em {localizacao.nome}, refazendo o bootstrap: {resumir_erro(e)}")
+            limpeza_global = None if vivos == 0 else False
+            driver = iniciar_sessao(type_search, config, localizacao, limpeza_global)
+            try:
+                estado = capturar_estado_sessao(driver)
+                with self._lock:
+                    self._estados[localizacao.chave] = (estado, time.monotonic())
+            except WebDriverException as e:
+                logger.debug(f"Estado da sessão em {localizacao.nome} não capturado: {resumir_erro(e)}")
+            return driver
+        except BaseException:
+            with self._lock:
+                self._em_uso -= 1
+            raise
+
+    def preparar(self, type_search: str, config: Dict[str, Any], localizacao: Localizacao) -> None:
+        """Deixa uma sessão localizada ociosa no pool antes de buscas paralelas na mesma localização.
+
+        A primeira busca pega esse driver e as demais copiam o estado dele, então o bootstrap
+        (validação dos seletores e escolha do endereço) acontece uma vez só.
+        """
+        driver = self.obter(type_search, config, localizacao)
+        with self._lock:
+            self._em_uso -= 1
+            self._ociosos.setdefault(localizacao.chave, []).append((driver, time.monotonic()))
+
+    def devolver(self, driver: webdriver.Chrome, localizacao: Localizacao, config: Dict[str, Any], saudavel: bool = True) -> None:
+        """Guarda o driver para reaproveitamento ou o encerra (falha, reaproveitamento desligado, pool cheio)."""
+        secao = config.get("sessoes", {})
+        with self._lock:
+            self._em_uso -= 1
+        if not saudavel or not secao.get("reutilizar", False):
+            encerrar_driver(driver)
+            return
+        try:
+            # Abas pré-carregadas que sobraram não devem acompanhar o driver para a próxima tarefa
+            principal = driver.current_window_handle
+            for aba in driver.window_handles:
+                if aba != principal:
+                    driver.switch_to.window(aba)
+                    driver.close()
+            driver.switch_to.window(principal)
+        except WebDriverException as e:
+            logger.warning(f"Driver de {localizacao.nome} não está saudável, encerrando: {resumir_erro(e)}")
+            encerrar_driver(driver)
+            return
+        excedentes = []
+        with self._lock:
+            self._ociosos.setdefault(localizacao.chave, []).append((driver, time.monotonic()))
+            max_ociosos = int(secao.get("max_ociosos", 2))
+            todos = sorted(
+                ((item[1], chave, item) for chave, lista in self._ociosos.items() for item in lista),
+                key=lambda t: t[0]
+            )
+            for _, chave, item in todos[:max(0, len(todos) - max_ociosos)]:
+                self._ociosos[chave].remove(item)
+                excedentes.append(item[0])
+        for excedente in excedentes:
+            encerrar_driver(excedente)
+
+    def encerrar_todos(self) -> None:
+        with self._lock:
+            drivers = [driver for lista in self._ociosos.values() for driver, _ in lista]
+            self._ociosos.clear()
+            self._estados.clear()
+        for driver in drivers:
+            encerrar_driver(driver)
+
+pool_sessoes = PoolSessoes()
+atexit.register(pool_sessoes.encerrar_todos)
+
+def encerrar_driver(driver: Optional[webdriver.Chrome]) -> None:
+    """Fecha o driver e mata qualquer processo do Chrome que tenha sobrado dele."""
+    if driver is None:
+        return
+    descendentes = []
+    try:
+        processo_driver = driver.service.process
+        if processo_driver is not None:
+            descendentes = [processo_driver.pid] + processos_descendentes(processo_driver.pid)
+    except Exception:
+        pass
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Erro ao fechar o navegador: {e}")
+    drivers_ativos.dec()
+    encerrar_processos(descendentes)
+
+def reciclar_driver_se_necessario(driver: webdriver.Chrome, type_search: str, config: Dict[str, Any]) -> webdriver.Chrome:
+    """Troca o driver por um novo após N páginas carregadas ou se a memória do Chrome passar do limite."""
+    isolamento = config.get("isolamento", {})
+    paginas_por_driver = isolamento.get("paginas_por_driver")
+    limite_rss_driver_mb = isolamento.get("limite_rss_driver_mb")
+    paginas = getattr(driver, "paginas_carregadas", 0)
+    motivo = None
+    if paginas_por_driver and paginas >= paginas_por_driver:
+        motivo = f"{paginas} páginas carregadas"
+    elif limite_rss_driver_mb:
+        try:
+            rss_mb = rss_arvore(driver.service.process.pid) / 1024 / 1024
+        except Exception:
+            rss_mb = 0
+        if rss_mb > limite_rss_driver_mb:
+            motivo = f"{rss_mb:.0f} MB de memória"
+    if motivo is None:
+        return driver
+    logger.info(f"Reciclando o driver ({motivo})...")
+    localizacao = getattr(driver, "localizacao", None)
+    encerrar_driver(driver)
+    # O driver antigo já foi encerrado com seus processos; a limpeza global mataria outros drivers do pool
+    return iniciar_sessao(type_search, config, localizacao, limpeza_global=False)
+
+class PreCarregadorMercados:
+    """Abre o próximo mercado em uma segunda aba do mesmo driver enquanto o atual é extraído.
+
+    `window.open` não bloqueia o WebDriver, então o carregamento da aba de trás corre junto com a
+    extração da aba da frente; ao passar para o próximo mercado, a aba pré-carregada vira a principal
+    e scrape_produtos_mercado a reaproveita sem navegar de novo (navegacao.reutilizar_pagina).
+    """
+
+    def __init__(self, driver: webdriver.Chrome, espera_ativacao: float = 10.0) -> None:
+        self.driver = driver
+        self.espera_ativacao = espera_ativacao
+        self.aba: Optional[str] = None
+        self.url: Optional[str] = None
+
+    def pre_carregar(self, url: str) -> None:
+        if self.aba is not None:
+            return
+        try:
+            antes = set(self.driver.window_handles)
+            with limitador.requisicao(url):
+                self.driver.execute_script("window.open(arguments[0], '_blank');", url)
+            novas = set(self.driver.window_handles) - antes
+        except WebDriverException as e:
+            logger.warning(f"Não foi possível pré-carregar {url}: {resumir_erro(e)}")
+            return
+        if not novas:
+            logger.warning(f"Nenhuma aba aberta para pré-carregar {url}")
+            return
+        self.aba, self.url = novas.pop(), url
+        self.driver.paginas_carregadas = getattr(self.driver, "paginas_carregadas", 0) + 1
+        paginas_carregadas.inc()
+        logger.info(f"Pré-carregando {url} em segundo plano")
+
+    def ativar(self, url: Optional[str]) -> bool:
+        """Passa para a aba pré-carregada de `url`, fechando a atual; False se não há aba para essa URL."""
+        if self.aba is None:
+            return False
+        if self.url != url:
+            self.descartar()
+            return False
+        aba, self.aba, self.url = self.aba, None, None
+        atual = self.driver.current_window_handle
+        try:
+            self.driver.close()
+            self.driver.switch_to.window(aba)
+            WebDriverWait(self.driver, self.espera_ativacao, poll_frequency=0.1).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            logger.info(f"Aba pré-carregada de {url} ativada")
+            return True
+        except (TimeoutException, WebDriverException) as e:
+            logger.warning(f"Aba pré-carregada de {url} não ficou pronta: {resumir_erro(e)}")
+            handles = self.driver.window_handles
+            if handles and atual not in handles:
+                self.driver.switch_to.window(aba if aba in handles else handles[0])
+            return False
+
+    def descartar(self) -> None:
+        """Fecha a aba pré-carregada (mercado pulado ou fim da lista) e volta para a aba atual."""
+        if self.aba is None:
+            return
+        aba, self.aba, self.url = self.aba, None, None
+        try:
+            atual = self.driver.current_window_handle
+            self.driver.switch_to.window(aba)
+            self.driver.close()
+            self.driver.switch_to.window(atual)
+        except WebDriverException as e:
+            logger.warning(f"Erro ao fechar aba pré-carregada: {resumir_erro(e)}")
+
+@cronometrado("coletar_mercados")
+def coletar_mercados(
+    items: List[Any],
+    imagens_pasta: str,
+    config: Dict[str, Any],
+    task_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Extrai o cabeçalho (nome, avaliação, entrega, URL) de cada card de mercado e baixa os logos."""
+    mercados_info = []
+    imagens_mercados = []
+    total_mercados = len(items)
+    progresso_base = 10
+    progresso_por_mercado = 40.0 / total_mercados  # 10% a 50%
+
+    for i, item in enumerate(items, 1):
+        try:
+            mercado_data: Dict[str, Any] = {"id": i}
+            
+            mercado_data["nome"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['name']}").text or "Nome não encontrado"
+            mercado_data["rating"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['rating']}").text or "Não disponível"
+            
+            info = item.find_element(By.CLASS_NAME, config["selectors"]["markets"]["info"]).text
+            if "km" in info:
+                for part in info.split(" • "):
+                    if "km" in part:
+                        mercado_data["distancia"] = part.strip()
+            else:
+                mercado_data["distancia"] = "Não disponível"
+            
+            footer = item.find_element(By.CLASS_NAME, config["selectors"]["markets"]["footer"]).text
+            parts = [p.strip() for p in footer.split("\n") if p.strip() and p.strip() != "•"]
+            mercado_data["tempo_entrega"] = parts[0] if parts else "Não disponível"
+            mercado_data["custo_entrega"] = parts[-1] if len(parts) > 1 else "Não disponível"
+            
+            imagem_url = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['image']}").get_attribute("src")
+            mercado_data["imagem_url"] = imagem_url
+            imagens_mercados.append({"url": imagem_url, "nome": mercado_data["nome"], "caminho": None})
+            
+            href = item.get_attribute("href")
+            mercado_data["url"] = f"https://www.ifood.com.br{href}" if href and href.startswith("/") else href
+            
+            mercados_info.append(mercado_data)
+            publicar_evento(task_id, "mercado", dict(mercado_data))
+            logger.info(f"Informações coletadas do mercado {i}: {mercado_data['nome']}")
+            
+            # Atualizar progresso após processar cada mercado
+            progresso_base += progresso_por_mercado
+            atualizar_progresso(task_id, min(progresso_base, 50), f"Processando mercado {i} de {total_mercados}...")
+
+        except NoSuchElementException as e:
+            logger.warning(f"Elemento não encontrado para mercado {i}: {e}")
+            continue
+        except Exception as e:
+            logger.error(f"Erro ao coletar informações do mercado {i}: {e}")
+            continue
+    
+    if imagens_mercados:
+        baixar_imagens_em_paralelo(imagens_mercados, imagens_pasta)
+        for mercado_data, img_data in zip(mercados_info, imagens_mercados):
+            mercado_data["imagem_local"] = img_data["caminho"]
+
+    return mercados_info
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
     retry=retry_if_exception_type((TimeoutException, NoSuchElementException, WebDriverException)),
-    before_sleep=lambda retry_state: logger.info(f"Tentativa {retry_state.attempt_number} falhou, retrying...")
+    before_sleep=registrar_retentativa("scrape_ifood_mercados")
 )
 def scrape_ifood_mercados(
     type_search: str,
@@ -534,309 +1226,624 @@ def scrape_ifood_mercados(
     output_file: str = "./dados_ifood/ifood_data.json",
     imagens_pasta: str = "imagens_ifood",
     config: Optional[Dict[str, Any]] = None,
-    task_id: Optional[str] = None
+    task_id: Optional[str] = None,
+    localizacao: Optional[Localizacao] = None,
+    limpar_imagens: bool = True
 ) -> None:
-    """Faz scraping de mercados e seus produtos no iFood pesquisando por múltiplos itens com quantidades."""
+    """Faz scraping de mercados e seus produtos no iFood pesquisando por múltiplos itens com quantidades.
+
+    Com task_id, cada unidade concluída (lista de mercados, mercado × item) é salva em checkpoint,
+    então uma nova tentativa (ou outro worker com o mesmo task_id) continua de onde parou.
+    Sem `localizacao`, usa a localização padrão do config; o driver vem do pool de sessões.
+    """
     if config is None:
         config = carregar_config()
+    localizacao = localizacao or resolver_localizacao(config)
     driver: Optional[webdriver.Chrome] = None
+    falhou = False
     dados: List[Dict[str, Any]] = []
-    
-    try:
-        logger.info("Limpando diretório de imagens antes de nova busca...")
-        limpar_diretorio_imagens(imagens_pasta)
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 5, "mensagem": "Configurando ambiente..."}
-
-        logger.info("Configurando o driver...")
-        driver = configurar_driver(headless=True)
-        driver.implicitly_wait(30)
-        
-        if not validar_seletores(type_search, driver, config):
-            raise Exception("Validação de seletores falhou. Abortando execução.")
-        
-        # Esperar a página carregar completamente
-        logger.info("Aguardando o carregamento completo da página...")
-        wait = WebDriverWait(driver, 30)
-        wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
-        logger.info(f"HTML após carregamento inicial: {driver.page_source[:2000]}")
-        
-        # Simular geolocalização para Joinville, SC
-        logger.info("Simulando geolocalização para Joinville, SC...")
-        driver.execute_cdp_cmd("Emulation.setGeolocationOverride", {
-            "latitude": -26.3045,  # Joinville, SC
-            "longitude": -48.8487,
-            "accuracy": 100
+    checkpoint: Optional[CheckpointScraping] = None
+    if task_id:
+        checkpoint = CheckpointScraping(task_id, {
+            "type_search": type_search,
+            "max_items": max_items,
+            "max_produtos": max_produtos,
+            "itens_pesquisa": itens_pesquisa,
+            "localizacao": localizacao.chave
         })
-        
-        # Clicar no botão de localização para usar a geolocalização simulada
-        logger.info("Clicando no botão 'Usar minha localização'...")
-        botao_localizacao = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, config["selectors"]["location_button"])))
-        botao_localizacao.click()
-        time.sleep(10)  # Dar tempo para a página atualizar
-        logger.info(f"HTML após definir localização: {driver.page_source[:2000]}")
-        
-        # Aguardar a lista de mercados carregar
-        logger.info("Aguardando a lista de mercados carregar...")
-        wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, config["selectors"]["markets"]["card"])))
-        logger.info("Lista de mercados carregada com sucesso!")
-        
-        items = rolar_pagina(driver, max_items, config["selectors"]["markets"]["card"])
-        logger.info(f"Total de mercados encontrados: {len(items)}")
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 10, "mensagem": f"Carregados {len(items)} mercados..."}
-        # (restante do código continua igual)
-        
-        
-        
-        
-        
-        
-        
-        logger.info(f"Total de mercados encontrados: {len(items)}")
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 10, "mensagem": f"Carregados {len(items)} mercados..."}
+    mercados_info = checkpoint.mercados() if checkpoint else None
+    disjuntor_mercados.configurar(config.get("resiliencia"))
+    limitador.configurar(config.get("limitador"))
+    config_catalogo = config.get("catalogo", {})
+    armazem_catalogos.configurar(config_catalogo)
+    
+    with tempos_da_tarefa(task_id) as tempos, contexto_tarefa(task_id), rastrear_tarefa(task_id, config.get("rastreamento")) as rastreador:
+        try:
+            if mercados_info is None and limpar_imagens:
+                logger.info("Limpando diretório de imagens antes de nova busca...")
+                limpar_diretorio_imagens(imagens_pasta)
+            elif mercados_info is not None:
+                logger.info(f"Retomando a partir do checkpoint com {len(mercados_info)} mercados...")
+            atualizar_progresso(task_id, 5, "Configurando ambiente...")
 
-        if not items:
-            logger.warning("Nenhum mercado encontrado.")
-            return
-        
-        mercados_info = []
-        imagens_mercados = []
-        total_mercados = min(len(items), max_items)
-        total_itens = len(itens_pesquisa)
+            driver = pool_sessoes.obter(type_search, config, localizacao)
         
-        # Dividir o progresso: 10% a 50% para mercados, 50% a 90% para produtos, 90% a 100% para finalização
-        progresso_base = 10
-        progresso_por_mercado = 40.0 / total_mercados  # 10% a 50%
-        progresso_por_produto = 40.0 / (total_mercados * total_itens)  # 50% a 90%
+            if mercados_info is None:
+                items = rolar_pagina(driver, max_items, config["selectors"]["markets"]["card"])
+                logger.info(f"Total de mercados encontrados: {len(items)}")
+                atualizar_progresso(task_id, 10, f"Carregados {len(items)} mercados...")
 
-        for i, item in enumerate(items[:max_items], 1):
-            try:
-                mercado_data: Dict[str, Any] = {"id": i}
-                
-                mercado_data["nome"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['name']}").text or "Nome não encontrado"
-                mercado_data["rating"] = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['rating']}").text or "Não disponível"
-                
-                info = item.find_element(By.CLASS_NAME, config["selectors"]["markets"]["info"]).text
-                if "km" in info:
-                    for part in info.split(" • "):
-                        if "km" in part:
-                            mercado_data["distancia"] = part.strip()
-                else:
-                    mercado_data["distancia"] = "Não disponível"
-                
-                footer = item.find_element(By.CLASS_NAME, config["selectors"]["markets"]["footer"]).text
-                parts = [p.strip() for p in footer.split("\n") if p.strip() and p.strip() != "•"]
-                mercado_data["tempo_entrega"] = parts[0] if parts else "Não disponível"
-                mercado_data["custo_entrega"] = parts[-1] if len(parts) > 1 else "Não disponível"
-                
-                imagem_url = item.find_element(By.CSS_SELECTOR, f".{config['selectors']['markets']['image']}").get_attribute("src")
-                mercado_data["imagem_url"] = imagem_url
-                imagens_mercados.append({"url": imagem_url, "nome": mercado_data["nome"], "caminho": None})
-                
-                href = item.get_attribute("href")
-                mercado_data["url"] = f"https://www.ifood.com.br{href}" if href and href.startswith("/") else href
-                
-                mercados_info.append(mercado_data)
-                logger.info(f"Informações coletadas do mercado {i}: {mercado_data['nome']}")
-                
-                # Atualizar progresso após processar cada mercado
-                with progresso_lock:
-                    if task_id:
-                        progresso_base += progresso_por_mercado
-                        progresso_por_task[task_id] = {"percentual": min(progresso_base, 50), "mensagem": f"Processando mercado {i} de {total_mercados}..."}
-
-            except NoSuchElementException as e:
-                logger.warning(f"Elemento não encontrado para mercado {i}: {e}")
-                continue
-            except Exception as e:
-                logger.error(f"Erro ao coletar informações do mercado {i}: {e}")
-                continue
-        
-        if imagens_mercados:
-            baixar_imagens_em_paralelo(imagens_mercados, imagens_pasta)
-            for mercado_data, img_data in zip(mercados_info, imagens_mercados):
-                mercado_data["imagem_local"] = img_data["caminho"]
+                if not items:
+                    logger.warning("Nenhum mercado encontrado.")
+                    return
+
+                mercados_info = coletar_mercados(items[:max_items], imagens_pasta, config, task_id)
+                if checkpoint:
+                    checkpoint.salvar_mercados(mercados_info)
+            else:
+                for mercado_data in mercados_info:
+                    publicar_evento(task_id, "mercado", dict(mercado_data))
+                atualizar_progresso(task_id, 50, f"Retomados {len(mercados_info)} mercados do checkpoint...")
+
+            if not mercados_info:
+                logger.warning("Nenhum mercado encontrado.")
+                return
+
+            total_mercados = len(mercados_info)
+            total_itens = len(itens_pesquisa)
         
-        for j, mercado_data in enumerate(mercados_info, 1):
-            try:
-                mercado_data["produtos"] = {}
-                if mercado_data.get("url"):
-                    for k, item_data in enumerate(itens_pesquisa, 1):
-                        item = item_data["item"]
-                        logger.info(f"Pesquisando '{item}' no mercado {mercado_data['nome']}...")
-                        produtos = scrape_produtos_mercado(
-                            driver, mercado_data["nome"], mercado_data["url"], item, max_produtos, imagens_pasta, config
-                        )
-                        mercado_data["produtos"][item] = produtos
-                        time.sleep(random.uniform(0.5, 1.5))
+            # Dividir o progresso: 10% a 50% para mercados, 50% a 90% para produtos, 90% a 100% para finalização
+            progresso_base = 50
+            estimativa = EstimativaMelhorCompra(itens_pesquisa, max_items)
+            progresso_por_produto = 40.0 / (total_mercados * total_itens)  # 50% a 90%
+
+            pre_carregador: Optional[PreCarregadorMercados] = None
+            for j, mercado_data in enumerate(mercados_info, 1):
+                try:
+                    driver = reciclar_driver_se_necessario(driver, type_search, config)
+                    if config.get("navegacao", {}).get("pre_carregar_proximo", False):
+                        if pre_carregador is None or pre_carregador.driver is not driver:
+                            pre_carregador = PreCarregadorMercados(driver)  # Driver reciclado: a aba de trás se perdeu
+                        pre_carregador.ativar(mercado_data.get("url"))
+                        proximo = next((m for m in mercados_info[j:] if m.get("url") and disjuntor_mercados.motivo_abertura(m["url"]) is None), None)
+                        if proximo is not None:
+                            pre_carregador.pre_carregar(proximo["url"])
+                    mercado_data["produtos"] = {}
+                    if mercado_data.get("url"):
+                        # Cestas grandes: uma visita ao catálogo do mercado responde todos os itens localmente
+                        snapshot = None
+                        pendentes = [d["item"] for d in itens_pesquisa if not checkpoint or checkpoint.produtos(mercado_data["id"], d["item"]) is None]
+                        if (
+                            config_catalogo.get("habilitado", False)
+                            and len(pendentes) >= int(config_catalogo.get("itens_minimos", 5))
+                            and disjuntor_mercados.motivo_abertura(mercado_data["url"]) is None
+                        ):
+                            snapshot = obter_catalogo(driver, mercado_data, config)
+                        for k, item_data in enumerate(itens_pesquisa, 1):
+                            item = item_data["item"]
+                            produtos = checkpoint.produtos(mercado_data["id"], item) if checkpoint else None
+                            motivo_falha = disjuntor_mercados.motivo_abertura(mercado_data["url"]) if produtos is None else None
+                            if motivo_falha:
+                                logger.warning(f"Disjuntor aberto para {mercado_data['nome']}, ignorando '{item}': {motivo_falha}")
+                                produtos = []
+                            elif produtos is not None:
+                                acertos_cache.inc(cache="checkpoint", resultado="acerto")
+                                logger.info(f"'{item}' no mercado {mercado_data['nome']} recuperado do checkpoint.")
+                            else:
+                                if snapshot is not None:
+                                    produtos = buscar_no_catalogo(snapshot, mercado_data["nome"], item, max_produtos, imagens_pasta, config)
+                                    if not produtos and config_catalogo.get("pesquisar_se_ausente", True):
+                                        produtos = None  # O snapshot pode estar incompleto; confirma na busca do site
+                                if produtos is None:
+                                    logger.info(f"Pesquisando '{item}' no mercado {mercado_data['nome']}...")
+                                    try:
+                                        produtos = scrape_produtos_com_disjuntor(
+                                            driver, mercado_data["nome"], mercado_data["url"], item, max_produtos, imagens_pasta, config
+                                        )
+                                    except (TimeoutException, WebDriverException) as e:
+                                        motivo_falha = resumir_erro(e)
+                                        logger.error(f"Falha ao pesquisar '{item}' em {mercado_data['nome']}: {motivo_falha}")
+                                        produtos = []
+                                if checkpoint and not motivo_falha:
+                                    checkpoint.salvar_produtos(mercado_data["id"], item, produtos)
+                            if motivo_falha:
+                                falha = mercado_data.setdefault("falha", {"motivo": motivo_falha, "itens_ignorados": []})
+                                falha["motivo"] = motivo_falha
+                                falha["itens_ignorados"].append(item)
+                            mercado_data["produtos"][item] = produtos
+                            publicar_evento(task_id, "produtos", {
+                                "mercado_id": mercado_data["id"],
+                                "mercado": mercado_data["nome"],
+                                "item": item,
+                                "produtos": produtos
+                            })
+                            publicar_evento(task_id, "estimativa", estimativa.atualizar(mercado_data))
                         
-                        # Atualizar progresso após processar cada item
-                        with progresso_lock:
-                            if task_id:
-                                progresso_base += progresso_por_produto
-                                progresso_por_task[task_id] = {"percentual": min(progresso_base, 90), "mensagem": f"Processando item {k} de {total_itens} no mercado {j} de {total_mercados}..."}
+                            # Atualizar progresso após processar cada item
+                            progresso_base += progresso_por_produto
+                            atualizar_progresso(task_id, min(progresso_base, 90), f"Processando item {k} de {total_itens} no mercado {j} de {total_mercados}...")
 
-                else:
-                    mercado_data["produtos"] = {item_data["item"]: [] for item_data in itens_pesquisa}
-                    logger.warning(f"Sem URL para raspar produtos do mercado {mercado_data['nome']}")
+                    else:
+                        mercado_data["produtos"] = {item_data["item"]: [] for item_data in itens_pesquisa}
+                        logger.warning(f"Sem URL para raspar produtos do mercado {mercado_data['nome']}")
                 
-                dados.append(mercado_data)
-                logger.info(f"Mercado processado com produtos: {mercado_data['nome']}")
+                    dados.append(mercado_data)
+                    logger.info(f"Mercado processado com produtos: {mercado_data['nome']}")
                 
-            except Exception as e:
-                logger.error(f"Erro ao processar produtos do mercado {mercado_data['nome']}: {e}")
-                continue
+                except Exception as e:
+                    logger.error(f"Erro ao processar produtos do mercado {mercado_data['nome']}: {e}")
+                    continue
         
-        # Finalização
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 95, "mensagem": "Calculando melhor compra..."}
-
-        resultado = calcular_melhor_compra(dados, itens_pesquisa, max_items)
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, ensure_ascii=False, indent=4)
-        logger.info(f"Dados finais salvos em: {output_file}")
+            # Finalização
+            atualizar_progresso(task_id, 95, "Calculando melhor compra...")
+
+            resultado = calcular_melhor_compra(dados, itens_pesquisa, max_items, config.get("otimizador"))
+            resultado["localizacao"] = localizacao.como_dict()
+            guardar_no_cache_itens(type_search, dados, itens_pesquisa, max_produtos, config, localizacao)
+            resultado["tempos"] = tempos.resumo()
+            if rastreador is not None:
+                resultado["comandos_webdriver"] = rastreador.resumo()
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(resultado, f, ensure_ascii=False, indent=4)
+            logger.info(f"Dados finais salvos em: {output_file}")
+            publicar_evento(task_id, "concluido", {"melhor_compra": resultado["melhor_compra"], "output_file": output_file})
         
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 100, "mensagem": "Scraping concluído!"}
+            atualizar_progresso(task_id, 100, "Scraping concluído!")
+            if checkpoint:
+                checkpoint.remover()
         
-    except Exception as e:
-        logger.error(f"Erro geral: {e}")
-        import traceback
-        traceback.print_exc()
-        with progresso_lock:
-            if task_id:
-                progresso_por_task[task_id] = {"percentual": 0, "mensagem": f"Erro: {str(e)}"}
-        raise
+        except Exception as e:
+            falhou = True
+            logger.error(f"Erro geral: {e}")
+            import traceback
+            traceback.print_exc()
+            atualizar_progresso(task_id, 0, f"Erro: {str(e)}")
+            raise
     
-    finally:
-        if driver is not None:
-            driver.quit()
-            logger.info("Navegador fechado.")
+        finally:
+            if driver is not None:
+                pool_sessoes.devolver(driver, localizacao, config, saudavel=not falhou)
+                logger.info("Navegador liberado.")
             
 
-def calcular_melhor_compra(dados: List[Dict[str, Any]], itens_pesquisa: List[Dict[str, Any]], max_items: int) -> Dict[str, Any]:
-    """Calcula onde é mais barato comprar os itens e retorna resultados estruturados."""
-    logger.info("Calculando a melhor opção de compra...")
+def funcao_scraping(config: Dict[str, Any]) -> Any:
+    """scrape_ifood_mercados ou, nos testes de carga da API, o substituto sem navegador (mesmo contrato)."""
+    if config.get("simulacao", {}).get("habilitado", False) or os.environ.get("IFOOD_SIMULACAO"):
+        from scraper_simulado import scrape_simulado
+        return scrape_simulado
+    return scrape_ifood_mercados
 
-    custos_por_mercado = {}
-    itens_faltantes_por_mercado = {}
-    combinacoes_por_mercado = {}
+def scrape_lote_localizacoes(
+    type_search: str,
+    max_items: int,
+    max_produtos: int,
+    itens_pesquisa: List[Dict[str, Any]],
+    output_file: str,
+    imagens_pasta: str,
+    config: Dict[str, Any],
+    task_id: Optional[str],
+    localizacoes: List[Localizacao]
+) -> None:
+    """Pesquisa a mesma cesta em várias localizações ao mesmo tempo, no mesmo processo.
 
-    def converter_preco(preco: str) -> float:
-        try:
-            match = re.search(r'R?\$\s*(\d+[.,]\d+)', preco)
-            if match:
-                return float(match.group(1).replace(",", "."))
-            return float("inf")
-        except (ValueError, AttributeError):
-            logger.warning(f"Preço inválido encontrado: {preco}")
-            return float("inf")
-    
-    def converter_custo_entrega(custo: str) -> float:
-        if custo.lower() == "grátis" or "grátis" in custo.lower():
-            return 0.0
-        return converter_preco(custo)
-
-    for mercado in dados:
-        nome_mercado = mercado["nome"]
-        custo_entrega = converter_custo_entrega(mercado.get("custo_entrega", "Não disponível"))
-        produtos = mercado.get("produtos", {})
-        
-        custo_total_produtos = 0.0
-        itens_faltantes = []
-        produtos_escolhidos = []
-        combinacoes = []
-
-        for item_data in itens_pesquisa:
-            item = item_data["item"]
-            quantidade = item_data["quantidade"]
-            produtos_item = produtos.get(item, [])
-            
-            if not produtos_item:
-                itens_faltantes.append(f"{item} ({quantidade}x)")
-                continue
-            
-            precos_validos = [
-                {"produto": p, "preco": converter_preco(p["preco"])}
-                for p in produtos_item
-                if p.get("preco") and converter_preco(p["preco"]) != float("inf")
-            ]
-            
-            if not precos_validos:
-                itens_faltantes.append(f"{item} ({quantidade}x)")
-                continue
-            
-            # Ordenar por preço para garantir o mais barato como escolhido
-            precos_validos.sort(key=lambda x: x["preco"])
-            preco_mais_barato = precos_validos[0]["preco"]
-            produto_mais_barato = precos_validos[0]["produto"]
-            custo_item = preco_mais_barato * quantidade
-            custo_total_produtos += custo_item
-            produtos_escolhidos.append({
-                "item": item,
-                "quantidade": quantidade,
-                "produto": produto_mais_barato,
-                "custo": custo_item
+    Cada localização roda como uma sub-tarefa (`<task_id>_<slug>`, com checkpoint próprio) em uma
+    thread, dividindo o pool de sessões, o cache de catálogos, o limitador e o disjuntor. O arquivo
+    de saída reúne os resultados em {"localizacoes": {nome: resultado ou erro}}.
+    """
+    max_paralelo = max(1, int(config.get("lote", {}).get("max_paralelo", 2)))
+    funcao = funcao_scraping(config)
+    unicas = list({localizacao.chave: localizacao for localizacao in localizacoes}.values())
+    base, extensao = os.path.splitext(output_file)
+    logger.info("Limpando diretório de imagens antes do lote...")
+    limpar_diretorio_imagens(imagens_pasta)
+    atualizar_progresso(task_id, 1, f"Pesquisando {len(unicas)} localizações...")
+
+    def executar(localizacao: Localizacao) -> Dict[str, Any]:
+        saida = f"{base}_{localizacao.slug}{extensao}"
+        sub_task = f"{task_id}_{localizacao.slug}" if task_id else None
+        funcao(type_search, max_items, max_produtos, itens_pesquisa, saida, imagens_pasta, config, sub_task, localizacao, limpar_imagens=False)
+        if not os.path.exists(saida):
+            return {"mercados": [], "melhor_compra": None, "erro": "Nenhum mercado encontrado"}
+        with open(saida, "r", encoding="utf-8") as f:
+            resultado = json.load(f)
+        os.remove(saida)
+        return resultado
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=min(max_paralelo, len(unicas)) or 1, thread_name_prefix="lote") as executor:
+        futuros = {executor.submit(contextvars.copy_context().run, executar, localizacao): localizacao for localizacao in unicas}
+        for futuro in as_completed(futuros):
+            localizacao = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                logger.error(f"Lote {task_id}: falha em {localizacao.nome}: {e}")
+                resultado = {"mercados": [], "melhor_compra": None, "erro": resumir_erro(e)}
+            resultado["localizacao"] = localizacao.como_dict()
+            resultados[localizacao.nome] = resultado
+            publicar_evento(task_id, "localizacao", {
+                "localizacao": localizacao.nome,
+                "melhor_compra": resultado.get("melhor_compra"),
+                "erro": resultado.get("erro")
             })
+            atualizar_progresso(task_id, 5 + 90 * len(resultados) / len(unicas), f"Concluídas {len(resultados)} de {len(unicas)} localizações...")
 
-            # Adicionar até 2 alternativas (excluindo o mais barato)
-            for i, alt in enumerate(precos_validos[1:], 1):  # Começa do segundo item
-                if i > max_items:  # Limita a 2 alternativas
-                    break
-                custo_alt = alt["preco"] * quantidade
-                combinacoes.append({
-                    "item": item,
-                    "quantidade": quantidade,
-                    "produto": alt["produto"],
-                    "custo": custo_alt,
-                    "diferenca": custo_alt - custo_item
-                })
-
-        custo_total = custo_total_produtos + custo_entrega if produtos_escolhidos else float("inf")
-        custos_por_mercado[nome_mercado] = custo_total
-        itens_faltantes_por_mercado[nome_mercado] = itens_faltantes
-        combinacoes_por_mercado[nome_mercado] = combinacoes
-
-        mercado["custo_total"] = f"R$ {custo_total:.2f}" if custo_total != float("inf") else "N/A"
-        mercado["produtos_escolhidos"] = produtos_escolhidos
-        mercado["combinacoes"] = combinacoes
-
-    mercados_ordenados = sorted(
-        custos_por_mercado.items(),
-        key=lambda x: x[1] if x[1] != float("inf") else float("inf")
-    )
+    if all(resultado.get("erro") and not resultado.get("mercados") for resultado in resultados.values()):
+        raise RuntimeError(f"Todas as {len(unicas)} localizações do lote falharam.")
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({"localizacoes": resultados}, f, ensure_ascii=False, indent=4)
+    logger.info(f"Lote salvo em: {output_file}")
+    publicar_evento(task_id, "concluido", {"localizacoes": list(resultados), "output_file": output_file})
+    atualizar_progresso(task_id, 100, "Scraping concluído!")
+
+def ranquear_estabelecimentos(mercados: List[Dict[str, Any]], itens_pesquisa: List[Dict[str, Any]], max_items: int) -> List[Dict[str, Any]]:
+    """Todos os estabelecimentos do mais barato ao mais caro, com a vertical de cada um."""
+    matriz = MatrizPrecos(mercados, itens_pesquisa)
+    matriz.resumir_mercados(max_items)
+    return [
+        {
+            "posicao": posicao,
+            "vertical": mercados[indice].get("vertical"),
+            "mercado": mercados[indice]["nome"],
+            "custo_total": mercados[indice]["custo_total"],
+            "itens_faltantes": mercados[indice].get("itens_faltantes", [])
+        }
+        for posicao, indice in enumerate(matriz.ranking().tolist(), 1)
+    ]
+
+def mesclar_verticais(
+    resultados: Dict[str, Dict[str, Any]],
+    itens_pesquisa: List[Dict[str, Any]],
+    max_items: int,
+    config_otimizador: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Junta os estabelecimentos de todas as verticais e recalcula a melhor compra sobre o conjunto.
+
+    `mercados` traz cada estabelecimento uma vez, marcado com `vertical`; `verticais` guarda a
+    melhor compra, os tempos e o erro de cada vertical; `ranking` ordena todos pelo custo total.
+    """
+    mercados = []
+    secoes = {}
+    for tipo, resultado in resultados.items():
+        for mercado in resultado.get("mercados", []):
+            mercado["vertical"] = tipo
+            mercados.append(mercado)
+        secoes[tipo] = {
+            "nome": TIPOS_BUSCA.get(tipo, tipo),
+            "mercados": len(resultado.get("mercados", [])),
+            "melhor_compra": resultado.get("melhor_compra"),
+            "melhor_compra_multi": resultado.get("melhor_compra_multi"),
+            "tempos": resultado.get("tempos"),
+            "erro": resultado.get("erro")
+        }
+    if not mercados:
+        raise RuntimeError(f"Nenhuma das verticais ({', '.join(resultados)}) retornou estabelecimentos.")
+    mesclado = calcular_melhor_compra(mercados, itens_pesquisa, max_items, config_otimizador)
+    mesclado["ranking"] = ranquear_estabelecimentos(mercados, itens_pesquisa, max_items)
+    # Mesmo critério (argsort estável dos custos) do calcular_melhor_compra, então o primeiro é a melhor compra
+    mesclado["melhor_compra"]["vertical"] = mesclado["ranking"][0]["vertical"]
+    mesclado["verticais"] = secoes
+    return mesclado
+
+def scrape_multiplas_verticais(
+    type_search: str,
+    max_items: int,
+    max_produtos: int,
+    itens_pesquisa: List[Dict[str, Any]],
+    output_file: str,
+    imagens_pasta: str,
+    config: Dict[str, Any],
+    task_id: Optional[str] = None,
+    localizacao: Optional[Localizacao] = None
+) -> None:
+    """Pesquisa a mesma cesta em várias verticais (type_search "M,D") ao mesmo tempo e mescla o resultado.
+
+    A localização é definida uma vez (pool_sessoes.preparar) e as outras verticais copiam a sessão.
+    Cada vertical roda como sub-tarefa (`<task_id>_<tipo>`, com checkpoint próprio) em uma thread;
+    o arquivo de saída tem o formato de scrape_ifood_mercados mais `ranking` e `verticais`.
+    """
+    tipos = separar_tipos_busca(type_search)
+    localizacao = localizacao or resolver_localizacao(config)
+    max_paralelo = max(1, int(config.get("verticais", {}).get("max_paralelo", 4)))
+    funcao = funcao_scraping(config)
+    base, extensao = os.path.splitext(output_file)
+    logger.info("Limpando diretório de imagens antes da busca em várias verticais...")
+    limpar_diretorio_imagens(imagens_pasta)
+    atualizar_progresso(task_id, 1, f"Definindo localização para {len(tipos)} verticais...")
+    if funcao is scrape_ifood_mercados:
+        pool_sessoes.preparar(tipos[0], config, localizacao)
+
+    def executar(tipo: str) -> Dict[str, Any]:
+        saida = f"{base}_{tipo}{extensao}"
+        sub_task = f"{task_id}_{tipo}" if task_id else None
+        funcao(tipo, max_items, max_produtos, itens_pesquisa, saida, imagens_pasta, config, sub_task, localizacao, limpar_imagens=False)
+        if not os.path.exists(saida):
+            return {"mercados": [], "melhor_compra": None, "erro": "Nenhum estabelecimento encontrado"}
+        with open(saida, "r", encoding="utf-8") as f:
+            resultado = json.load(f)
+        os.remove(saida)
+        return resultado
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=min(max_paralelo, len(tipos)), thread_name_prefix="vertical") as executor:
+        futuros = {executor.submit(contextvars.copy_context().run, executar, tipo): tipo for tipo in tipos}
+        for futuro in as_completed(futuros):
+            tipo = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                logger.error(f"Busca {task_id}: falha na vertical {tipo}: {e}")
+                resultado = {"mercados": [], "melhor_compra": None, "erro": resumir_erro(e)}
+            resultados[tipo] = resultado
+            publicar_evento(task_id, "vertical", {"vertical": tipo, "melhor_compra": resultado.get("melhor_compra"), "erro": resultado.get("erro")})
+            atualizar_progresso(task_id, 5 + 85 * len(resultados) / len(tipos), f"Concluídas {len(resultados)} de {len(tipos)} verticais...")
+
+    atualizar_progresso(task_id, 95, "Mesclando verticais...")
+    resultado = mesclar_verticais({tipo: resultados[tipo] for tipo in tipos}, itens_pesquisa, max_items, config.get("otimizador"))
+    resultado["localizacao"] = localizacao.como_dict()
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=4)
+    logger.info(f"Resultado mesclado de {len(tipos)} verticais salvo em: {output_file}")
+    publicar_evento(task_id, "concluido", {"melhor_compra": resultado["melhor_compra"], "output_file": output_file})
+    atualizar_progresso(task_id, 100, "Scraping concluído!")
+
+def guardar_no_cache_itens(
+    type_search: str,
+    mercados: List[Dict[str, Any]],
+    itens_pesquisa: List[Dict[str, Any]],
+    max_produtos: int,
+    config: Dict[str, Any],
+    localizacao: Localizacao
+) -> None:
+    """Grava os produtos de cada item da busca no cache de itens, se habilitado."""
+    config_cache = config.get("cache_itens", {})
+    if not config_cache.get("habilitado", False):
+        return
+    cache_itens.configurar(config_cache)
+    cache_itens.guardar(localizacao.chave, type_search, mercados, itens_pesquisa, max_produtos)
+
+def resultado_do_cache(
+    type_search: str,
+    max_items: int,
+    max_produtos: int,
+    itens_pesquisa: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    localizacao: Localizacao
+) -> Optional[Dict[str, Any]]:
+    """Resultado completo montado do cache de itens, sem navegador, quando todos os itens estão válidos."""
+    config_cache = config.get("cache_itens", {})
+    if not config_cache.get("habilitado", False):
+        return None
+    cache_itens.configurar(config_cache)
+    mercados = cache_itens.montar_mercados(localizacao.chave, type_search, itens_pesquisa, max_produtos)
+    if not mercados:
+        return None
+    resultado = calcular_melhor_compra(mercados[:max_items], itens_pesquisa, max_items, config.get("otimizador"))
+    resultado["localizacao"] = localizacao.como_dict()
+    resultado["cache"] = {
+        "origem": "cache_itens",
+        "idade_segundos": round(cache_itens.idade_maxima(localizacao.chave, type_search, itens_pesquisa) or 0.0, 1)
+    }
+    return resultado
+
+def calcular_custo_mercado(mercado: Dict[str, Any], itens_pesquisa: List[Dict[str, Any]], max_items: int) -> float:
+    """Escolhe o produto mais barato de cada item no mercado, preenche o resumo e retorna o custo total."""
+    return MatrizPrecos([mercado], itens_pesquisa).resumir_mercados(max_items)[0]
+
+@cronometrado("calcular_melhor_compra")
+def calcular_melhor_compra(
+    dados: List[Dict[str, Any]],
+    itens_pesquisa: List[Dict[str, Any]],
+    max_items: int,
+    config_otimizador: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Calcula onde é mais barato comprar os itens e retorna resultados estruturados.
+
+    Com a seção `otimizador` habilitada, inclui também a melhor divisão da compra entre até
+    `max_lojas` mercados (cada mercado usado cobra sua taxa de entrega).
+    """
+    logger.info("Calculando a melhor opção de compra...")
+
+    # Preços convertidos uma vez para a matriz mercados × itens; até max_items alternativas por item
+    matriz = MatrizPrecos(dados, itens_pesquisa)
+    custos_totais = matriz.resumir_mercados(max_items)
+    indice_melhor = int(matriz.ranking()[0])
+    melhor = dados[indice_melhor]
+    custo_melhor = custos_totais[indice_melhor]
     
     resultado = {
         "melhor_compra": {
-            "mercado": mercados_ordenados[0][0],
-            "custo_total": f"R$ {mercados_ordenados[0][1]:.2f}" if mercados_ordenados[0][1] != float("inf") else "N/A",
-            "produtos_escolhidos": next(m["produtos_escolhidos"] for m in dados if m["nome"] == mercados_ordenados[0][0])
+            "mercado": melhor["nome"],
+            "custo_total": f"R$ {custo_melhor:.2f}" if custo_melhor != float("inf") else "N/A",
+            "produtos_escolhidos": melhor["produtos_escolhidos"]
         },
         "mercados": dados
     }
+    config_otimizador = config_otimizador or {}
+    if config_otimizador.get("habilitado", False):
+        resultado["melhor_compra_multi"] = calcular_melhor_compra_multi(
+            matriz,
+            max_lojas=int(config_otimizador.get("max_lojas", 2)),
+            tempo_limite=float(config_otimizador.get("tempo_limite", 2.0))
+        )
 
     logger.info(f"Mercado mais barato: {resultado['melhor_compra']['mercado']} - R$ {resultado['melhor_compra']['custo_total']}")
     return resultado
 
+class EstimativaMelhorCompra:
+    """Mantém a melhor compra parcial, recalculando só o mercado que recebeu novos produtos.
+
+    O custo de um mercado soma só os itens já encontrados, então a comparação é primeiro pela
+    cobertura (itens com produto) e só depois pelo custo: um mercado com um item raspado não passa
+    à frente de uma cesta completa mais barata.
+    """
+
+    def __init__(self, itens_pesquisa: List[Dict[str, Any]], max_items: int) -> None:
+        self.itens_pesquisa = itens_pesquisa
+        self.max_items = max_items
+        self.custos_por_mercado: Dict[int, tuple] = {}
+        self.resumos: Dict[int, Dict[str, Any]] = {}
+
+    def atualizar(self, mercado: Dict[str, Any]) -> Dict[str, Any]:
+        """Recalcula o custo do mercado informado e retorna a estimativa atual."""
+        parcial = {
+            "nome": mercado["nome"],
+            "custo_entrega": mercado.get("custo_entrega", "Não disponível"),
+            "produtos": mercado.get("produtos", {})
+        }
+        custo = calcular_custo_mercado(parcial, self.itens_pesquisa, self.max_items)
+        self.custos_por_mercado[mercado["id"]] = (-len(parcial["produtos_escolhidos"]), custo)
+        self.resumos[mercado["id"]] = parcial
+        return self.estimativa()
+
+    def estimativa(self) -> Dict[str, Any]:
+        """Retorna o mercado com mais itens encontrados e, entre esses, o mais barato dos já processados."""
+        if not self.custos_por_mercado:
+            return {"mercado": None, "custo_total": "N/A", "produtos_escolhidos": [], "itens_pendentes": [], "itens_encontrados": 0, "itens_total": len(self.itens_pesquisa)}
+        melhor_id = min(self.custos_por_mercado, key=self.custos_por_mercado.get)
+        melhor = self.resumos[melhor_id]
+        return {
+            "mercado": melhor["nome"],
+            "custo_total": melhor["custo_total"],
+            "produtos_escolhidos": melhor["produtos_escolhidos"],
+            "itens_pendentes": [
+                item_data["item"] for item_data in self.itens_pesquisa
+                if item_data["item"] not in melhor["produtos"]
+            ],
+            "itens_encontrados": len(melhor["produtos_escolhidos"]),
+            "itens_total": len(self.itens_pesquisa),
+            "mercados_avaliados": len(self.custos_por_mercado)
+        }
+
+def executar_scraping_supervisionado(
+    type_search: str,
+    max_items: int,
+    max_produtos: int,
+    itens_pesquisa: List[Dict[str, Any]],
+    output_file: str,
+    imagens_pasta: str,
+    config: Optional[Dict[str, Any]] = None,
+    task_id: Optional[str] = None,
+    perfil: Optional[str] = None,
+    localizacoes: Optional[List[Localizacao]] = None
+) -> None:
+    """Roda scrape_ifood_mercados em um processo filho com limite de memória e prazo, se habilitado no config.
+
+    Com `perfil` ("amostragem" ou "deterministico") a tarefa roda sob o perfilador e o resultado
+    fica em dados_ifood/perfis com o nome do task_id; sem ele nada é instrumentado.
+    Com mais de uma localização, roda scrape_lote_localizacoes no mesmo processo filho; com mais
+    de um tipo em type_search ("M,D"), scrape_multiplas_verticais.
+    """
+    if config is None:
+        config = carregar_config()
+    localizacoes = localizacoes or [resolver_localizacao(config)]
+    args = (type_search, max_items, max_produtos, itens_pesquisa, output_file, imagens_pasta, config, task_id)
+    multiplas_verticais = len(separar_tipos_busca(type_search)) > 1
+    if len(localizacoes) > 1 and multiplas_verticais:
+        raise ValueError("Busca em lote de localizações aceita um único tipo de busca.")
+    if len(localizacoes) > 1:
+        args += (localizacoes,)
+        funcao = scrape_lote_localizacoes
+    elif multiplas_verticais:
+        args += (localizacoes[0],)
+        funcao = scrape_multiplas_verticais
+    else:
+        args += (localizacoes[0],)
+        funcao = funcao_scraping(config)
+    config_perfil = config.get("perfil", {})
+    if perfil and not config_perfil.get("habilitado", True):
+        logger.warning(f"Perfil solicitado para a tarefa {task_id}, mas perfil.habilitado está desligado no config.")
+    elif perfil:
+        args = (task_id or datetime.now().strftime("%Y%m%d_%H%M%S"), perfil, float(config_perfil.get("intervalo_amostragem", 0.01)), funcao) + args
+        funcao = executar_com_perfil
+    isolamento = config.get("isolamento", {})
+    if not isolamento.get("habilitado", False):
+        funcao(*args)
+        return
+    executar_isolado(
+        funcao,
+        *args,
+        limite_rss_mb=isolamento.get("limite_rss_mb"),
+        prazo_segundos=isolamento.get("prazo_segundos")
+    )
+
+def executar_worker(fila: FilaTarefas, config: Dict[str, Any], imagens_pasta: str = "imagens_ifood", max_tarefas: Optional[int] = None) -> None:
+    """Consome tarefas da fila e executa scrape_ifood_mercados, gravando progresso e resultado de volta."""
+    worker_id = f"{platform.node()}:{os.getpid()}"
+    registrar_ouvinte(fila.atualizar_progresso)
+    pasta_resultados = tempfile.mkdtemp(prefix="ifood_worker_")
+    if not armazenamento.compartilhado:
+        logger.warning("Progresso em memória: só o percentual chega à API (pela fila); defina IFOOD_PROGRESSO para os eventos parciais.")
+    logger.info(f"Worker {worker_id} aguardando tarefas...")
+    executadas = 0
+    try:
+        while max_tarefas is None or executadas < max_tarefas:
+            tarefa = fila.reservar(worker_id)
+            if tarefa is None:
+                continue
+            task_id = tarefa["task_id"]
+            parametros = tarefa["parametros"]
+            output_file = os.path.join(pasta_resultados, f"{task_id}.json")
+            remover_saidas_antigas(imagens_pasta, float(config.get("saidas", {}).get("retencao_horas", 24)))
+            logger.info(f"Worker {worker_id} executando task {task_id}")
+            with contexto_tarefa(task_id):
+                try:
+                    executar_scraping_supervisionado(
+                        parametros["type_search"],
+                        parametros.get("max_items", 100),
+                        parametros.get("max_produtos", 10),
+                        parametros["itens_pesquisa"],
+                        output_file,
+                        pasta_da_tarefa(imagens_pasta, task_id),
+                        config,
+                        task_id,
+                        parametros.get("perfil"),
+                        [Localizacao.de_dict(dados) for dados in parametros.get("localizacoes") or []]
+                    )
+                    if not os.path.exists(output_file):
+                        raise FileNotFoundError(f"O arquivo de saída {output_file} não foi gerado.")
+                    with open(output_file, "r", encoding="utf-8") as f:
+                        resultado = json.load(f)
+                    os.remove(output_file)
+                    fila.concluir(task_id, resultado)
+                    definir_status(task_id, STATUS_CONCLUIDO, resultado)
+                except Exception as e:
+                    logger.error(f"Task {task_id} falhou no worker {worker_id}: {e}")
+                    fila.falhar(task_id, str(e))
+                    definir_status(task_id, STATUS_ERRO, erro=str(e))
+                finally:
+                    # Com armazenamento compartilhado a API lê o estado final; em memória só ocuparia espaço
+                    if not armazenamento.compartilhado:
+                        limpar_task(task_id)
+            executadas += 1
+    finally:
+        shutil.rmtree(pasta_resultados, ignore_errors=True)
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Scraping de mercados e produtos no iFood com pesquisa por múltiplos itens e quantidades.")
-    parser.add_argument("--type-search", type=str, default='M', help="Tipo de Estabelecimento")
+    parser.add_argument("--type-search", type=str, default='M', help="Tipo de Estabelecimento (M, P, R ou D); vários separados por vírgula (ex.: 'M,D') são pesquisados ao mesmo tempo")
     parser.add_argument("--max-items", type=int, default=10, help="Número máximo de mercados a processar")
     parser.add_argument("--max-produtos", type=int, default=10, help="Número máximo de produtos por mercado por item")
     parser.add_argument("--item", type=str, default="Coca-Cola:1", help="Itens e quantidades a pesquisar, no formato 'item:quantidade' separados por vírgula (ex.: 'coca:1, queijo:3')")
     parser.add_argument("--output", default=f"./dados_ifood/ifood_data.json", help="Arquivo base de saída JSON")
     parser.add_argument("--imagens-pasta", type=str, default="imagens_ifood", help="Pasta para salvar as imagens")
     parser.add_argument("--config", type=str, default="./config.yaml", help="Caminho do arquivo de configuração")
+    parser.add_argument("--task-id", type=str, default=None, help="Identificador da tarefa; reutilizar o mesmo id retoma do checkpoint")
+    parser.add_argument("--perfil", type=str, choices=["amostragem", "deterministico"], default=None, help="Perfila a execução e grava o resultado em dados_ifood/perfis")
+    parser.add_argument("--localizacao", type=str, default=None, help="Nome de uma localização da seção 'localizacoes' do config (padrão: localizacoes.padrao)")
+    parser.add_argument("--latitude", type=float, default=None, help="Latitude explícita (use com --longitude)")
+    parser.add_argument("--longitude", type=float, default=None, help="Longitude explícita (use com --latitude)")
+    parser.add_argument("--lote", type=str, default=None, help="Localizações do config separadas por vírgula; pesquisa a mesma cesta em todas ao mesmo tempo")
+    parser.add_argument("--worker", action="store_true", help="Roda como worker consumindo tarefas da fila em vez de um scraping único")
+    parser.add_argument("--fila", type=str, default=os.environ.get("IFOOD_FILA", "sqlite:///dados_ifood/fila.db"), help="URL da fila de tarefas (sqlite:///caminho ou redis://host:porta/db)")
     
     args = parser.parse_args()
     config = carregar_config(args.config)
+    configurar_logging(config.get("logs"))
+
+    if args.worker:
+        executar_worker(criar_fila(args.fila), config, args.imagens_pasta)
+        return
     
     itens_pesquisa = []
     for item_str in args.item.split(","):
@@ -847,7 +1854,23 @@ def main() -> None:
             logger.error(f"Formato inválido para item: '{item_str}'. Use 'item:quantidade' (ex.: 'coca:1').")
             raise
     
-    scrape_ifood_mercados(args.type_search, args.max_items, args.max_produtos, itens_pesquisa, args.output, args.imagens_pasta, config)
+    if args.lote:
+        localizacoes = [resolver_localizacao(config, nome.strip()) for nome in args.lote.split(",") if nome.strip()]
+    else:
+        localizacoes = [resolver_localizacao(config, args.localizacao, args.latitude, args.longitude)]
+    if len(localizacoes) > 1:
+        funcao, extra = scrape_lote_localizacoes, localizacoes
+    elif len(separar_tipos_busca(args.type_search)) > 1:
+        funcao, extra = scrape_multiplas_verticais, localizacoes[0]
+    else:
+        funcao, extra = scrape_ifood_mercados, localizacoes[0]
+    if args.perfil:
+        executar_com_perfil(
+            args.task_id or datetime.now().strftime("%Y%m%d_%H%M%S"), args.perfil, float(config.get("perfil", {}).get("intervalo_amostragem", 0.01)),
+            funcao, args.type_search, args.max_items, args.max_produtos, itens_pesquisa, args.output, args.imagens_pasta, config, args.task_id, extra
+        )
+        return
+    funcao(args.type_search, args.max_items, args.max_produtos, itens_pesquisa, args.output, args.imagens_pasta, config, args.task_id, extra)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+# limitador.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    "taxa_inicial": 2.0,        # requisições por segundo
+    "taxa_minima": 0.2,
+    "taxa_maxima": 5.0,
+    "rajada": 3,                # tokens acumuláveis
+    "aumento_aditivo": 0.1,     # incremento da taxa a cada resposta saudável
+    "fator_reducao": 0.5,       # multiplicador da taxa em erro, 429 ou lentidão
+    "lentidao_segundos": 8.0    # respostas acima disso contam como sinal de sobrecarga
+}
+
+
+class RegistroRequisicao:
+    """Resultado de uma requisição informado ao limitador (status HTTP, se houver)."""
+
+    def __init__(self) -> None:
+        self.status: Optional[int] = None
+
+
+class LimitadorHost:
+    """Token bucket de um host com ajuste AIMD da taxa (aumento aditivo, redução multiplicativa)."""
+
+    def __init__(self, host: str, config: Dict[str, Any]) -> None:
+        self.host = host
+        self.config = dict(config)
+        self.taxa_minima = float(config["taxa_minima"])
+        self.taxa_maxima = float(config["taxa_maxima"])
+        self.rajada = float(config["rajada"])
+        self.aumento_aditivo = float(config["aumento_aditivo"])
+        self.fator_reducao = float(config["fator_reducao"])
+        self.lentidao_segundos = float(config["lentidao_segundos"])
+        self.taxa = min(max(float(config["taxa_inicial"]), self.taxa_minima), self.taxa_maxima)
+        self._tokens = self.rajada
+        self._ultimo_abastecimento = time.monotonic()
+        self._ultima_reducao = 0.0
+        self._lock = threading.Lock()
+        self._em_espera = 0
+        self._requisicoes = 0
+        self._erros = 0
+        self._espera_total = 0.0
+        self._espera_ultima = 0.0
+
+    def _abastecer(self, agora: float) -> None:
+        self._tokens = min(self.rajada, self._tokens + (agora - self._ultimo_abastecimento) * self.taxa)
+        self._ultimo_abastecimento = agora
+
+    def adquirir(self) -> float:
+        """Reserva um token, dormindo o necessário; retorna o tempo de espera em segundos."""
+        with self._lock:
+            self._abastecer(time.monotonic())
+            self._tokens -= 1
+            espera = -self._tokens / self.taxa if self._tokens < 0 else 0.0
+            self._em_espera += 1
+        if espera > 0:
+            time.sleep(espera)
+        with self._lock:
+            self._em_espera -= 1
+            self._requisicoes += 1
+            self._espera_total += espera
+            self._espera_ultima = espera
+        return espera
+
+    def registrar_resposta(self, sucesso: bool, status: Optional[int], duracao: float) -> None:
+        """Ajusta a taxa conforme o resultado observado."""
+        if status is not None:
+            # Com status HTTP conhecido, só 429/5xx indicam sobrecarga (um 404 não deve frear o host)
+            sobrecarga = status == 429 or status >= 500
+        else:
+            sobrecarga = not sucesso
+        sobrecarga = sobrecarga or duracao > self.lentidao_segundos
+        with self._lock:
+            if not sucesso:
+                self._erros += 1
+            if sobrecarga:
+                agora = time.monotonic()
+                # Uma redução por janela evita que uma rajada de erros simultâneos derrube a taxa ao mínimo
+                if agora - self._ultima_reducao >= 1.0 / self.taxa:
+                    self._abastecer(agora)
+                    self.taxa = max(self.taxa_minima, self.taxa * self.fator_reducao)
+                    self._tokens = min(self._tokens, 0.0)
+                    self._ultima_reducao = agora
+                    logger.warning(
+                        f"Limitador de {self.host} reduzido para {self.taxa:.2f} req/s "
+                        f"(status={status}, duração={duracao:.1f}s, sucesso={sucesso})"
+                    )
+            else:
+                self.taxa = min(self.taxa_maxima, self.taxa + self.aumento_aditivo)
+
+    def exportar(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "config": dict(self.config),
+                "taxa": self.taxa,
+                "requisicoes": self._requisicoes,
+                "erros": self._erros,
+                "espera_total": self._espera_total,
+                "espera_ultima": self._espera_ultima
+            }
+
+    def importar(self, dados: Dict[str, Any], enviado: Dict[str, Any]) -> None:
+        """Assume a taxa vinda do outro processo e soma os contadores que ele acrescentou desde `enviado`."""
+        with self._lock:
+            self.taxa = min(max(float(dados["taxa"]), self.taxa_minima), self.taxa_maxima)
+            self._requisicoes += dados["requisicoes"] - enviado.get("requisicoes", 0)
+            self._erros += dados["erros"] - enviado.get("erros", 0)
+            self._espera_total += dados["espera_total"] - enviado.get("espera_total", 0.0)
+            self._espera_ultima = dados["espera_ultima"]
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "taxa_atual": round(self.taxa, 3),
+                "em_espera": self._em_espera,
+                "requisicoes": self._requisicoes,
+                "erros": self._erros,
+                "espera_ultima": round(self._espera_ultima, 3),
+                "espera_media": round(self._espera_total / self._requisicoes, 3) if self._requisicoes else 0.0
+            }
+
+
+class LimitadorTaxa:
+    """Limitadores por host compartilhados por todas as navegações e downloads do processo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._config_padrao: Dict[str, Any] = dict(CONFIG_PADRAO)
+        self._config_hosts: Dict[str, Dict[str, Any]] = {}
+        self._hosts: Dict[str, LimitadorHost] = {}
+        self.habilitado = True
+
+    def configurar(self, config: Optional[Dict[str, Any]]) -> None:
+        """Aplica a seção `limitador` do config.yaml; hosts já criados mantêm a taxa atual."""
+        if not config:
+            return
+        with self._lock:
+            self.habilitado = bool(config.get("habilitado", True))
+            self._config_padrao = {**CONFIG_PADRAO, **(config.get("padrao") or {})}
+            self._config_hosts = dict(config.get("hosts") or {})
+
+    def para_host(self, host: str) -> LimitadorHost:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = LimitadorHost(host, {**self._config_padrao, **self._config_hosts.get(host, {})})
+            return self._hosts[host]
+
+    @contextmanager
+    def requisicao(self, url: str) -> Iterator[RegistroRequisicao]:
+        """Aguarda a vez do host da URL e registra duração/erro da requisição feita no bloco."""
+        registro = RegistroRequisicao()
+        host = urlparse(url).hostname
+        if not self.habilitado or not host:
+            yield registro
+            return
+        limitador_host = self.para_host(host)
+        limitador_host.adquirir()
+        inicio = time.monotonic()
+        try:
+            yield registro
+        except Exception:
+            limitador_host.registrar_resposta(False, registro.status, time.monotonic() - inicio)
+            raise
+        limitador_host.registrar_resposta(True, registro.status, time.monotonic() - inicio)
+
+    def metricas(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: limitador_host.metricas() for host, limitador_host in hosts.items()}
+
+    def exportar(self) -> Dict[str, Dict[str, Any]]:
+        """Configuração, taxa e contadores de cada host, para repassar a um processo isolado e de volta."""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: limitador_host.exportar() for host, limitador_host in hosts.items()}
+
+    def importar(self, estado: Optional[Dict[str, Dict[str, Any]]], enviado: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Aplica o estado de outro processo; `enviado` é o que ele recebeu ao começar (ver LimitadorHost.importar)."""
+        for host, dados in (estado or {}).items():
+            with self._lock:
+                if host not in self._hosts:
+                    self._hosts[host] = LimitadorHost(host, dados["config"])
+                limitador_host = self._hosts[host]
+            limitador_host.importar(dados, (enviado or {}).get(host, {}))
+
+
+limitador = LimitadorTaxa()
@@ -0,0 +1,64 @@
+# localizacao.py
+import logging
+import re
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Usada quando o config não tem a seção `localizacoes` (comportamento histórico)
+JOINVILLE = {"latitude": -26.3045, "longitude": -48.8487}
+
+
+class Localizacao:
+    """Ponto geográfico emulado no Chrome (Emulation.setGeolocationOverride) antes de escolher o endereço."""
+
+    def __init__(self, nome: str, latitude: float, longitude: float, precisao: float = 100) -> None:
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            raise ValueError(f"Coordenadas inválidas: latitude={latitude}, longitude={longitude}")
+        self.nome = nome
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.precisao = float(precisao)
+
+    @property
+    def chave(self) -> str:
+        """Identifica a localização para reaproveitar sessões e separar checkpoints (≈10 m de resolução)."""
+        return f"{self.latitude:.4f},{self.longitude:.4f}"
+
+    @property
+    def slug(self) -> str:
+        """Versão do nome segura para nomes de arquivo e task_ids."""
+        return re.sub(r"[^\w-]", "_", self.nome)[:50]
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {"nome": self.nome, "latitude": self.latitude, "longitude": self.longitude, "precisao": self.precisao}
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> "Localizacao":
+        return cls(dados["nome"], dados["latitude"], dados["longitude"], dados.get("precisao", 100))
+
+    def __repr__(self) -> str:
+        return f"Localizacao({self.nome!r}, {self.latitude}, {self.longitude})"
+
+
+def resolver_localizacao(
+    config: Dict[str, Any],
+    nome: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+) -> Localizacao:
+    """Coordenadas explícitas, um nome de `localizacoes.locais` ou a localização padrão do config.
+
+    Levanta ValueError para nome desconhecido ou coordenadas incompletas/inválidas.
+    """
+    secao = config.get("localizacoes") or {}
+    locais = secao.get("locais") or {"joinville": JOINVILLE}
+    if (latitude is None) != (longitude is None):
+        raise ValueError("Informe latitude e longitude juntas.")
+    if latitude is not None:
+        return Localizacao(nome or f"{latitude:.4f},{longitude:.4f}", latitude, longitude, secao.get("precisao", 100))
+    nome = nome or secao.get("padrao") or next(iter(locais))
+    local = locais.get(nome) or locais.get(nome.strip().lower())
+    if local is None:
+        raise ValueError(f"Localização '{nome}' desconhecida. Disponíveis: {', '.join(sorted(locais))}.")
+    return Localizacao(nome, local["latitude"], local["longitude"], local.get("precisao", secao.get("precisao", 100)))
@@ -0,0 +1,136 @@
+# logs.py
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMATO = "%(asctime)s - %(levelname)s - [%(task_id)s] %(message)s"
+PADRAO = {
+    "arquivo": "./ifood_scraping.log",
+    "nivel": "INFO",
+    "max_bytes": 10 * 1024 * 1024,
+    "backups": 3,
+    "html_em_falhas": False
+}
+
+_task_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("task_id_log", default=None)
+_ouvinte: Optional[logging.handlers.QueueListener] = None
+html_em_falhas = False
+
+
+class FiltroContexto(logging.Filter):
+    """Anexa o task_id do contexto atual ao registro (registros vindos de um processo filho já trazem o seu)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "task_id"):
+            record.task_id = _task_id.get() or "-"
+        return True
+
+
+class RepasseLog(logging.handlers.QueueHandler):
+    """Envia os registros do processo filho pela fila de mensagens do supervisor como ("log", registro)."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put(("log", record))
+
+
+def _substituir_handlers(*handlers: logging.Handler, nivel: int) -> None:
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+    for handler in handlers:
+        handler.addFilter(FiltroContexto())
+        raiz.addHandler(handler)
+    raiz.setLevel(nivel)
+
+
+def configurar_logging(config: Optional[Dict[str, Any]] = None) -> None:
+    """Troca os handlers da raiz por um QueueHandler; arquivo rotativo e console são escritos por uma thread.
+
+    Quem chama o log só formata a mensagem e a coloca na fila, sem esperar pelo disco.
+    """
+    global _ouvinte, html_em_falhas
+    opcoes = {**PADRAO, **(config or {})}
+    html_em_falhas = bool(opcoes["html_em_falhas"])
+    encerrar_logging()
+
+    formatador = logging.Formatter(FORMATO)
+    destinos: list = [logging.StreamHandler()]
+    if opcoes["arquivo"]:
+        destinos.append(logging.handlers.RotatingFileHandler(
+            opcoes["arquivo"], maxBytes=int(opcoes["max_bytes"]), backupCount=int(opcoes["backups"]), encoding="utf-8"
+        ))
+    for destino in destinos:
+        destino.setFormatter(formatador)
+
+    fila: queue.Queue = queue.Queue(-1)
+    _substituir_handlers(logging.handlers.QueueHandler(fila), nivel=getattr(logging, str(opcoes["nivel"]).upper(), logging.INFO))
+    _ouvinte = logging.handlers.QueueListener(fila, *destinos, respect_handler_level=True)
+    _ouvinte.start()
+
+
+def encerrar_logging() -> None:
+    """Esvazia a fila e fecha os arquivos de log (também chamado na saída do processo)."""
+    global _ouvinte
+    if _ouvinte is None:
+        return
+    _ouvinte.stop()
+    for destino in _ouvinte.handlers:
+        destino.close()
+    _ouvinte = None
+
+
+atexit.register(encerrar_logging)
+
+
+def opcoes_repasse() -> Dict[str, Any]:
+    """Nível, opções e task_id atuais, para o processo filho registrar igual ao pai."""
+    return {"nivel": logging.getLogger().level, "html_em_falhas": html_em_falhas, "task_id": _task_id.get()}
+
+
+def repassar_logs(mensagens: Any, opcoes: Dict[str, Any]) -> None:
+    """No processo filho: todos os logs vão para o pai, que os grava nos seus próprios handlers."""
+    global html_em_falhas
+    html_em_falhas = bool(opcoes.get("html_em_falhas", False))
+    _task_id.set(opcoes.get("task_id"))
+    _substituir_handlers(RepasseLog(mensagens), nivel=int(opcoes.get("nivel", logging.INFO)))
+
+
+@contextmanager
+def contexto_tarefa(task_id: Optional[str]) -> Iterator[None]:
+    """Inclui o task_id em todos os logs emitidos dentro do bloco (inclusive em threads com o contexto copiado)."""
+    token = _task_id.set(task_id)
+    try:
+        yield
+    finally:
+        _task_id.reset(token)
+
+
+class HtmlPagina:
+    """Trecho do HTML da página lido só quando o log é de fato formatado.
+
+    `page_source` serializa o DOM inteiro pelo WebDriver; passado como argumento do log
+    (`logger.debug("...: %s", HtmlPagina(driver))`), não custa nada se o nível estiver desligado.
+    """
+
+    def __init__(self, driver: Any, limite: int = 2000) -> None:
+        self.driver = driver
+        self.limite = limite
+
+    def __str__(self) -> str:
+        try:
+            return self.driver.page_source[:self.limite]
+        except Exception as e:
+            return f"<HTML indisponível: {type(e).__name__}>"
+
+
+def registrar_html(driver: Any, descricao: str, falha: bool = False, registrador: logging.Logger = logger) -> None:
+    """Registra o HTML da página em DEBUG; em falhas, também em WARNING se `logs.html_em_falhas` estiver ligado."""
+    nivel = logging.WARNING if falha and html_em_falhas else logging.DEBUG
+    registrador.log(nivel, "%s: %s", descricao, HtmlPagina(driver))
@@ -0,0 +1,286 @@
+# metricas.py
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LIMITES_PADRAO = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+Rotulos = Tuple[Tuple[str, str], ...]
+
+
+def _rotulos(valores: Dict[str, Any]) -> Rotulos:
+    return tuple(sorted((k, str(v)) for k, v in valores.items()))
+
+
+def _formatar_rotulos(rotulos: Rotulos, extra: Optional[Tuple[str, str]] = None) -> str:
+    pares = list(rotulos) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    escapar = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+class Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nome: str, descricao: str) -> None:
+        self.nome = nome
+        self.descricao = descricao
+        self._lock = threading.Lock()
+        self._valores: Dict[Rotulos, Any] = {}
+
+    def cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+
+    def exportar(self) -> Dict[Rotulos, Any]:
+        with self._lock:
+            return {rotulos: (list(v) if isinstance(v, list) else v) for rotulos, v in self._valores.items()}
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1.0, **rotulos: Any) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def mesclar(self, valores: Dict[Rotulos, float]) -> None:
+        with self._lock:
+            for chave, valor in valores.items():
+                self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def linhas(self) -> List[str]:
+        return [f"{self.nome}{_formatar_rotulos(r)} {v}" for r, v in sorted(self.exportar().items())]
+
+
+class Medidor(Metrica):
+    """Valor instantâneo; não é somado ao fim da tarefa como os contadores.
+
+    Um processo filho repassa cada mudança ao pai (`repasse`), que guarda o valor atual de cada
+    origem à parte e o descarta quando o filho termina.
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, funcao: Optional[Callable[[], float]] = None) -> None:
+        super().__init__(nome, descricao)
+        self.funcao = funcao
+        self.repasse: Optional[Callable[[Dict[Rotulos, float]], None]] = None
+        self._origens: Dict[Any, Dict[Rotulos, float]] = {}
+
+    def inc(self, valor: float = 1.0, **rotulos: Any) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+            locais = dict(self._valores)
+        if self.repasse is not None:
+            self.repasse(locais)
+
+    def dec(self, valor: float = 1.0, **rotulos: Any) -> None:
+        self.inc(-valor, **rotulos)
+
+    def mesclar(self, valores: Dict[Rotulos, float]) -> None:
+        return None
+
+    def definir_origem(self, origem: Any, valores: Dict[Rotulos, float]) -> None:
+        """Substitui o valor atual informado por outro processo."""
+        with self._lock:
+            self._origens[origem] = dict(valores)
+
+    def remover_origem(self, origem: Any) -> None:
+        with self._lock:
+            self._origens.pop(origem, None)
+
+    def exportar(self) -> Dict[Rotulos, float]:
+        with self._lock:
+            valores = dict(self._valores)
+            for recebidos in self._origens.values():
+                for chave, valor in recebidos.items():
+                    valores[chave] = valores.get(chave, 0.0) + valor
+        return valores
+
+    def linhas(self) -> List[str]:
+        if self.funcao is not None:
+            return [f"{self.nome} {self.funcao()}"]
+        return [f"{self.nome}{_formatar_rotulos(r)} {v}" for r, v in sorted(self.exportar().items())]
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, descricao: str, limites: Tuple[float, ...] = LIMITES_PADRAO) -> None:
+        super().__init__(nome, descricao)
+        self.limites = limites
+
+    def observar(self, valor: float, **rotulos: Any) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            # [contagem por faixa..., soma, contagem total]
+            dados = self._valores.setdefault(chave, [0] * len(self.limites) + [0.0, 0])
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    dados[i] += 1
+                    break
+            dados[-2] += valor
+            dados[-1] += 1
+
+    def mesclar(self, valores: Dict[Rotulos, List[float]]) -> None:
+        with self._lock:
+            for chave, recebidos in valores.items():
+                dados = self._valores.setdefault(chave, [0] * len(self.limites) + [0.0, 0])
+                for i, valor in enumerate(recebidos):
+                    dados[i] += valor
+
+    def linhas(self) -> List[str]:
+        linhas = []
+        for rotulos, dados in sorted(self.exportar().items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.limites, dados):
+                acumulado += quantidade
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(rotulos, ('le', repr(float(limite))))} {acumulado}")
+            linhas.append(f"{self.nome}_bucket{_formatar_rotulos(rotulos, ('le', '+Inf'))} {dados[-1]}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(rotulos)} {dados[-2]}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(rotulos)} {dados[-1]}")
+        return linhas
+
+
+class RegistroMetricas:
+    def __init__(self) -> None:
+        self.metricas: Dict[str, Metrica] = {}
+
+    def registrar(self, metrica: Metrica) -> Any:
+        self.metricas[metrica.nome] = metrica
+        return metrica
+
+    def exportar(self) -> Dict[str, Dict[Rotulos, Any]]:
+        """Valores brutos (serializáveis) para repassar a outro processo."""
+        return {nome: metrica.exportar() for nome, metrica in self.metricas.items() if not isinstance(metrica, Medidor)}
+
+    def mesclar(self, estado: Optional[Dict[str, Dict[Rotulos, Any]]]) -> None:
+        """Soma os valores vindos de um processo filho (contadores e histogramas)."""
+        for nome, valores in (estado or {}).items():
+            metrica = self.metricas.get(nome)
+            if metrica is not None:
+                metrica.mesclar(valores)
+
+    def medidores(self) -> List[Medidor]:
+        return [metrica for metrica in self.metricas.values() if isinstance(metrica, Medidor)]
+
+    def repassar_medidores(self, enviar: Callable[[str, Dict[Rotulos, float]], None]) -> None:
+        """No processo filho: envia `(nome, valores)` a cada mudança de um medidor."""
+        for medidor in self.medidores():
+            medidor.repasse = functools.partial(enviar, medidor.nome)
+
+    def definir_medidor(self, nome: str, origem: Any, valores: Dict[Rotulos, float]) -> None:
+        """No processo pai: registra o valor atual de um medidor do filho `origem`."""
+        metrica = self.metricas.get(nome)
+        if isinstance(metrica, Medidor):
+            metrica.definir_origem(origem, valores)
+
+    def remover_origem(self, origem: Any) -> None:
+        """Descarta os medidores de um filho que terminou (inclusive se foi morto no meio)."""
+        for medidor in self.medidores():
+            medidor.remover_origem(origem)
+
+    def texto_prometheus(self) -> str:
+        linhas: List[str] = []
+        for metrica in self.metricas.values():
+            linhas.extend(metrica.cabecalho())
+            linhas.extend(metrica.linhas())
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas()
+duracao_fases = registro.registrar(Histograma("ifood_fase_duracao_segundos", "Duração de cada fase do scraping."))
+erros_fases = registro.registrar(Contador("ifood_fase_erros_total", "Fases que terminaram com exceção."))
+paginas_carregadas = registro.registrar(Contador("ifood_paginas_carregadas_total", "Páginas abertas no navegador."))
+retentativas = registro.registrar(Contador("ifood_retentativas_total", "Novas tentativas feitas pelo tenacity, por função."))
+acertos_cache = registro.registrar(Contador("ifood_cache_total", "Consultas a caches (checkpoint, catálogo, itens), por resultado."))
+drivers_ativos = registro.registrar(Medidor("ifood_drivers_ativos", "Navegadores Chrome abertos, incluindo os de processos isolados."))
+comandos_webdriver = registro.registrar(Contador("ifood_webdriver_comandos_total", "Comandos WebDriver (round-trips ao chromedriver), por fase e comando."))
+segundos_webdriver = registro.registrar(Contador("ifood_webdriver_segundos_total", "Tempo gasto em comandos WebDriver, por fase e comando."))
+
+# Tempos da tarefa em execução neste contexto (thread ou corrotina)
+_tempos_tarefa: contextvars.ContextVar[Optional["TemposTarefa"]] = contextvars.ContextVar("tempos_tarefa", default=None)
+# Fase mais interna em execução, para atribuir a ela outros custos (ex.: comandos WebDriver)
+_fase_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("fase_atual", default=None)
+
+
+class TemposTarefa:
+    """Tempo total e número de chamadas de cada fase dentro de uma tarefa."""
+
+    def __init__(self, task_id: Optional[str]) -> None:
+        self.task_id = task_id
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self.fases: Dict[str, List[float]] = {}
+
+    def adicionar(self, fase: str, duracao: float) -> None:
+        with self._lock:
+            dados = self.fases.setdefault(fase, [0.0, 0])
+            dados[0] += duracao
+            dados[1] += 1
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            fases = {fase: {"segundos": round(total, 3), "chamadas": int(chamadas)} for fase, (total, chamadas) in self.fases.items()}
+        return {"total_segundos": round(time.perf_counter() - self.inicio, 3), "fases": fases}
+
+
+@contextmanager
+def tempos_da_tarefa(task_id: Optional[str]) -> Iterator[TemposTarefa]:
+    """Ativa a coleta do detalhamento de tempos da tarefa no contexto atual."""
+    tempos = TemposTarefa(task_id)
+    token = _tempos_tarefa.set(tempos)
+    try:
+        yield tempos
+    finally:
+        _tempos_tarefa.reset(token)
+
+
+@contextmanager
+def medir_fase(fase: str) -> Iterator[None]:
+    """Mede o bloco no histograma de fases e no detalhamento da tarefa ativa, se houver."""
+    token = _fase_atual.set(fase)
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        erros_fases.inc(fase=fase)
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        _fase_atual.reset(token)
+        duracao_fases.observar(duracao, fase=fase)
+        tempos = _tempos_tarefa.get()
+        if tempos is not None:
+            tempos.adicionar(fase, duracao)
+
+
+def fase_atual() -> Optional[str]:
+    return _fase_atual.get()
+
+
+def cronometrado(fase: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorador equivalente a envolver a função em `medir_fase(fase)`."""
+    def decorador(funcao: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(funcao)
+        def envolvida(*args: Any, **kwargs: Any) -> Any:
+            with medir_fase(fase):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def registrar_retentativa(funcao: str) -> Callable[[Any], None]:
+    """Callback `before_sleep` do tenacity que conta a nova tentativa e mantém o log de antes."""
+    def before_sleep(retry_state: Any) -> None:
+        retentativas.inc(funcao=funcao)
+        logger.info(f"Tentativa {retry_state.attempt_number} de {funcao} falhou, retrying...")
+    return before_sleep
@@ -0,0 +1,138 @@
+# motor_custos.py
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from parser_produtos import converter_preco
+
+logger = logging.getLogger(__name__)
+
+
+def converter_custo_entrega(custo: str) -> float:
+    """Converte o custo de entrega em float, tratando 'Grátis' como zero."""
+    if custo.lower() == "grátis" or "grátis" in custo.lower():
+        return 0.0
+    return converter_preco(custo)
+
+
+class MatrizPrecos:
+    """Preços de `dados` convertidos uma única vez para arrays NumPy (mercados × itens).
+
+    Os produtos válidos ficam num vetor plano ordenado por (célula mercado×item, preço), de modo
+    que o mais barato de cada célula é o primeiro do seu segmento e as k alternativas seguintes
+    vêm logo depois, sem ordenar listas em Python nem procurar o vencedor em `dados`.
+    """
+
+    def __init__(self, dados: List[Dict[str, Any]], itens_pesquisa: List[Dict[str, Any]]) -> None:
+        self.dados = dados
+        self.itens = [item_data["item"] for item_data in itens_pesquisa]
+        self.quantidades = np.array([item_data["quantidade"] for item_data in itens_pesquisa], dtype=np.float64)
+        num_mercados, num_itens = len(dados), len(self.itens)
+        self.forma = (num_mercados, num_itens)
+
+        self.custo_entrega = np.array(
+            [converter_custo_entrega(m.get("custo_entrega", "Não disponível")) for m in dados], dtype=np.float64
+        )
+
+        valores: List[float] = []
+        celulas: List[int] = []
+        self.produtos: List[Dict[str, Any]] = []
+        for m, mercado in enumerate(dados):
+            produtos_mercado = mercado.get("produtos", {})
+            for i, item in enumerate(self.itens):
+                for produto in produtos_mercado.get(item, []):
+                    preco = converter_preco(produto["preco"]) if produto.get("preco") else float("inf")
+                    if preco == float("inf"):
+                        continue
+                    valores.append(preco)
+                    celulas.append(m * num_itens + i)
+                    self.produtos.append(produto)
+
+        valores_arr = np.array(valores, dtype=np.float64)
+        celulas_arr = np.array(celulas, dtype=np.int64)
+        # lexsort é estável: em caso de empate vale a ordem original da página, como no sort do Python
+        ordem = np.lexsort((valores_arr, celulas_arr))
+        self.ordem = ordem
+        self.valores = valores_arr[ordem]
+        self.celulas = celulas_arr[ordem]
+        total_celulas = num_mercados * num_itens
+        self.inicio = np.searchsorted(self.celulas, np.arange(total_celulas), side="left")
+        self.fim = np.searchsorted(self.celulas, np.arange(total_celulas), side="right")
+        self.posicao = np.arange(len(self.valores)) - self.inicio[self.celulas]
+
+        tem_produto = (self.fim > self.inicio).reshape(self.forma)
+        minimos = np.full(total_celulas, np.inf)
+        primeiros = self.inicio[self.fim > self.inicio]
+        minimos[self.fim > self.inicio] = self.valores[primeiros]
+        self.minimos = minimos.reshape(self.forma)
+        self.tem_produto = tem_produto
+
+    def custos_itens(self) -> np.ndarray:
+        """Custo (preço mínimo × quantidade) de cada mercado × item; inf onde falta o item."""
+        return self.minimos * self.quantidades
+
+    def custos_totais(self) -> np.ndarray:
+        """Custo total de cada mercado: itens encontrados + entrega (inf se nenhum item foi encontrado)."""
+        custos = np.where(self.tem_produto, self.custos_itens(), 0.0).sum(axis=1) + self.custo_entrega
+        return np.where(self.tem_produto.any(axis=1), custos, np.inf)
+
+    def ranking(self) -> np.ndarray:
+        """Índices dos mercados do mais barato ao mais caro (estável em caso de empate)."""
+        return np.argsort(self.custos_totais(), kind="stable")
+
+    def alternativas(self, k: int) -> np.ndarray:
+        """Posições (no vetor ordenado) das até k alternativas após o mais barato de cada célula."""
+        return np.nonzero((self.posicao >= 1) & (self.posicao <= k))[0]
+
+    def produto_mais_barato(self, mercado: int, item: int) -> Optional[Dict[str, Any]]:
+        celula = mercado * len(self.itens) + item
+        if self.fim[celula] == self.inicio[celula]:
+            return None
+        return self.produtos[self.ordem[self.inicio[celula]]]
+
+    def resumir_mercados(self, max_alternativas: int) -> List[float]:
+        """Preenche custo_total, produtos_escolhidos, combinacoes e itens_faltantes de cada mercado."""
+        num_itens = len(self.itens)
+        custos_itens = self.custos_itens().tolist()
+        custos_totais = self.custos_totais().tolist()
+        tem_produto = self.tem_produto.tolist()
+        quantidades = [int(q) for q in self.quantidades.tolist()]
+        inicio = self.inicio.tolist()
+        ordem = self.ordem.tolist()
+        valores = self.valores.tolist()
+        celulas = self.celulas.tolist()
+        alternativas_por_mercado: Dict[int, List[int]] = {}
+        for posicao in self.alternativas(max_alternativas).tolist():
+            alternativas_por_mercado.setdefault(celulas[posicao] // max(num_itens, 1), []).append(posicao)
+
+        for m, mercado in enumerate(self.dados):
+            produtos_escolhidos = []
+            itens_faltantes = []
+            for i, item in enumerate(self.itens):
+                if not tem_produto[m][i]:
+                    itens_faltantes.append(f"{item} ({quantidades[i]}x)")
+                    continue
+                produtos_escolhidos.append({
+                    "item": item,
+                    "quantidade": quantidades[i],
+                    "produto": self.produtos[ordem[inicio[m * num_itens + i]]],
+                    "custo": custos_itens[m][i]
+                })
+            combinacoes = []
+            for posicao in alternativas_por_mercado.get(m, []):
+                i = celulas[posicao] % num_itens
+                custo_alt = valores[posicao] * quantidades[i]
+                combinacoes.append({
+                    "item": self.itens[i],
+                    "quantidade": quantidades[i],
+                    "produto": self.produtos[ordem[posicao]],
+                    "custo": custo_alt,
+                    "diferenca": custo_alt - custos_itens[m][i]
+                })
+            custo_total = custos_totais[m]
+            mercado["custo_total"] = f"R$ {custo_total:.2f}" if custo_total != float("inf") else "N/A"
+            mercado["produtos_escolhidos"] = produtos_escolhidos
+            mercado["combinacoes"] = combinacoes
+            mercado["itens_faltantes"] = itens_faltantes
+        return custos_totais
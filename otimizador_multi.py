@@ -0,0 +1,260 @@
+# otimizador_multi.py
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from motor_custos import MatrizPrecos
+
+logger = logging.getLogger(__name__)
+
+
+def _custo_conjunto(custos: np.ndarray, entrega: np.ndarray, lojas: List[int]) -> float:
+    return float(entrega[lojas].sum() + custos[lojas].min(axis=0).sum())
+
+
+def _cobertura_conjunto(custos: np.ndarray, entrega: np.ndarray, lojas: List[int]) -> Tuple[int, float]:
+    """Itens cobertos pelas lojas e custo deles (taxas + menor preço de cada item coberto)."""
+    minimos = custos[lojas].min(axis=0)
+    cobertos = np.isfinite(minimos)
+    return int(cobertos.sum()), float(entrega[lojas].sum() + minimos[cobertos].sum())
+
+
+def otimizar_guloso(custos: np.ndarray, entrega: np.ndarray, max_lojas: int) -> Optional[List[int]]:
+    """Parte da melhor loja única e adiciona a loja de maior economia líquida enquanto compensar."""
+    num_lojas, num_itens = custos.shape
+    if num_lojas == 0:
+        return None
+    # Loja inicial: a que cobre mais itens e, entre essas, a de menor custo (itens faltantes valem 0 no desempate)
+    cobertura = np.isfinite(custos).sum(axis=1)
+    custo_unico = np.where(np.isfinite(custos), custos, 0.0).sum(axis=1) + entrega
+    inicial = int(np.lexsort((custo_unico, -cobertura))[0])
+    lojas = [inicial]
+    atual = custos[inicial].copy()
+    while len(lojas) < max_lojas:
+        descoberto = ~np.isfinite(atual)
+        novos = np.minimum(atual[None, :], custos)
+        # Economia nos itens já cobertos menos a taxa de entrega da nova loja
+        economia = np.where(np.isfinite(atual), atual, 0.0)[None, :] - np.where(np.isfinite(novos), novos, 0.0)
+        economia = np.where(descoberto[None, :] & np.isfinite(novos), 0.0, economia).sum(axis=1) - entrega
+        ganhos_cobertura = (descoberto[None, :] & np.isfinite(custos)).sum(axis=1)
+        economia[lojas] = -np.inf
+        ganhos_cobertura[lojas] = -1
+        if descoberto.any() and ganhos_cobertura.max() > 0:
+            candidatos = np.nonzero(ganhos_cobertura == ganhos_cobertura.max())[0]
+            escolhida = int(candidatos[np.argmax(economia[candidatos])])
+        elif economia.max() > 0:
+            escolhida = int(np.argmax(economia))
+        else:
+            break
+        lojas.append(escolhida)
+        atual = np.minimum(atual, custos[escolhida])
+    return lojas
+
+
+def otimizar_exato(
+    custos: np.ndarray,
+    entrega: np.ndarray,
+    max_lojas: int,
+    incumbente: Optional[List[int]] = None,
+    tempo_limite: float = 2.0
+) -> Tuple[Optional[List[int]], bool]:
+    """Branch-and-bound sobre subconjuntos de até `max_lojas` lojas.
+
+    O limite inferior de um nó soma as taxas já escolhidas, o menor preço possível de cada item entre
+    as lojas escolhidas e as ainda disponíveis e, se algum item está descoberto, a menor taxa de entrega
+    restante. Retorna (lojas, ótimo_comprovado); sem tempo, devolve a melhor solução encontrada.
+    """
+    limite = time.monotonic() + tempo_limite
+    indices_originais = np.arange(custos.shape[0])
+    if incumbente:
+        # Qualquer conjunto com a loja s custa ao menos taxa[s] + soma dos menores preços globais;
+        # lojas que já estouram o incumbente assim nunca fazem parte da solução ótima
+        piso = float(custos.min(axis=0).sum())
+        manter = (entrega + piso < _custo_conjunto(custos, entrega, incumbente)) | np.isin(indices_originais, incumbente)
+        indices_originais = indices_originais[manter]
+        incumbente = [int(np.nonzero(indices_originais == loja)[0][0]) for loja in incumbente]
+        custos = custos[manter]
+        entrega = entrega[manter]
+    num_lojas, num_itens = custos.shape
+
+    # Lojas mais promissoras primeiro, para achar boas soluções cedo e podar mais
+    custo_unico = np.where(np.isfinite(custos), custos, custos[np.isfinite(custos)].max(initial=0.0) * 2).sum(axis=1) + entrega
+    ordem = np.argsort(custo_unico, kind="stable")
+    custos_ord = custos[ordem]
+    entrega_ord = entrega[ordem]
+
+    # Mínimos de sufixo: melhor preço de cada item e menor taxa entre as lojas j..fim
+    sufixo_min = np.full((num_lojas + 1, num_itens), np.inf)
+    sufixo_taxa = np.full(num_lojas + 1, np.inf)
+    for j in range(num_lojas - 1, -1, -1):
+        sufixo_min[j] = np.minimum(sufixo_min[j + 1], custos_ord[j])
+        sufixo_taxa[j] = min(sufixo_taxa[j + 1], entrega_ord[j])
+
+    melhor_custo = np.inf
+    melhor: Optional[List[int]] = None
+    if incumbente:
+        posicoes = {int(loja): p for p, loja in enumerate(ordem)}
+        melhor = sorted(posicoes[loja] for loja in incumbente)
+        melhor_custo = _custo_conjunto(custos_ord, entrega_ord, melhor)
+
+    completo = True
+    nos = 0
+    pilha: List[Tuple[float, int, List[int], np.ndarray, float]] = [(0.0, 0, [], np.full(num_itens, np.inf), 0.0)]
+    while pilha:
+        nos += 1
+        if nos % 64 == 0 and time.monotonic() > limite:
+            completo = False
+            break
+        limite_no, proxima, escolhidas, atual, taxas = pilha.pop()
+        if limite_no >= melhor_custo:
+            continue
+        cobertos = np.isfinite(atual)
+        if escolhidas and cobertos.all():
+            custo = taxas + float(atual.sum())
+            if custo < melhor_custo:
+                melhor_custo, melhor = custo, list(escolhidas)
+        if len(escolhidas) >= max_lojas or proxima >= num_lojas:
+            continue
+
+        # Avalia todos os filhos (adicionar cada loja j >= proxima) de uma vez
+        novos = np.minimum(atual[None, :], custos_ord[proxima:])
+        novas_taxas = taxas + entrega_ord[proxima:]
+        possiveis = np.minimum(novos, sufixo_min[proxima + 1:])
+        viaveis = np.isfinite(possiveis).all(axis=1)
+        completos = np.isfinite(novos).all(axis=1)
+        limites = novas_taxas + np.where(np.isfinite(possiveis), possiveis, 0.0).sum(axis=1)
+        limites = limites + np.where(completos, 0.0, sufixo_taxa[proxima + 1:])
+        viaveis &= completos | (len(escolhidas) + 1 < max_lojas)
+        viaveis &= limites < melhor_custo
+        if escolhidas and cobertos.all():
+            # Uma loja que não baixa nenhum preço só acrescenta a taxa
+            viaveis &= (custos_ord[proxima:] < atual[None, :]).any(axis=1)
+        # Empilha em ordem inversa para visitar primeiro as lojas mais promissoras
+        for deslocamento in np.nonzero(viaveis)[0][::-1].tolist():
+            j = proxima + deslocamento
+            pilha.append((float(limites[deslocamento]), j + 1, escolhidas + [j], novos[deslocamento], float(novas_taxas[deslocamento])))
+
+    logger.info(f"Branch-and-bound: {nos} nós visitados, ótimo comprovado={completo}")
+    if melhor is None:
+        return None, completo
+    return [int(indices_originais[ordem[p]]) for p in melhor], completo
+
+
+def otimizar_cobertura_parcial(
+    custos: np.ndarray,
+    entrega: np.ndarray,
+    max_lojas: int,
+    incumbente: Optional[List[int]] = None,
+    tempo_limite: float = 2.0
+) -> Tuple[Optional[List[int]], bool]:
+    """Quando nenhum conjunto de até `max_lojas` lojas cobre todos os itens: o que cobre mais itens e,
+    entre esses, o de menor custo. Enumera os subconjuntos; sem tempo, devolve o melhor visto até ali.
+    """
+    limite = time.monotonic() + tempo_limite
+    melhor = list(incumbente) if incumbente else None
+    melhor_chave = None
+    if melhor is not None:
+        cobertos, custo = _cobertura_conjunto(custos, entrega, melhor)
+        melhor_chave = (-cobertos, custo)
+    visitados = 0
+    for tamanho in range(1, min(max_lojas, custos.shape[0]) + 1):
+        for lojas in itertools.combinations(range(custos.shape[0]), tamanho):
+            visitados += 1
+            if visitados % 256 == 0 and time.monotonic() > limite:
+                return melhor, False
+            cobertos, custo = _cobertura_conjunto(custos, entrega, list(lojas))
+            if melhor_chave is None or (-cobertos, custo) < melhor_chave:
+                melhor, melhor_chave = list(lojas), (-cobertos, custo)
+    return melhor, True
+
+
+def calcular_melhor_compra_multi(
+    matriz: MatrizPrecos,
+    max_lojas: int = 2,
+    tempo_limite: float = 2.0
+) -> Optional[Dict[str, Any]]:
+    """Melhor divisão dos itens entre até `max_lojas` mercados, considerando a taxa de entrega de cada um.
+
+    Se nenhuma combinação de até `max_lojas` mercados tem todos os itens, devolve a que cobre mais
+    itens (método `cobertura_parcial`); os que ficaram sem mercado vão para `itens_faltantes`.
+    Retorna None só quando nenhum item tem preço em um mercado com taxa de entrega conhecida.
+    """
+    custos_itens = matriz.custos_itens()
+    disponivel = np.isfinite(custos_itens).any(axis=0)
+    itens_validos = np.nonzero(disponivel)[0]
+    lojas_validas = np.nonzero(np.isfinite(matriz.custo_entrega) & np.isfinite(custos_itens[:, itens_validos]).any(axis=1))[0]
+    if len(itens_validos) == 0 or len(lojas_validas) == 0:
+        return None
+    custos = custos_itens[np.ix_(lojas_validas, itens_validos)]
+    entrega = matriz.custo_entrega[lojas_validas]
+    # Itens que só existem em lojas sem taxa conhecida também ficam de fora
+    cobriveis = np.isfinite(custos).any(axis=0)
+    custos = custos[:, cobriveis]
+    itens_validos = itens_validos[cobriveis]
+    if custos.shape[1] == 0:
+        return None
+
+    inicio = time.monotonic()
+    guloso = parcial = otimizar_guloso(custos, entrega, max_lojas)
+    if guloso is not None and not np.isfinite(custos[guloso].min(axis=0)).all():
+        guloso = None  # O guloso não cobriu tudo com K lojas; só o exato pode achar uma cobertura
+    exato, otimo = otimizar_exato(custos, entrega, max_lojas, guloso, tempo_limite)
+    lojas = exato or guloso
+    if lojas is None:
+        # Nenhuma cobertura completa com até K lojas (ou o tempo acabou antes de achar uma)
+        lojas, otimo = otimizar_cobertura_parcial(
+            custos, entrega, max_lojas, parcial, max(0.0, tempo_limite - (time.monotonic() - inicio))
+        )
+        metodo = "cobertura_parcial"
+    elif otimo:
+        metodo = "exato"
+    elif guloso is not None and sorted(lojas) == sorted(guloso):
+        metodo = "guloso"
+    else:
+        metodo = "exato_parcial"  # Tempo esgotado; melhor solução encontrada pelo branch-and-bound
+    if lojas is None:
+        return None
+    lojas = sorted(lojas)
+
+    escolha = np.argmin(custos[lojas], axis=0)
+    cobertos = np.isfinite(custos[lojas].min(axis=0))
+    por_loja: Dict[int, List[Dict[str, Any]]] = {loja: [] for loja in lojas}
+    quantidades = matriz.quantidades
+    for coluna, item_idx in enumerate(itens_validos.tolist()):
+        if not cobertos[coluna]:
+            continue
+        loja = lojas[int(escolha[coluna])]
+        mercado_idx = int(lojas_validas[loja])
+        por_loja[loja].append({
+            "item": matriz.itens[item_idx],
+            "quantidade": int(quantidades[item_idx]),
+            "produto": matriz.produto_mais_barato(mercado_idx, item_idx),
+            "custo": float(custos[loja, coluna])
+        })
+
+    _, custo_total = _cobertura_conjunto(custos, entrega, lojas)
+    mercados = []
+    for loja in lojas:
+        if not por_loja[loja]:
+            continue
+        mercado = matriz.dados[int(lojas_validas[loja])]
+        subtotal = sum(p["custo"] for p in por_loja[loja])
+        mercados.append({
+            "mercado": mercado["nome"],
+            "custo_entrega": mercado.get("custo_entrega", "Não disponível"),
+            "subtotal": f"R$ {subtotal:.2f}",
+            "produtos_escolhidos": por_loja[loja]
+        })
+    logger.info(f"Compra dividida em {len(mercados)} mercado(s) por R$ {custo_total:.2f} ({metodo}, {time.monotonic() - inicio:.3f}s)")
+    return {
+        "mercados": mercados,
+        "custo_total": f"R$ {custo_total:.2f}",
+        "metodo": metodo,
+        "otimo": otimo,
+        "itens_faltantes": [
+            matriz.itens[i] for i in np.nonzero(~np.isin(np.arange(len(matriz.itens)), itens_validos[cobertos]))[0].tolist()
+        ]
+    }
@@ -0,0 +1,203 @@
+# parser_produtos.py
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+# "R$ 12,90", "R$ 1.299,90", "$12.90"; o primeiro preço do texto é o que vale (preço atual antes do riscado)
+PADRAO_PRECO = re.compile(r'R?\$\s*(\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)')
+PADRAO_MILHAR = re.compile(r'\d{1,3}(?:\.\d{3})+')
+# "350ml", "1,5 L", "6x350ml", "2 x 1kg", "12 unidades"; alternativas mais longas antes das mais curtas
+PADRAO_MEDIDA = re.compile(
+    r'(?:\b(\d+)\s*[x×]\s*|(?<![\w.,]))(\d+(?:[.,]\d+)?)\s*'
+    r'(mililitros?|ml|litros?|lts?|l|quilos?|kilos?|kgs?|gramas?|grs?|g|unidades?|unids?|und|un)\b',
+    re.IGNORECASE
+)
+# "c/ 6", "com 12", "pack 6", "kit 3": número de embalagens quando não vem no formato NxM
+PADRAO_EMBALAGENS = re.compile(r'\b(?:c/|com|pack|kit|leve)\s*(\d+)\b', re.IGNORECASE)
+PADRAO_NUMERO = re.compile(r'\b\d+(?:[.,]\d+)?\b')
+
+# Unidade do texto -> (unidade base, fator para a base)
+UNIDADES: Dict[str, tuple] = {
+    "ml": ("ml", 1.0), "mililitro": ("ml", 1.0), "mililitros": ("ml", 1.0),
+    "l": ("ml", 1000.0), "lt": ("ml", 1000.0), "lts": ("ml", 1000.0), "litro": ("ml", 1000.0), "litros": ("ml", 1000.0),
+    "g": ("g", 1.0), "gr": ("g", 1.0), "grs": ("g", 1.0), "grama": ("g", 1.0), "gramas": ("g", 1.0),
+    "kg": ("g", 1000.0), "kgs": ("g", 1000.0), "kilo": ("g", 1000.0), "kilos": ("g", 1000.0),
+    "quilo": ("g", 1000.0), "quilos": ("g", 1000.0),
+    "un": ("un", 1.0), "und": ("un", 1.0), "unid": ("un", 1.0), "unids": ("un", 1.0),
+    "unidade": ("un", 1.0), "unidades": ("un", 1.0),
+}
+# Preço por unidade é expresso por litro, por quilo ou por unidade
+REFERENCIA = {"ml": ("L", 1000.0), "g": ("kg", 1000.0), "un": ("un", 1.0)}
+
+
+def converter_numero(texto: str) -> float:
+    """Converte '1.299,90', '1,5', '12.90' ou '1.000' (milhar) em float."""
+    if "," in texto:
+        return float(texto.replace(".", "").replace(",", "."))
+    if PADRAO_MILHAR.fullmatch(texto):
+        return float(texto.replace(".", ""))
+    return float(texto)
+
+
+@lru_cache(maxsize=65536)
+def converter_preco(preco: str) -> float:
+    """Converte um texto de preço ('R$ 12,90', 'R$ 1.299,90') em float; retorna inf se inválido.
+
+    Os textos se repetem muito entre mercados, então o resultado fica em cache.
+    """
+    try:
+        match = PADRAO_PRECO.search(preco)
+        if match:
+            return converter_numero(match.group(1))
+        return float("inf")
+    except (ValueError, AttributeError, TypeError):
+        logger.warning(f"Preço inválido encontrado: {preco}")
+        return float("inf")
+
+
+class InfoProduto:
+    """Campos extraídos uma única vez do nome/detalhes de um produto.
+
+    `quantidade` é o conteúdo de uma embalagem na unidade base (ml, g ou un) e `embalagens` o número
+    de embalagens vendidas juntas ("6x350ml" -> 350 ml × 6).
+    """
+
+    __slots__ = ("preco", "quantidade", "unidade", "embalagens", "valor_original", "numeros")
+
+    def __init__(
+        self,
+        preco: float,
+        quantidade: Optional[float],
+        unidade: Optional[str],
+        embalagens: int,
+        valor_original: Optional[float],
+        numeros: FrozenSet[float]
+    ) -> None:
+        self.preco = preco
+        self.quantidade = quantidade
+        self.unidade = unidade
+        self.embalagens = embalagens
+        self.valor_original = valor_original
+        self.numeros = numeros
+
+    @property
+    def quantidade_total(self) -> Optional[float]:
+        if self.quantidade is None:
+            return None
+        return self.quantidade * self.embalagens
+
+    @property
+    def preco_por_unidade(self) -> Optional[float]:
+        """Preço por litro, por quilo ou por unidade; None sem preço ou sem medida."""
+        total = self.quantidade_total
+        if not total or self.unidade is None or self.preco == float("inf"):
+            return None
+        return self.preco / (total / REFERENCIA[self.unidade][1])
+
+    def como_dict(self) -> Optional[Dict[str, Any]]:
+        """Resumo serializável da medida (None se o produto não informa tamanho)."""
+        if self.unidade is None:
+            return None
+        preco_unitario = self.preco_por_unidade
+        return {
+            "quantidade": self.quantidade,
+            "unidade": self.unidade,
+            "embalagens": self.embalagens,
+            "preco_por_unidade": round(preco_unitario, 4) if preco_unitario is not None else None,
+            "unidade_referencia": REFERENCIA[self.unidade][0]
+        }
+
+
+def _extrair_medida(texto: str) -> Optional[tuple]:
+    """(quantidade base, unidade base, embalagens, valor original) da primeira medida do texto."""
+    medida = None
+    contagem = None
+    for match in PADRAO_MEDIDA.finditer(texto):
+        unidade, fator = UNIDADES[match.group(3).lower()]
+        valor = converter_numero(match.group(2))
+        multiplicador = int(match.group(1)) if match.group(1) else None
+        if unidade == "un":
+            # "12 unidades" depois de "350ml" é o número de latas do pack, não a medida
+            if contagem is None:
+                contagem = int(valor)
+            continue
+        if medida is None:
+            medida = (valor * fator, unidade, multiplicador, valor)
+    if medida is None:
+        if contagem is None:
+            return None
+        return float(contagem), "un", 1, float(contagem)
+    quantidade, unidade, multiplicador, valor = medida
+    if multiplicador is None:
+        multiplicador = contagem
+    if multiplicador is None:
+        pack = PADRAO_EMBALAGENS.search(texto)
+        multiplicador = int(pack.group(1)) if pack else 1
+    return quantidade, unidade, max(multiplicador, 1), valor
+
+
+@lru_cache(maxsize=65536)
+def analisar_produto(nome: str, detalhes: str = "", preco: str = "") -> InfoProduto:
+    """Extrai preço, tamanho da embalagem e unidade do produto; a medida vem do nome ou, na falta, dos detalhes."""
+    medida = _extrair_medida(nome) or _extrair_medida(detalhes or "")
+    numeros = frozenset(converter_numero(n) for n in PADRAO_NUMERO.findall(nome))
+    preco_valor = converter_preco(preco) if preco else float("inf")
+    if medida is None:
+        return InfoProduto(preco_valor, None, None, 1, None, numeros)
+    quantidade, unidade, embalagens, valor = medida
+    return InfoProduto(preco_valor, quantidade, unidade, embalagens, valor, numeros)
+
+
+class FiltroProduto:
+    """Filtro de tamanho compilado uma vez a partir do texto pesquisado ("coca 350", "leite 1l", "arroz 5 kg").
+
+    Com unidade, compara a medida normalizada da embalagem (1 L aceita 1000 ml); só com número, aceita
+    qualquer medida com esse valor ou o número solto no nome, como "350" em "Coca-Cola Lata 350".
+    """
+
+    def __init__(self, item_pesquisa: str) -> None:
+        self.valor: Optional[float] = None
+        self.quantidade: Optional[float] = None
+        self.unidade: Optional[str] = None
+        self.embalagens: Optional[int] = None
+        self.texto: Optional[str] = None
+        medida = PADRAO_MEDIDA.search(item_pesquisa)
+        if medida:
+            self.texto = medida.group(0).replace(" ", "")
+            unidade, fator = UNIDADES[medida.group(3).lower()]
+            self.valor = converter_numero(medida.group(2))
+            self.quantidade = self.valor * fator
+            self.unidade = unidade
+            self.embalagens = int(medida.group(1)) if medida.group(1) else None
+            restante = item_pesquisa[:medida.start()] + " " + item_pesquisa[medida.end():]
+        else:
+            restante = item_pesquisa
+        termos = restante.split()
+        numero = next((t for t in termos if t.isdigit()), None)
+        if numero is not None and self.valor is None:
+            self.valor = float(numero)
+            self.texto = numero
+        self.termo_principal = " ".join(t for t in termos if not t.isdigit())
+
+    @property
+    def ativo(self) -> bool:
+        return self.valor is not None
+
+    def aceita(self, info: InfoProduto) -> bool:
+        if not self.ativo:
+            return True
+        if self.unidade is not None:
+            if info.unidade != self.unidade or info.quantidade is None:
+                return False
+            if self.embalagens and info.embalagens != self.embalagens:
+                return False
+            return abs(info.quantidade - self.quantidade) <= 1e-6 * max(self.quantidade, 1.0)
+        return info.valor_original == self.valor or self.valor in info.numeros
+
+
+@lru_cache(maxsize=1024)
+def compilar_filtro(item_pesquisa: str) -> FiltroProduto:
+    return FiltroProduto(item_pesquisa)
@@ -0,0 +1,105 @@
+# perfilador.py
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PERFIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "perfis")
+MODO_AMOSTRAGEM = "amostragem"
+MODO_DETERMINISTICO = "deterministico"
+# Extensão do arquivo de cada modo: pilhas colapsadas (flamegraph.pl, speedscope) ou pstats (snakeviz, flameprof)
+EXTENSOES = {MODO_AMOSTRAGEM: ".folded", MODO_DETERMINISTICO: ".prof"}
+
+
+def caminho_perfil(task_id: str, modo: str, pasta: str = PERFIS_DIR) -> str:
+    nome = re.sub(r"[^\w.-]", "_", task_id)
+    return os.path.join(pasta, nome + EXTENSOES[modo])
+
+
+def localizar_perfil(task_id: str, pasta: str = PERFIS_DIR) -> Optional[str]:
+    """Arquivo de perfil gravado para a tarefa (o mais recente, se houver dos dois modos), ou None."""
+    existentes = [caminho_perfil(task_id, modo, pasta) for modo in EXTENSOES]
+    existentes = [caminho for caminho in existentes if os.path.exists(caminho)]
+    return max(existentes, key=os.path.getmtime) if existentes else None
+
+
+class AmostradorPilhas(threading.Thread):
+    """Lê a pilha de todas as threads do processo a cada `intervalo` segundos e conta as pilhas iguais.
+
+    O resultado sai no formato de pilhas colapsadas ("thread;modulo:funcao;... contagem"), aceito
+    direto por flamegraph.pl e speedscope. O custo fica na thread do amostrador, não no código medido.
+    """
+
+    def __init__(self, intervalo: float = 0.01) -> None:
+        super().__init__(name="amostrador-pilhas", daemon=True)
+        self.intervalo = intervalo
+        self.amostras: Dict[Tuple[str, ...], int] = {}
+        self.total = 0
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while quadro is not None:
+                    codigo = quadro.f_code
+                    pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    quadro = quadro.f_back
+                pilha.append(nomes.get(ident, str(ident)))
+                chave = tuple(reversed(pilha))
+                self.amostras[chave] = self.amostras.get(chave, 0) + 1
+            self.total += 1
+
+    def parar(self) -> None:
+        self._parar.set()
+        self.join()
+
+    def salvar(self, caminho: str) -> None:
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, contagem in sorted(self.amostras.items(), key=lambda a: -a[1]):
+                f.write(";".join(pilha) + f" {contagem}\n")
+
+
+@contextmanager
+def perfilar(task_id: str, modo: str = MODO_AMOSTRAGEM, intervalo: float = 0.01, pasta: str = PERFIS_DIR) -> Iterator[None]:
+    """Perfila o bloco e grava o resultado em `pasta` com o nome do task_id."""
+    if modo not in EXTENSOES:
+        raise ValueError(f"Modo de perfil inválido: '{modo}' (use {', '.join(EXTENSOES)})")
+    os.makedirs(pasta, exist_ok=True)
+    caminho = caminho_perfil(task_id, modo, pasta)
+    inicio = time.perf_counter()
+    if modo == MODO_AMOSTRAGEM:
+        amostrador = AmostradorPilhas(intervalo)
+        amostrador.start()
+        try:
+            yield
+        finally:
+            amostrador.parar()
+            amostrador.salvar(caminho)
+    else:
+        # cProfile só vê a thread que o ativou (as threads de download de imagens ficam de fora)
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            perfil.dump_stats(caminho)
+    logger.info(f"Perfil ({modo}) da tarefa {task_id} gravado em {caminho} após {time.perf_counter() - inicio:.1f}s")
+
+
+def executar_com_perfil(task_id: str, modo: str, intervalo: float, funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """`funcao(*args, **kwargs)` sob `perfilar`; função de módulo para poder rodar em um processo isolado."""
+    with perfilar(task_id, modo, intervalo):
+        return funcao(*args, **kwargs)
@@ -1,6 +1,280 @@
 # progresso.py
+import json
+import logging
+import os
+import sqlite3
 import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
 
 progresso_atual = {"percentual": 0, "mensagem": "Iniciando..."}
-progresso_lock = threading.Lock()  # Lock para sincronização entre threads
-progresso_por_task = {}
\ No newline at end of file
+PROGRESSO_PADRAO = {"percentual": 0, "mensagem": "Aguardando..."}
+TEMPO_RETENCAO = 6 * 3600  # segundos que tarefas encerradas ficam disponíveis para consulta
+
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+
+class ArmazenamentoProgresso:
+    """Interface do armazenamento de progresso, eventos parciais e status das tarefas."""
+
+    compartilhado = False  # True se outros processos enxergam as mesmas tarefas
+
+    def atualizar(self, task_id: str, percentual: float, mensagem: str) -> None:
+        raise NotImplementedError
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Progresso e status do task_id, ou None se a tarefa é desconhecida."""
+        raise NotImplementedError
+
+    def definir_status(self, task_id: str, status: str, resultado: Optional[Dict[str, Any]] = None, erro: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def obter_resultado(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def publicar_evento(self, task_id: str, tipo: str, dados: Any) -> None:
+        raise NotImplementedError
+
+    def obter_eventos(self, task_id: str, desde: int = 0) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def limpar(self, task_id: str) -> None:
+        raise NotImplementedError
+
+
+class ProgressoMemoria(ArmazenamentoProgresso):
+    """Armazenamento em dicionários do próprio processo (uma única instância da API)."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()  # Lock para sincronização entre threads
+        self.progresso_por_task: Dict[str, Dict[str, Any]] = {}
+        self.eventos_por_task: Dict[str, List[Dict[str, Any]]] = {}  # Resultados parciais enviados via SSE
+        self.resultados_por_task: Dict[str, Dict[str, Any]] = {}
+
+    def atualizar(self, task_id: str, percentual: float, mensagem: str) -> None:
+        with self.lock:
+            progresso = self.progresso_por_task.setdefault(task_id, {"status": STATUS_EXECUTANDO, "erro": None})
+            progresso.update({"percentual": percentual, "mensagem": mensagem, "atualizado_em": time.time()})
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            progresso = self.progresso_por_task.get(task_id)
+            if not progresso:
+                return None
+            return {k: v for k, v in progresso.items() if k != "atualizado_em"}
+
+    def definir_status(self, task_id: str, status: str, resultado: Optional[Dict[str, Any]] = None, erro: Optional[str] = None) -> None:
+        with self.lock:
+            progresso = self.progresso_por_task.setdefault(task_id, dict(PROGRESSO_PADRAO))
+            progresso.update({"status": status, "erro": erro, "atualizado_em": time.time()})
+            if resultado is not None:
+                self.resultados_por_task[task_id] = resultado
+            if status != STATUS_EXECUTANDO:
+                self._remover_expirados(time.time() - TEMPO_RETENCAO)
+
+    def obter_resultado(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self.resultados_por_task.get(task_id)
+
+    def publicar_evento(self, task_id: str, tipo: str, dados: Any) -> None:
+        with self.lock:
+            eventos = self.eventos_por_task.setdefault(task_id, [])
+            eventos.append({"id": len(eventos), "tipo": tipo, "dados": dados})
+
+    def obter_eventos(self, task_id: str, desde: int = 0) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.eventos_por_task.get(task_id, [])[desde:])
+
+    def limpar(self, task_id: str) -> None:
+        with self.lock:
+            self.progresso_por_task.pop(task_id, None)
+            self.eventos_por_task.pop(task_id, None)
+            self.resultados_por_task.pop(task_id, None)
+
+    def _remover_expirados(self, limite: float) -> None:
+        expirados = [
+            task_id for task_id, progresso in self.progresso_por_task.items()
+            if progresso.get("status") != STATUS_EXECUTANDO and progresso.get("atualizado_em", 0) < limite
+        ]
+        for task_id in expirados:
+            self.progresso_por_task.pop(task_id, None)
+            self.eventos_por_task.pop(task_id, None)
+            self.resultados_por_task.pop(task_id, None)
+
+
+class ProgressoSQLite(ArmazenamentoProgresso):
+    """Armazenamento em arquivo SQLite compartilhado pelos processos do host.
+
+    Permite rodar a API com `uvicorn --workers N` (ou vários containers com o mesmo volume):
+    o /progresso/{task_id} de qualquer worker enxerga a tarefa iniciada em outro.
+    """
+
+    compartilhado = True
+
+    def __init__(self, caminho: str) -> None:
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        conexao = self._conexao()
+        conexao.execute(
+            """CREATE TABLE IF NOT EXISTS progresso (
+                task_id TEXT PRIMARY KEY,
+                percentual REAL NOT NULL DEFAULT 0,
+                mensagem TEXT,
+                status TEXT NOT NULL,
+                resultado TEXT,
+                erro TEXT,
+                atualizado_em REAL NOT NULL
+            )"""
+        )
+        conexao.execute(
+            """CREATE TABLE IF NOT EXISTS eventos (
+                task_id TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                PRIMARY KEY (task_id, id)
+            )"""
+        )
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def atualizar(self, task_id: str, percentual: float, mensagem: str) -> None:
+        self._conexao().execute(
+            """INSERT INTO progresso (task_id, percentual, mensagem, status, atualizado_em) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(task_id) DO UPDATE SET percentual = excluded.percentual, mensagem = excluded.mensagem,
+               atualizado_em = excluded.atualizado_em""",
+            (task_id, percentual, mensagem, STATUS_EXECUTANDO, time.time())
+        )
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        linha = self._conexao().execute(
+            "SELECT percentual, mensagem, status, erro FROM progresso WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if not linha:
+            return None
+        return {"percentual": linha[0], "mensagem": linha[1], "status": linha[2], "erro": linha[3]}
+
+    def definir_status(self, task_id: str, status: str, resultado: Optional[Dict[str, Any]] = None, erro: Optional[str] = None) -> None:
+        agora = time.time()
+        self._conexao().execute(
+            """INSERT INTO progresso (task_id, percentual, mensagem, status, resultado, erro, atualizado_em)
+               VALUES (?, 0, ?, ?, ?, ?, ?)
+               ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, erro = excluded.erro,
+               resultado = COALESCE(excluded.resultado, progresso.resultado), atualizado_em = excluded.atualizado_em""",
+            (task_id, PROGRESSO_PADRAO["mensagem"], status,
+             json.dumps(resultado, ensure_ascii=False) if resultado is not None else None, erro, agora)
+        )
+        if status != STATUS_EXECUTANDO:
+            self._remover_expirados(agora - TEMPO_RETENCAO)
+
+    def obter_resultado(self, task_id: str) -> Optional[Dict[str, Any]]:
+        linha = self._conexao().execute("SELECT resultado FROM progresso WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(linha[0]) if linha and linha[0] else None
+
+    def publicar_evento(self, task_id: str, tipo: str, dados: Any) -> None:
+        # O id é calculado dentro da mesma instrução, então processos concorrentes não repetem ids
+        self._conexao().execute(
+            """INSERT INTO eventos (task_id, id, tipo, dados)
+               SELECT ?, COALESCE(MAX(id) + 1, 0), ?, ? FROM eventos WHERE task_id = ?""",
+            (task_id, tipo, json.dumps(dados, ensure_ascii=False), task_id)
+        )
+
+    def obter_eventos(self, task_id: str, desde: int = 0) -> List[Dict[str, Any]]:
+        linhas = self._conexao().execute(
+            "SELECT id, tipo, dados FROM eventos WHERE task_id = ? AND id >= ? ORDER BY id", (task_id, desde)
+        ).fetchall()
+        return [{"id": linha[0], "tipo": linha[1], "dados": json.loads(linha[2])} for linha in linhas]
+
+    def limpar(self, task_id: str) -> None:
+        conexao = self._conexao()
+        conexao.execute("DELETE FROM eventos WHERE task_id = ?", (task_id,))
+        conexao.execute("DELETE FROM progresso WHERE task_id = ?", (task_id,))
+
+    def _remover_expirados(self, limite: float) -> None:
+        conexao = self._conexao()
+        conexao.execute(
+            "DELETE FROM eventos WHERE task_id IN (SELECT task_id FROM progresso WHERE status != ? AND atualizado_em < ?)",
+            (STATUS_EXECUTANDO, limite)
+        )
+        conexao.execute("DELETE FROM progresso WHERE status != ? AND atualizado_em < ?", (STATUS_EXECUTANDO, limite))
+
+
+def criar_armazenamento(url: Optional[str]) -> ArmazenamentoProgresso:
+    """Cria o armazenamento a partir de uma URL: vazio/'memoria' ou 'sqlite:///caminho/progresso.db'."""
+    if not url or url == "memoria":
+        return ProgressoMemoria()
+    if url.startswith("sqlite://"):
+        return ProgressoSQLite(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):])
+    raise ValueError(f"Backend de progresso não suportado: {url}")
+
+
+# IFOOD_PROGRESSO=sqlite:///dados_ifood/progresso.db compartilha o progresso entre processos
+armazenamento: ArmazenamentoProgresso = criar_armazenamento(os.environ.get("IFOOD_PROGRESSO"))
+ouvintes_progresso: List[Callable[[str, float, str], None]] = []  # Ex.: worker repassando o progresso para a fila
+
+
+def registrar_ouvinte(ouvinte: Callable[[str, float, str], None]) -> None:
+    """Registra uma função chamada a cada atualização de progresso (task_id, percentual, mensagem)."""
+    ouvintes_progresso.append(ouvinte)
+
+
+def atualizar_progresso(task_id: Optional[str], percentual: float, mensagem: str) -> None:
+    """Atualiza o percentual e a mensagem de progresso de um task_id."""
+    if not task_id:
+        return
+    armazenamento.atualizar(task_id, percentual, mensagem)
+    for ouvinte in list(ouvintes_progresso):
+        try:
+            ouvinte(task_id, percentual, mensagem)
+        except Exception as e:
+            logger.warning(f"Erro ao repassar progresso de {task_id}: {e}")
+
+
+def definir_status(task_id: Optional[str], status: str, resultado: Optional[Dict[str, Any]] = None, erro: Optional[str] = None) -> None:
+    """Marca a tarefa como executando, concluída (guardando o resultado) ou com erro."""
+    if not task_id:
+        return
+    armazenamento.definir_status(task_id, status, resultado, erro)
+
+
+def publicar_evento(task_id: Optional[str], tipo: str, dados: Any) -> None:
+    """Registra um resultado parcial (mercado, produtos, estimativa...) para o task_id."""
+    if not task_id:
+        return
+    armazenamento.publicar_evento(task_id, tipo, dados)
+
+
+def obter_eventos(task_id: str, desde: int = 0) -> List[Dict[str, Any]]:
+    """Retorna os eventos do task_id a partir do índice `desde`."""
+    return armazenamento.obter_eventos(task_id, desde)
+
+
+def obter_progresso(task_id: str) -> Dict[str, Any]:
+    """Retorna uma cópia do progresso atual do task_id."""
+    return armazenamento.obter(task_id) or dict(PROGRESSO_PADRAO)
+
+
+def tarefa_conhecida(task_id: str) -> bool:
+    return armazenamento.obter(task_id) is not None
+
+
+def obter_resultado(task_id: str) -> Optional[Dict[str, Any]]:
+    """Resultado final guardado por definir_status, se a tarefa já concluiu."""
+    return armazenamento.obter_resultado(task_id)
+
+
+def limpar_task(task_id: str) -> None:
+    """Descarta progresso e eventos de um task_id já encerrado."""
+    armazenamento.limpar(task_id)
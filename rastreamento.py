@@ -0,0 +1,144 @@
+# rastreamento.py
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from metricas import comandos_webdriver, fase_atual, segundos_webdriver
+
+logger = logging.getLogger(__name__)
+
+RASTROS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_ifood", "rastros")
+SEM_FASE = "sem_fase"
+
+# Rastreador da tarefa em execução; drivers criados dentro dela (inclusive reciclados) registram nele
+_rastreador_tarefa: contextvars.ContextVar[Optional["RastreadorComandos"]] = contextvars.ContextVar("rastreador_tarefa", default=None)
+
+
+class RastreadorComandos:
+    """Registra os comandos WebDriver de uma tarefa com duração e a fase em que foram feitos.
+
+    Cada `find_element`, `.text`, `get_attribute` ou `execute_script` é um round-trip HTTP ao
+    chromedriver; o resumo por fase mostra os laços mais falantes e confirma se uma otimização
+    realmente cortou comandos. Com `guardar_comandos`, cada comando também fica na lista para `salvar`.
+    """
+
+    def __init__(self, task_id: Optional[str] = None, guardar_comandos: bool = False, max_comandos: int = 100000) -> None:
+        self.task_id = task_id
+        self.guardar_comandos = guardar_comandos
+        self.max_comandos = max_comandos
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        # fase -> comando -> [chamadas, segundos]
+        self.por_fase: Dict[str, Dict[str, List[float]]] = {}
+        self.comandos: List[Dict[str, Any]] = []
+        self.descartados = 0
+
+    def registrar(self, fase: str, comando: str, inicio: float, duracao: float, erro: Optional[str] = None) -> None:
+        with self._lock:
+            dados = self.por_fase.setdefault(fase, {}).setdefault(comando, [0, 0.0])
+            dados[0] += 1
+            dados[1] += duracao
+            if not self.guardar_comandos:
+                return
+            if len(self.comandos) >= self.max_comandos:
+                self.descartados += 1
+                return
+            registro = {"t": round(inicio - self.inicio, 4), "fase": fase, "comando": comando, "ms": round(duracao * 1000, 2)}
+            if erro:
+                registro["erro"] = erro
+            self.comandos.append(registro)
+
+    def resumo(self) -> Dict[str, Any]:
+        """Comandos e segundos por fase, com o detalhe por comando (mais frequente primeiro)."""
+        with self._lock:
+            fases = {}
+            for fase, comandos in self.por_fase.items():
+                fases[fase] = {
+                    "comandos": int(sum(c[0] for c in comandos.values())),
+                    "segundos": round(sum(c[1] for c in comandos.values()), 3),
+                    "por_comando": {
+                        nome: {"chamadas": int(chamadas), "segundos": round(segundos, 3)}
+                        for nome, (chamadas, segundos) in sorted(comandos.items(), key=lambda c: -c[1][0])
+                    }
+                }
+        return {
+            "comandos": sum(f["comandos"] for f in fases.values()),
+            "segundos": round(sum(f["segundos"] for f in fases.values()), 3),
+            "fases": dict(sorted(fases.items(), key=lambda f: -f[1]["segundos"]))
+        }
+
+    def salvar(self, pasta: str = RASTROS_DIR) -> Optional[str]:
+        """Grava os comandos guardados em JSONL (um comando por linha) e retorna o caminho."""
+        if not self.guardar_comandos:
+            return None
+        os.makedirs(pasta, exist_ok=True)
+        nome = re.sub(r"[^\w.-]", "_", self.task_id or time.strftime("%Y%m%d_%H%M%S"))
+        caminho = os.path.join(pasta, f"{nome}.jsonl")
+        with self._lock:
+            comandos = list(self.comandos)
+        with open(caminho, "w", encoding="utf-8") as f:
+            for registro in comandos:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        if self.descartados:
+            logger.warning(f"Rastro de {self.task_id}: {self.descartados} comandos além de {self.max_comandos} não foram guardados")
+        logger.info(f"Rastro de comandos WebDriver gravado em {caminho} ({len(comandos)} comandos)")
+        return caminho
+
+
+@contextmanager
+def rastrear_tarefa(task_id: Optional[str], config: Optional[Dict[str, Any]] = None) -> Iterator[Optional[RastreadorComandos]]:
+    """Ativa o rastreador da tarefa conforme a seção `rastreamento` do config; ao sair grava o arquivo, se pedido."""
+    config = config or {}
+    if not config.get("habilitado", True):
+        yield None
+        return
+    rastreador = RastreadorComandos(task_id, bool(config.get("gravar_arquivo", False)), int(config.get("max_comandos", 100000)))
+    token = _rastreador_tarefa.set(rastreador)
+    try:
+        yield rastreador
+    finally:
+        _rastreador_tarefa.reset(token)
+        try:
+            rastreador.salvar()
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o rastro de comandos de {task_id}: {e}")
+
+
+def instrumentar_driver(driver: Any, rastreador: Optional[RastreadorComandos] = None) -> Any:
+    """Envolve `driver.execute` (por onde passam os comandos do driver e de seus WebElements).
+
+    Sempre alimenta os contadores do /metrics; registra também no `rastreador` informado ou,
+    sem ele, no da tarefa ativa.
+    """
+    rastreador = rastreador or _rastreador_tarefa.get()
+    if getattr(driver, "_execute_original", None) is not None:
+        driver._rastreador = rastreador
+        return driver
+    original = driver.execute
+    driver._execute_original = original
+    driver._rastreador = rastreador
+
+    def execute(comando: str, params: Optional[dict] = None) -> Any:
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            return original(comando, params)
+        except Exception as e:
+            erro = type(e).__name__
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            fase = fase_atual() or SEM_FASE
+            comandos_webdriver.inc(fase=fase, comando=comando)
+            segundos_webdriver.inc(duracao, fase=fase, comando=comando)
+            if driver._rastreador is not None:
+                driver._rastreador.registrar(fase, comando, inicio, duracao, erro)
+
+    driver.execute = execute
+    return driver
@@ -0,0 +1,97 @@
+# relevancia.py
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PADRAO_TOKEN = re.compile(r'[a-z0-9]+')
+PADRAO_MEDIDA = re.compile(r'^\d+(?:[x×]\d+)?(?:ml|l|lt|g|gr|kg|un|und)?$')
+PALAVRAS_VAZIAS = frozenset({"a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "com", "c", "para", "sem", "tipo"})
+
+# Peso de cada componente da pontuação
+PESO_COBERTURA = 0.7   # fração dos termos pesquisados encontrados no nome
+PESO_PRECISAO = 0.2    # fração das palavras do nome que correspondem a algum termo pesquisado
+PESO_INICIO = 0.1      # o nome começa pelo produto pesquisado ("Leite Integral" x "Bolo de Leite")
+SIMILARIDADE_MINIMA = 0.5
+
+
+@lru_cache(maxsize=65536)
+def normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos: 'Feijão' -> 'feijao'."""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokens(texto: str) -> List[str]:
+    """Palavras relevantes do texto; tamanhos e palavras vazias ficam de fora (o tamanho é tratado pelo filtro)."""
+    return [t for t in PADRAO_TOKEN.findall(normalizar(texto)) if t not in PALAVRAS_VAZIAS and not PADRAO_MEDIDA.match(t)]
+
+
+@lru_cache(maxsize=65536)
+def trigramas(token: str) -> FrozenSet[str]:
+    ajustado = f"  {token} "
+    return frozenset(ajustado[i:i + 3] for i in range(len(ajustado) - 2))
+
+
+def similaridade(termo: str, palavra: str) -> float:
+    """1 para palavras iguais, 0.9 para prefixo (plural, abreviação) e Dice de trigramas para o resto."""
+    if termo == palavra:
+        return 1.0
+    if min(len(termo), len(palavra)) >= 3 and (palavra.startswith(termo) or termo.startswith(palavra)):
+        return 0.9
+    a, b = trigramas(termo), trigramas(palavra)
+    dice = 2 * len(a & b) / (len(a) + len(b))
+    return dice if dice >= SIMILARIDADE_MINIMA else 0.0
+
+
+class IndiceRelevancia:
+    """Pontua nomes de produtos contra um texto pesquisado, com os termos e trigramas preparados uma vez."""
+
+    def __init__(self, consulta: str) -> None:
+        self.consulta = consulta
+        self.termos = tokens(consulta)
+        for termo in self.termos:
+            trigramas(termo)
+
+    def pontuar(self, nome: Optional[str]) -> float:
+        """Pontuação entre 0 e 1; sem termos pesquisáveis todo produto vale 1."""
+        if not self.termos:
+            return 1.0
+        palavras = tokens(nome or "")
+        if not palavras:
+            return 0.0
+        melhores_termos = [0.0] * len(self.termos)
+        palavras_correspondidas = 0
+        for palavra in palavras:
+            melhor_palavra = 0.0
+            for t, termo in enumerate(self.termos):
+                s = similaridade(termo, palavra)
+                if s > melhores_termos[t]:
+                    melhores_termos[t] = s
+                melhor_palavra = max(melhor_palavra, s)
+            if melhor_palavra > 0:
+                palavras_correspondidas += 1
+        cobertura = sum(melhores_termos) / len(self.termos)
+        precisao = palavras_correspondidas / len(palavras)
+        inicio = max(similaridade(termo, palavras[0]) for termo in self.termos)
+        return PESO_COBERTURA * cobertura + PESO_PRECISAO * precisao + PESO_INICIO * inicio
+
+    def ranquear(self, nomes: Sequence[Optional[str]], limiar: float = 0.0) -> List[Tuple[int, float]]:
+        """(índice, pontuação) dos nomes com pontuação >= limiar, do mais ao menos relevante.
+
+        Empates mantêm a ordem da página, que já reflete a relevância do próprio site.
+        """
+        pontuados = [(i, self.pontuar(nome)) for i, nome in enumerate(nomes)]
+        aceitos = [(i, p) for i, p in pontuados if p >= limiar]
+        aceitos.sort(key=lambda par: -par[1])
+        if len(aceitos) < len(pontuados):
+            logger.info(f"Relevância para '{self.consulta}': {len(pontuados) - len(aceitos)} de {len(pontuados)} produtos abaixo de {limiar}")
+        return aceitos
+
+
+@lru_cache(maxsize=1024)
+def compilar_indice(consulta: str) -> IndiceRelevancia:
+    return IndiceRelevancia(consulta)
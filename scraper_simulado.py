@@ -0,0 +1,156 @@
+# scraper_simulado.py
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from ifood_scraper import EstimativaMelhorCompra, calcular_melhor_compra, guardar_no_cache_itens, url_imagem_local
+from localizacao import Localizacao
+from metricas import medir_fase, tempos_da_tarefa
+from progresso import atualizar_progresso, publicar_evento
+
+logger = logging.getLogger(__name__)
+
+PADRAO = {
+    "duracao_segundos": 5.0,   # duração total da tarefa simulada
+    "variacao": 0.2,           # ± fração aleatória da duração
+    "mercados": 20,            # limitado também por max_items
+    "produtos_por_item": 10,   # limitado também por max_produtos
+    "imagens": 20,             # arquivos distintos em imagens_pasta (simulado_<n>.png)
+    "tamanho_imagem_kb": 30
+}
+
+# Custos de entrega e preços sintéticos, compartilhados com benchmark_custos
+ENTREGAS = ["Grátis", "R$ 5,99", "R$ 9,90", "R$ 12,00", "Não disponível"]
+
+
+def gerar_preco(gerador: random.Random) -> str:
+    """Texto de preço realista, incluindo os casos que a conversão precisa tolerar."""
+    sorteio = gerador.random()
+    valor = gerador.uniform(0.5, 80)
+    if sorteio < 0.02:
+        return "Não disponível"
+    if sorteio < 0.03:
+        return ""
+    if sorteio < 0.05:
+        return f"R$ {valor:.2f} R$ {valor * 1.2:.2f}".replace(".", ",")  # Promoção com preço riscado
+    if sorteio < 0.06:
+        milhar = gerador.uniform(1000, 3000)
+        return "R$ " + f"{milhar:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if sorteio < 0.07:
+        return f"R${valor:.2f}".replace(".", ",")
+    return f"R$ {valor:.2f}".replace(".", ",")
+
+
+def opcoes_simulacao(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Seção `simulacao` do config sobreposta pelo JSON da variável IFOOD_SIMULACAO, se houver."""
+    opcoes = {**PADRAO, **((config or {}).get("simulacao") or {})}
+    try:
+        extra = json.loads(os.environ.get("IFOOD_SIMULACAO") or "{}")
+    except json.JSONDecodeError:
+        extra = {}
+    if isinstance(extra, dict):
+        opcoes.update(extra)
+    return opcoes
+
+
+def garantir_imagens(pasta: str, quantidade: int, tamanho_kb: int) -> List[str]:
+    """Cria (uma vez) imagens de ruído, que não comprimem, com o tamanho aproximado pedido."""
+    os.makedirs(pasta, exist_ok=True)
+    lado = max(8, int((tamanho_kb * 1024 / 3) ** 0.5))
+    nomes = []
+    for i in range(quantidade):
+        nome = f"simulado_{i}.png"
+        caminho = os.path.join(pasta, nome)
+        if not os.path.exists(caminho):
+            Image.effect_noise((lado, lado), 64).convert("RGB").save(caminho)
+        nomes.append(nome)
+    return nomes
+
+
+def scrape_simulado(
+    type_search: str,
+    max_items: int = 10,
+    max_produtos: int = 10,
+    itens_pesquisa: List[Dict[str, Any]] = [{"item": "Coca-Cola", "quantidade": 1}],
+    output_file: str = "./dados_ifood/ifood_data.json",
+    imagens_pasta: str = "imagens_ifood",
+    config: Optional[Dict[str, Any]] = None,
+    task_id: Optional[str] = None,
+    localizacao: Optional[Localizacao] = None,
+    limpar_imagens: bool = True
+) -> None:
+    """Substituto de scrape_ifood_mercados sem navegador, para testes de carga da API.
+
+    Publica progresso e eventos no mesmo ritmo relativo do scraper real, gera um resultado do mesmo
+    formato (com o tamanho configurado) e grava o arquivo de saída.
+    """
+    opcoes = opcoes_simulacao(config)
+    gerador = random.Random(task_id)
+    duracao = float(opcoes["duracao_segundos"]) * (1 + gerador.uniform(-1, 1) * float(opcoes["variacao"]))
+    num_mercados = max(1, min(max_items, int(opcoes["mercados"])))
+    produtos_por_item = max(1, min(max_produtos, int(opcoes["produtos_por_item"])))
+    imagens = garantir_imagens(imagens_pasta, int(opcoes["imagens"]), int(opcoes["tamanho_imagem_kb"]))
+    passos = 2 + num_mercados * (1 + len(itens_pesquisa))
+    espera = duracao / passos
+
+    with tempos_da_tarefa(task_id) as tempos:
+        atualizar_progresso(task_id, 5, "Configurando ambiente (simulado)...")
+        time.sleep(espera)
+        mercados = []
+        for i in range(num_mercados):
+            mercado = {
+                "id": i + 1,
+                "nome": f"Mercado Simulado {i}",
+                "rating": f"{gerador.uniform(3.5, 5):.1f}",
+                "distancia": f"{gerador.uniform(0.5, 12):.1f} km",
+                "tempo_entrega": f"{gerador.randint(20, 60)}-{gerador.randint(61, 90)} min",
+                "custo_entrega": gerador.choice(ENTREGAS),
+                "imagem_url": None,
+                "url": f"https://simulado.invalid/mercado/{i + 1}",
+                "imagem_local": url_imagem_local(os.path.join(imagens_pasta, gerador.choice(imagens))) if imagens else None
+            }
+            mercados.append(mercado)
+            publicar_evento(task_id, "mercado", dict(mercado))
+            atualizar_progresso(task_id, 10 + 40 * (i + 1) / num_mercados, f"Processando mercado {i + 1} de {num_mercados}...")
+            time.sleep(espera)
+
+        estimativa = EstimativaMelhorCompra(itens_pesquisa, max_items)
+        for j, mercado in enumerate(mercados, 1):
+            mercado["produtos"] = {}
+            for k, item_data in enumerate(itens_pesquisa, 1):
+                with medir_fase("scrape_produtos_mercado"):
+                    time.sleep(espera)
+                item = item_data["item"]
+                produtos = [
+                    {
+                        "id": p + 1,
+                        "nome": f"{item} simulado {p}",
+                        "preco": gerar_preco(gerador),
+                        "detalhes": "",
+                        "imagem_url": None,
+                        "imagem_local": url_imagem_local(os.path.join(imagens_pasta, gerador.choice(imagens))) if imagens else None
+                    }
+                    for p in range(gerador.randint(0, produtos_por_item) if gerador.random() < 0.1 else produtos_por_item)
+                ]
+                mercado["produtos"][item] = produtos
+                publicar_evento(task_id, "produtos", {"mercado_id": mercado["id"], "mercado": mercado["nome"], "item": item, "produtos": produtos})
+                publicar_evento(task_id, "estimativa", estimativa.atualizar(mercado))
+                atualizar_progresso(task_id, 50 + 40 * (j - 1 + k / len(itens_pesquisa)) / num_mercados, f"Processando item {k} de {len(itens_pesquisa)} no mercado {j} de {num_mercados}...")
+
+        atualizar_progresso(task_id, 95, "Calculando melhor compra...")
+        resultado = calcular_melhor_compra(mercados, itens_pesquisa, max_items, (config or {}).get("otimizador"))
+        if localizacao is not None:
+            resultado["localizacao"] = localizacao.como_dict()
+            guardar_no_cache_itens(type_search, mercados, itens_pesquisa, max_produtos, config or {}, localizacao)
+        resultado["tempos"] = tempos.resumo()
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=4)
+        publicar_evento(task_id, "concluido", {"melhor_compra": resultado["melhor_compra"], "output_file": output_file})
+        atualizar_progresso(task_id, 100, "Scraping concluído!")
+    logger.info(f"Scraping simulado {task_id} concluído em {duracao:.1f}s com {num_mercados} mercados")
@@ -0,0 +1,323 @@
+# site_fixture.py
+import argparse
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# PNG 1x1 transparente servido para logos e fotos de produtos
+PNG_1X1 = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+MARCAS = ["Camil", "Italac", "Piracanjuba", "Tio João", "Nestlé", "Qualy", "Sadia", "Seara", "Ypê", "Omo", "Coca-Cola", "Ambev"]
+TAMANHOS = ["350ml", "600ml", "1L", "2L", "200g", "500g", "1kg", "5kg", "6x350ml", "12 unidades"]
+DISTRATORES = ["Sabonete Dove 90g", "Esponja Scotch-Brite", "Biscoito Recheado 130g", "Papel Higiênico 12 rolos", "Bala Sortida 100g"]
+
+
+class ConfigFixture:
+    """Tamanho e latência do site simulado."""
+
+    def __init__(
+        self,
+        mercados: int = 30,
+        produtos_por_busca: int = 40,
+        produtos_catalogo: int = 400,
+        cards_por_lote: int = 12,
+        latencia: float = 0.05,
+        latencia_busca: float = 0.2,
+        semente: int = 42
+    ) -> None:
+        self.mercados = mercados
+        self.produtos_por_busca = produtos_por_busca
+        self.produtos_catalogo = produtos_catalogo
+        self.cards_por_lote = cards_por_lote
+        self.latencia = latencia
+        self.latencia_busca = latencia_busca
+        self.semente = semente
+
+
+def gerar_mercados(config: ConfigFixture) -> List[Dict[str, Any]]:
+    gerador = random.Random(config.semente)
+    mercados = []
+    for i in range(1, config.mercados + 1):
+        entrega = gerador.choice(["Grátis", f"R$ {gerador.uniform(3, 15):.2f}".replace(".", ",")])
+        mercados.append({
+            "id": i,
+            "nome": f"Mercado Fixture {i}",
+            "rating": f"{gerador.uniform(3.5, 5):.1f}",
+            "info": f"Mercado • {gerador.uniform(0.5, 12):.1f} km",
+            "tempo": f"{gerador.randint(20, 50)}-{gerador.randint(51, 90)} min",
+            "entrega": entrega,
+            "img": f"/img/mercado_{i}.png"
+        })
+    return mercados
+
+
+def gerar_produtos(config: ConfigFixture, mercado_id: int, termo: str, quantidade: int) -> List[Dict[str, Any]]:
+    """Produtos determinísticos para (mercado, termo); ~20% são distratores sem relação com o termo."""
+    gerador = random.Random(f"{config.semente}|{mercado_id}|{termo.lower()}")
+    produtos = []
+    for i in range(quantidade):
+        if termo and gerador.random() >= 0.2:
+            nome = f"{termo.title()} {gerador.choice(MARCAS)} {gerador.choice(TAMANHOS)}"
+        else:
+            nome = gerador.choice(DISTRATORES)
+        preco = gerador.uniform(1.5, 60) if gerador.random() > 0.02 else gerador.uniform(1000, 2500)
+        preco_texto = f"{preco:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        produtos.append({
+            "nome": nome,
+            "preco": f"R$ {preco_texto}",
+            "valor": round(preco, 2),
+            "detalhes": gerador.choice(["", "Embalagem econômica", "Promoção", "Unidade"]),
+            "img": f"/img/produto_{mercado_id}_{i}.png"
+        })
+    return produtos
+
+
+PAGINA_BASE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{titulo}</title>
+<style>
+  .card {{ display: block; height: 140px; border-bottom: 1px solid #ddd; }}
+  .card img {{ width: 40px; height: 40px; }}
+</style></head>
+<body>
+{corpo}
+<script>
+const S = {seletores};
+const LOTE = {lote};
+let carregados = 0, total = null, carregando = false, fonte = null;
+function txt(cls, valor, tag) {{ return `<${{tag || "div"}} class="${{cls}}">${{valor}}</${{tag || "div"}}>`; }}
+function carregarLote(renderizar) {{
+  if (carregando || (total !== null && carregados >= total) || !fonte) return;
+  carregando = true;
+  const sep = fonte.includes("?") ? "&" : "?";
+  fetch(`${{fonte}}${{sep}}inicio=${{carregados}}&n=${{LOTE}}`).then(r => r.json()).then(d => {{
+    total = d.total;
+    d.itens.forEach(renderizar);
+    carregados += d.itens.length;
+    carregando = false;
+  }});
+}}
+{script}
+window.addEventListener("scroll", () => {{
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 300) carregarLote(renderizarAtual);
+}});
+</script>
+</body></html>
+"""
+
+SCRIPT_MERCADOS = """
+const lista = document.getElementById("lista");
+function renderizarMercado(m) {
+  const a = document.createElement("a");
+  a.className = "card " + S.markets.card;
+  a.href = "/mercado/" + m.id;
+  a.innerHTML = `<img class="${S.markets.image}" src="${m.img}">` + txt(S.markets.name, m.nome, "span")
+    + txt(S.markets.rating, m.rating, "span") + txt(S.markets.info, m.info)
+    + `<div class="${S.markets.footer}"><div>${m.tempo}</div><div>•</div><div>${m.entrega}</div></div>`;
+  lista.appendChild(a);
+}
+const renderizarAtual = renderizarMercado;
+document.getElementsByClassName(S.location_button)[0].addEventListener("click", () => {
+  fonte = "/api/mercados";
+  carregarLote(renderizarMercado);
+});
+"""
+
+SCRIPT_MERCADO = """
+const lista = document.getElementById("lista");
+const campo = document.getElementsByClassName(S.products.search_field)[0];
+const subtitulo = document.getElementById("subtitulo");
+const MERCADO = __MERCADO__;
+const CATALOGO = __CATALOGO__;
+function renderizarProduto(p) {
+  const c = document.createElement("div");
+  c.className = "card " + S.products.card;
+  c.innerHTML = `<img class="${S.products.image}" src="${p.img}">` + txt(S.products.name, p.nome)
+    + txt(S.products.price, p.preco) + txt(S.products.details, p.detalhes);
+  lista.appendChild(c);
+}
+const renderizarAtual = renderizarProduto;
+function buscar(termo) {
+  const params = new URLSearchParams(window.location.search);
+  params.set("q", termo);
+  history.replaceState(null, "", window.location.pathname + "?" + params.toString());
+  lista.innerHTML = "";
+  subtitulo.innerHTML = "";
+  carregados = 0; total = null;
+  setTimeout(() => {
+    const ordem = params.get("ordenacao") || "";
+    fonte = `/api/busca?mercado=${MERCADO}&q=${encodeURIComponent(termo)}&ordenacao=${ordem}`;
+    fetch(fonte + "&inicio=0&n=0").then(r => r.json()).then(d => {
+      subtitulo.innerHTML = `<p class="${S.products.total_records}">${d.total} resultados para ${termo}</p>`;
+      carregarLote(renderizarProduto);
+    });
+  }, __LATENCIA_BUSCA__);
+}
+campo.addEventListener("keydown", e => { if (e.key === "Enter") buscar(campo.value); });
+const inicial = new URLSearchParams(window.location.search).get("q");
+if (CATALOGO) { fonte = `/api/catalogo?mercado=${MERCADO}`; carregarLote(renderizarProduto); }
+else if (inicial) { campo.value = inicial; buscar(inicial); }
+"""
+
+
+class ManipuladorFixture(BaseHTTPRequestHandler):
+    fixture: ConfigFixture
+    seletores: Dict[str, Any]
+    mercados: List[Dict[str, Any]]
+    contagem: Dict[str, int]
+    lock: threading.Lock
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        logger.debug(formato % args)
+
+    def _responder(self, status: int, corpo: bytes, tipo: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, dados: Any) -> None:
+        self._responder(200, json.dumps(dados, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _pagina(self, titulo: str, corpo: str, script: str) -> None:
+        html = PAGINA_BASE.format(
+            titulo=titulo, corpo=corpo, script=script,
+            seletores=json.dumps(self.seletores), lote=self.fixture.cards_por_lote
+        )
+        self._responder(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        partes = [p for p in url.path.split("/") if p]
+        with self.lock:
+            self.contagem[partes[0] if partes else "/"] = self.contagem.get(partes[0] if partes else "/", 0) + 1
+        if self.fixture.latencia:
+            time.sleep(self.fixture.latencia)
+
+        inicio, n = int(params.get("inicio", 0)), int(params.get("n", self.fixture.cards_por_lote))
+        if partes and partes[0] == "img":
+            self._responder(200, PNG_1X1, "image/png")
+        elif partes == ["api", "mercados"]:
+            self._json({"total": len(self.mercados), "itens": self.mercados[inicio:inicio + n]})
+        elif partes == ["api", "busca"]:
+            produtos = gerar_produtos(self.fixture, int(params["mercado"]), params.get("q", ""), self.fixture.produtos_por_busca)
+            if params.get("ordenacao") == "preco":
+                produtos.sort(key=lambda p: p["valor"])
+            self._json({"total": len(produtos), "itens": produtos[inicio:inicio + n]})
+        elif partes == ["api", "catalogo"]:
+            mercado_id = int(params["mercado"])
+            produtos = []
+            termos = ["leite", "arroz", "feijão", "café", "açúcar", "coca", "cerveja", "detergente"]
+            por_termo = max(self.fixture.produtos_catalogo // len(termos), 1)
+            for termo in termos:
+                produtos.extend(gerar_produtos(self.fixture, mercado_id, termo, por_termo))
+            self._json({"total": len(produtos), "itens": produtos[inicio:inicio + n]})
+        elif partes and partes[0] in ("mercados", "farmacia", "restaurantes", "bebidas"):
+            botao = f'<button class="{self.seletores["location_button"]}">Usar minha localização</button>'
+            self._pagina("Mercados", f'{botao}<div id="lista"></div>', SCRIPT_MERCADOS)
+        elif len(partes) >= 2 and partes[0] == "mercado":
+            catalogo = len(partes) > 2 and partes[2] == "catalogo"
+            corpo = (
+                f'<input class="{self.seletores["products"]["search_field"]}" type="text">'
+                '<div id="subtitulo"></div><div id="lista"></div>'
+            )
+            script = (
+                SCRIPT_MERCADO.replace("__MERCADO__", str(int(partes[1])))
+                .replace("__CATALOGO__", "true" if catalogo else "false")
+                .replace("__LATENCIA_BUSCA__", str(int(self.fixture.latencia_busca * 1000)))
+            )
+            self._pagina(f"Mercado {partes[1]}", corpo, script)
+        else:
+            self._responder(404, b"not found", "text/plain")
+
+
+class ServidorFixture:
+    """Servidor HTTP local com o site simulado; use como context manager ou com iniciar()/parar()."""
+
+    def __init__(self, fixture: Optional[ConfigFixture] = None, seletores: Optional[Dict[str, Any]] = None, porta: int = 0) -> None:
+        self.fixture = fixture or ConfigFixture()
+        if seletores is None:
+            with open("./config.yaml", "r", encoding="utf-8") as f:
+                seletores = yaml.safe_load(f)["selectors"]
+        manipulador = type("Manipulador", (ManipuladorFixture,), {
+            "fixture": self.fixture,
+            "seletores": seletores,
+            "mercados": gerar_mercados(self.fixture),
+            "contagem": {},
+            "lock": threading.Lock()
+        })
+        self.manipulador = manipulador
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+        self.servidor.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url_base(self) -> str:
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    @property
+    def requisicoes(self) -> Dict[str, int]:
+        """Requisições recebidas por primeiro segmento do caminho (mercados, mercado, api, img)."""
+        with self.manipulador.lock:
+            return dict(self.manipulador.contagem)
+
+    def urls(self) -> Dict[str, str]:
+        """Bloco `urls` do config.yaml apontando para o site simulado."""
+        return {
+            "markets": f"{self.url_base}/mercados",
+            "pharmacies": f"{self.url_base}/farmacia",
+            "restaurants": f"{self.url_base}/restaurantes",
+            "drinks": f"{self.url_base}/bebidas"
+        }
+
+    def iniciar(self) -> "ServidorFixture":
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name="site-fixture", daemon=True)
+        self._thread.start()
+        logger.info(f"Site fixture em {self.url_base}")
+        return self
+
+    def parar(self) -> None:
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self) -> "ServidorFixture":
+        return self.iniciar()
+
+    def __exit__(self, *args: Any) -> None:
+        self.parar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Site local que imita as páginas do iFood usadas pelo scraper.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--mercados", type=int, default=30)
+    parser.add_argument("--produtos-por-busca", type=int, default=40)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Atraso de cada requisição HTTP, em segundos")
+    parser.add_argument("--latencia-busca", type=float, default=0.2, help="Atraso até a busca devolver resultados, em segundos")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    fixture = ConfigFixture(args.mercados, args.produtos_por_busca, latencia=args.latencia, latencia_busca=args.latencia_busca)
+    servidor = ServidorFixture(fixture, porta=args.porta)
+    logger.info(f"Servindo em {servidor.url_base}/mercados (Ctrl+C para parar)")
+    try:
+        servidor.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
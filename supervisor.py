@@ -0,0 +1,258 @@
+# supervisor.py
+import logging
+import multiprocessing
+import os
+import platform
+import queue
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import progresso
+from disjuntor import disjuntor_mercados
+from limitador import limitador
+from logs import opcoes_repasse, repassar_logs
+from metricas import registro as registro_metricas
+
+try:
+    import psutil
+except ImportError:  # psutil é opcional; sem ele as leituras vêm de /proc
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+class ErroProcessoIsolado(Exception):
+    """Erro levantado dentro do processo filho, repassado ao processo pai."""
+
+
+class LimiteRecursosExcedido(ErroProcessoIsolado):
+    """O processo filho passou do limite de memória ou do prazo e foi encerrado."""
+
+
+def processos_descendentes(pid: int) -> List[int]:
+    """PIDs de todos os descendentes de `pid` (Chrome, chromedriver, renderers...)."""
+    if psutil is not None:
+        try:
+            return [p.pid for p in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    filhos_por_pai: Dict[int, List[int]] = {}
+    for entrada in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat", "r") as f:
+                # O nome do processo vem entre parênteses e pode conter espaços
+                campos = f.read().rsplit(")", 1)[1].split()
+            filhos_por_pai.setdefault(int(campos[1]), []).append(int(entrada))
+        except (OSError, IndexError, ValueError):
+            continue
+    descendentes: List[int] = []
+    pendentes = [pid]
+    while pendentes:
+        for filho in filhos_por_pai.get(pendentes.pop(), []):
+            descendentes.append(filho)
+            pendentes.append(filho)
+    return descendentes
+
+
+def rss_processo(pid: int) -> int:
+    """Memória residente do processo em bytes (0 se ele não existe mais)."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def rss_arvore(pid: int) -> int:
+    """Memória residente somada do processo e de todos os seus descendentes, em bytes."""
+    return sum(rss_processo(p) for p in [pid] + processos_descendentes(pid))
+
+
+def encerrar_processos(pids: List[int]) -> None:
+    """Envia SIGKILL aos processos que ainda existirem."""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            continue
+
+
+class ProgressoRepasse(progresso.ArmazenamentoProgresso):
+    """Armazenamento usado no processo filho: envia cada escrita ao pai pela fila de mensagens."""
+
+    def __init__(self, mensagens: Any) -> None:
+        self.mensagens = mensagens
+
+    def atualizar(self, task_id: str, percentual: float, mensagem: str) -> None:
+        self.mensagens.put(("progresso", "atualizar", (task_id, percentual, mensagem)))
+
+    def definir_status(self, task_id: str, status: str, resultado: Optional[Dict[str, Any]] = None, erro: Optional[str] = None) -> None:
+        self.mensagens.put(("progresso", "definir_status", (task_id, status, resultado, erro)))
+
+    def publicar_evento(self, task_id: str, tipo: str, dados: Any) -> None:
+        self.mensagens.put(("progresso", "publicar_evento", (task_id, tipo, dados)))
+
+    def obter(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def obter_resultado(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def obter_eventos(self, task_id: str, desde: int = 0) -> List[Dict[str, Any]]:
+        return []
+
+    def limpar(self, task_id: str) -> None:
+        self.mensagens.put(("progresso", "limpar", (task_id,)))
+
+
+# Método do ProgressoRepasse -> função de progresso aplicada no pai
+REPASSE_PROGRESSO: Dict[str, Callable[..., None]] = {
+    "atualizar": progresso.atualizar_progresso,
+    "definir_status": progresso.definir_status,
+    "publicar_evento": progresso.publicar_evento,
+    "limpar": progresso.limpar_task
+}
+
+
+def _executar_filho(
+    mensagens: Any,
+    funcao: Callable[..., Any],
+    args: tuple,
+    kwargs: Dict[str, Any],
+    estado_disjuntor: Dict[str, Any],
+    estado_limitador: Dict[str, Any],
+    opcoes_log: Dict[str, Any],
+    repassar_progresso: bool
+) -> None:
+    """Ponto de entrada do processo filho."""
+    if platform.system() != "Windows":
+        # Novo grupo de processos: o pai consegue matar Chrome e chromedriver de uma vez só
+        os.setsid()
+    repassar_logs(mensagens, opcoes_log)
+    registro_metricas.repassar_medidores(lambda nome, valores: mensagens.put(("medidor", nome, valores)))
+    if repassar_progresso:
+        progresso.armazenamento = ProgressoRepasse(mensagens)
+    disjuntor_mercados.importar(estado_disjuntor)
+    limitador.importar(estado_limitador)
+    try:
+        resultado = funcao(*args, **kwargs)
+        mensagens.put(("fim", "ok", resultado, disjuntor_mercados.exportar(), registro_metricas.exportar(), limitador.exportar()))
+    except BaseException as e:
+        mensagens.put(("fim", "erro", f"{type(e).__name__}: {e}", disjuntor_mercados.exportar(), registro_metricas.exportar(), limitador.exportar()))
+
+
+def executar_isolado(
+    funcao: Callable[..., Any],
+    *args: Any,
+    limite_rss_mb: Optional[float] = None,
+    prazo_segundos: Optional[float] = None,
+    intervalo_verificacao: float = 1.0,
+    **kwargs: Any
+) -> Any:
+    """Executa `funcao(*args, **kwargs)` em um processo filho supervisionado e retorna o resultado.
+
+    O filho (com Chrome e chromedriver) é encerrado se a memória somada da árvore passar de
+    `limite_rss_mb` ou se o prazo estourar; ao final todo o grupo de processos é eliminado, então
+    navegadores órfãos não sobrevivem à tarefa. Progresso, logs, estado do disjuntor e do limitador e métricas são repassados ao pai; os medidores
+    (ex.: navegadores abertos) chegam enquanto o filho roda e saem do pai quando ele termina.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    mensagens = contexto.Queue()
+    # Com armazenamento compartilhado o filho poderia gravar direto, mas os ouvintes (ex.: a fila do
+    # worker) só existem no pai; nesse caso o progresso também passa por ele
+    repassar_progresso = not progresso.armazenamento.compartilhado or bool(progresso.ouvintes_progresso)
+    estado_disjuntor = disjuntor_mercados.exportar()
+    estado_limitador = limitador.exportar()
+    processo = contexto.Process(
+        target=_executar_filho,
+        args=(mensagens, funcao, args, kwargs, estado_disjuntor, estado_limitador, opcoes_repasse(), repassar_progresso),
+        daemon=False
+    )
+    inicio = time.monotonic()
+    processo.start()
+    logger.info(f"Processo isolado {processo.pid} iniciado para {getattr(funcao, '__name__', funcao)}")
+    fim: Optional[tuple] = None
+    motivo_encerramento: Optional[str] = None
+    pico_rss = 0
+
+    def tratar_mensagem(mensagem: tuple) -> None:
+        nonlocal fim
+        if mensagem[0] == "progresso":
+            try:
+                # Pelas funções do módulo, não direto no armazenamento, para os ouvintes também receberem
+                REPASSE_PROGRESSO[mensagem[1]](*mensagem[2])
+            except Exception as e:
+                logger.warning(f"Erro ao aplicar progresso repassado pelo filho: {e}")
+        elif mensagem[0] == "log":
+            registro = mensagem[1]
+            logging.getLogger(registro.name).handle(registro)
+        elif mensagem[0] == "medidor":
+            registro_metricas.definir_medidor(mensagem[1], processo.pid, mensagem[2])
+        elif mensagem[0] == "fim":
+            fim = mensagem
+
+    try:
+        proxima_verificacao = time.monotonic() + intervalo_verificacao
+        while fim is None:
+            # Mensagens só até a hora da próxima verificação: um filho que envia logs e progresso
+            # sem parar não pode adiar as checagens de memória e de prazo
+            espera = proxima_verificacao - time.monotonic()
+            if espera > 0:
+                try:
+                    tratar_mensagem(mensagens.get(timeout=espera))
+                except queue.Empty:
+                    pass
+                continue
+            proxima_verificacao = time.monotonic() + intervalo_verificacao
+            if not processo.is_alive():
+                break
+            rss = rss_arvore(processo.pid)
+            pico_rss = max(pico_rss, rss)
+            if limite_rss_mb and rss > limite_rss_mb * 1024 * 1024:
+                motivo_encerramento = f"memória da árvore de processos em {rss / 1024 / 1024:.0f} MB (limite {limite_rss_mb} MB)"
+                break
+            if prazo_segundos and time.monotonic() - inicio > prazo_segundos:
+                motivo_encerramento = f"prazo de {prazo_segundos:.0f}s excedido"
+                break
+        # Mensagens que chegaram junto com o término do filho
+        while fim is None:
+            try:
+                tratar_mensagem(mensagens.get(timeout=0.5 if motivo_encerramento is None else 0.01))
+            except queue.Empty:
+                break
+    finally:
+        descendentes = processos_descendentes(processo.pid) if processo.pid else []
+        if processo.is_alive():
+            processo.join(timeout=5 if fim is not None else 0)
+        if platform.system() != "Windows" and processo.pid:
+            try:
+                os.killpg(processo.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        encerrar_processos(descendentes)
+        processo.join(timeout=5)
+        registro_metricas.remover_origem(processo.pid)
+        logger.info(
+            f"Processo isolado {processo.pid} encerrado após {time.monotonic() - inicio:.1f}s "
+            f"(pico de memória {pico_rss / 1024 / 1024:.0f} MB)"
+        )
+
+    if motivo_encerramento:
+        logger.error(f"Processo isolado {processo.pid} encerrado: {motivo_encerramento}")
+        raise LimiteRecursosExcedido(motivo_encerramento)
+    if fim is None:
+        raise ErroProcessoIsolado(f"Processo isolado terminou sem resposta (código {processo.exitcode})")
+    disjuntor_mercados.importar(fim[3], enviado=estado_disjuntor)
+    registro_metricas.mesclar(fim[4])
+    limitador.importar(fim[5], enviado=estado_limitador)
+    if fim[1] == "erro":
+        raise ErroProcessoIsolado(fim[2])
+    return fim[2]
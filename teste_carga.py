@@ -0,0 +1,338 @@
+# teste_carga.py
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmark_e2e import commit_atual, salvar_resultado
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RESULTADOS_PADRAO = os.path.join(DIRETORIO, "dados_ifood", "benchmarks", "carga.jsonl")
+ITENS = ["leite", "arroz 5kg", "feijão", "café 500g", "coca 350", "açúcar", "óleo", "sabão em pó"]
+# Métricas da própria API lidas de /metrics a cada amostra
+METRICAS_API = ["ifood_api_rss_bytes", "ifood_api_scrapes_em_execucao", "ifood_api_fila_executor", "ifood_api_threads_executor"]
+
+
+class Medicoes:
+    """Latências e erros por cenário, acumulados pelas threads dos clientes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencias: Dict[str, List[float]] = {}
+        self.erros: Dict[str, Dict[str, int]] = {}
+
+    def registrar(self, cenario: str, latencia: float, erro: Optional[str] = None) -> None:
+        with self._lock:
+            if erro:
+                self.erros.setdefault(cenario, {})
+                self.erros[cenario][erro] = self.erros[cenario].get(erro, 0) + 1
+            else:
+                self.latencias.setdefault(cenario, []).append(latencia)
+
+    def resumo(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            cenarios = set(self.latencias) | set(self.erros)
+            return {
+                cenario: {
+                    "ok": len(self.latencias.get(cenario, [])),
+                    "erros": dict(self.erros.get(cenario, {})),
+                    **percentis(self.latencias.get(cenario, []))
+                }
+                for cenario in sorted(cenarios)
+            }
+
+
+def percentis(valores: List[float]) -> Dict[str, Optional[float]]:
+    if not valores:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordenados = sorted(valores)
+    em = lambda q: round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))], 4)
+    return {"p50": em(0.5), "p90": em(0.9), "p99": em(0.99), "max": round(ordenados[-1], 4)}
+
+
+def ler_metricas(texto: str) -> Dict[str, float]:
+    """Valores sem rótulos e somas/contagens do histograma de atraso do loop do texto Prometheus."""
+    valores = {}
+    for linha in texto.splitlines():
+        if linha.startswith("#"):
+            continue
+        correspondencia = re.match(r"^([a-z_]+)(?:\{[^}]*\})?\s+(\S+)$", linha)
+        if correspondencia and "{" not in linha:
+            valores[correspondencia.group(1)] = float(correspondencia.group(2))
+    return valores
+
+
+def cesta(gerador: random.Random, tamanho: int) -> List[Dict[str, Any]]:
+    return [{"produto": item, "quantidade": gerador.randint(1, 4)} for item in gerador.sample(ITENS, min(tamanho, len(ITENS)))]
+
+
+def erro_de(resposta: Optional[requests.Response], excecao: Optional[Exception] = None) -> str:
+    if excecao is not None:
+        return type(excecao).__name__
+    return f"HTTP {resposta.status_code}"
+
+
+class Cliente:
+    """Um cliente simulado; repete cenários sorteados pelo peso até o fim do teste."""
+
+    def __init__(self, url: str, args: argparse.Namespace, medicoes: Medicoes, imagens: List[str], fim: float, semente: int) -> None:
+        self.url = url
+        self.args = args
+        self.medicoes = medicoes
+        self.imagens = imagens
+        self.fim = fim
+        self.gerador = random.Random(semente)
+        self.sessao = requests.Session()
+
+    def executar(self) -> None:
+        cenarios = [("scrape", self.args.peso_scrape), ("sse", self.args.peso_sse), ("imagem", self.args.peso_imagem)]
+        while time.time() < self.fim:
+            cenario = self.gerador.choices([c for c, _ in cenarios], weights=[p for _, p in cenarios])[0]
+            getattr(self, cenario)()
+            if self.args.pausa:
+                time.sleep(self.gerador.uniform(0, self.args.pausa))
+
+    def scrape(self) -> None:
+        """POST /scrape/ aguardando o resultado completo."""
+        inicio = time.perf_counter()
+        try:
+            resposta = self.sessao.post(
+                f"{self.url}/scrape/", params={"type_search": "M", "max_produtos": self.args.max_produtos},
+                json=cesta(self.gerador, self.args.itens), timeout=self.args.timeout
+            )
+        except requests.RequestException as e:
+            self.medicoes.registrar("scrape", 0, erro_de(None, e))
+            return
+        latencia = time.perf_counter() - inicio
+        self.medicoes.registrar("scrape", latencia, None if resposta.ok else erro_de(resposta))
+
+    def sse(self) -> None:
+        """POST /scrape/?aguardar=false e acompanha /progresso/{task_id} até o evento final."""
+        inicio = time.perf_counter()
+        try:
+            resposta = self.sessao.post(
+                f"{self.url}/scrape/", params={"type_search": "M", "max_produtos": self.args.max_produtos, "aguardar": "false"},
+                json=cesta(self.gerador, self.args.itens), timeout=self.args.timeout
+            )
+            self.medicoes.registrar("enfileirar", time.perf_counter() - inicio, None if resposta.ok else erro_de(resposta))
+            if not resposta.ok:
+                return
+            task_id = resposta.json()["task_id"]
+            inicio_sse = time.perf_counter()
+            primeiro_evento = None
+            concluido = False
+            with self.sessao.get(f"{self.url}/progresso/{task_id}", stream=True, timeout=self.args.timeout) as fluxo:
+                for linha in fluxo.iter_lines(decode_unicode=True):
+                    if not linha or not linha.startswith("event:"):
+                        continue
+                    if primeiro_evento is None:
+                        primeiro_evento = time.perf_counter() - inicio_sse
+                        self.medicoes.registrar("sse_primeiro_evento", primeiro_evento)
+                    if linha.split(":", 1)[1].strip() == "concluido":
+                        concluido = True
+                        break
+            self.medicoes.registrar("sse_ate_concluido", time.perf_counter() - inicio_sse, None if concluido else "fluxo encerrado sem concluido")
+        except (requests.RequestException, ValueError, KeyError) as e:
+            self.medicoes.registrar("sse_ate_concluido", 0, erro_de(None, e))
+
+    def imagem(self) -> None:
+        """GET de um arquivo estático de /imagens_ifood."""
+        if not self.imagens:
+            return
+        inicio = time.perf_counter()
+        try:
+            resposta = self.sessao.get(f"{self.url}/imagens_ifood/{self.gerador.choice(self.imagens)}", timeout=self.args.timeout)
+            _ = resposta.content
+        except requests.RequestException as e:
+            self.medicoes.registrar("imagem", 0, erro_de(None, e))
+            return
+        self.medicoes.registrar("imagem", time.perf_counter() - inicio, None if resposta.ok else erro_de(resposta))
+
+
+class MonitorAPI(threading.Thread):
+    """Lê /metrics periodicamente: memória, saturação do executor e atraso médio do loop em cada intervalo."""
+
+    def __init__(self, url: str, intervalo: float) -> None:
+        super().__init__(name="monitor-api", daemon=True)
+        self.url = url
+        self.intervalo = intervalo
+        self.serie: List[Dict[str, Any]] = []
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        inicio = time.perf_counter()
+        anterior: Tuple[float, float] = (0.0, 0.0)
+        while not self._parar.wait(self.intervalo):
+            try:
+                texto = requests.get(f"{self.url}/metrics", timeout=self.intervalo * 5).text
+            except requests.RequestException:
+                self.serie.append({"t": round(time.perf_counter() - inicio, 1), "erro": True})
+                continue
+            valores = ler_metricas(texto)
+            soma, contagem = valores.get("ifood_api_atraso_loop_segundos_sum", 0.0), valores.get("ifood_api_atraso_loop_segundos_count", 0.0)
+            amostras = contagem - anterior[1]
+            amostra = {"t": round(time.perf_counter() - inicio, 1), "atraso_loop_ms": round((soma - anterior[0]) / amostras * 1000, 2) if amostras else None}
+            anterior = (soma, contagem)
+            amostra.update({nome: valores.get(nome) for nome in METRICAS_API})
+            self.serie.append(amostra)
+
+    def parar(self) -> List[Dict[str, Any]]:
+        self._parar.set()
+        self.join()
+        return self.serie
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Sobe `uvicorn api:app` com o scraper simulado e espera responder."""
+    porta = porta_livre()
+    simulacao = {
+        "duracao_segundos": args.duracao_scrape,
+        "mercados": args.mercados,
+        "produtos_por_item": args.max_produtos,
+        "imagens": args.imagens,
+        "tamanho_imagem_kb": args.tamanho_imagem_kb
+    }
+    ambiente = {**os.environ, "IFOOD_SIMULACAO": json.dumps(simulacao)}
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(porta), "--log-level", "warning"],
+        cwd=DIRETORIO, env=ambiente
+    )
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.time() + 30
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"A API terminou na inicialização (código {processo.returncode})")
+        try:
+            requests.get(f"{url}/metrics", timeout=1)
+            return processo, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError("A API não respondeu em 30s")
+
+
+def aquecer(url: str, args: argparse.Namespace) -> List[str]:
+    """Um scrape inicial cria as imagens simuladas; devolve os caminhos dos arquivos sob /imagens_ifood (na pasta da tarefa)."""
+    resposta = requests.post(
+        f"{url}/scrape/", params={"type_search": "M", "max_produtos": args.max_produtos},
+        json=[{"produto": "leite", "quantidade": 1}], timeout=args.timeout
+    )
+    resposta.raise_for_status()
+    nomes = set()
+    for mercado in resposta.json().get("mercados", []):
+        if mercado.get("imagem_local"):
+            nomes.add(mercado["imagem_local"].split("/imagens_ifood/", 1)[-1])
+        for produtos in mercado.get("produtos", {}).values():
+            nomes.update(p["imagem_local"].split("/imagens_ifood/", 1)[-1] for p in produtos if p.get("imagem_local"))
+    return sorted(nomes)
+
+
+def executar_teste(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    imagens = aquecer(url, args)
+    medicoes = Medicoes()
+    monitor = MonitorAPI(url, args.intervalo_monitor)
+    monitor.start()
+    fim = time.time() + args.duracao
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clientes) as executor:
+        # Entrada escalonada dos clientes ao longo de `rampa` segundos
+        for i in range(args.clientes):
+            executor.submit(Cliente(url, args, medicoes, imagens, fim, i).executar)
+            if args.rampa:
+                time.sleep(args.rampa / args.clientes)
+    serie = monitor.parar()
+    resumo = medicoes.resumo()
+    rss = [a["ifood_api_rss_bytes"] for a in serie if a.get("ifood_api_rss_bytes")]
+    atrasos = [a["atraso_loop_ms"] for a in serie if a.get("atraso_loop_ms") is not None]
+    return {
+        "duracao_real": round(time.perf_counter() - inicio, 1),
+        "cenarios": resumo,
+        "vazao_por_segundo": {c: round(v["ok"] / args.duracao, 2) for c, v in resumo.items()},
+        "atraso_loop_ms": {"medio": round(sum(atrasos) / len(atrasos), 2) if atrasos else None, "max": max(atrasos) if atrasos else None},
+        "fila_executor_max": max((a.get("ifood_api_fila_executor") or 0 for a in serie), default=0),
+        "rss_mb": {
+            "inicio": round(rss[0] / 1024 / 1024, 1) if rss else None,
+            "fim": round(rss[-1] / 1024 / 1024, 1) if rss else None,
+            "pico": round(max(rss) / 1024 / 1024, 1) if rss else None
+        },
+        "serie": serie
+    }
+
+
+def imprimir(resultado: Dict[str, Any]) -> None:
+    metricas = resultado["metricas"]
+    print(f"{'cenário':<22}{'ok':>7}{'erros':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for cenario, valores in metricas["cenarios"].items():
+        fmt = lambda v: f"{v:10.3f}" if v is not None else f"{'-':>10}"
+        print(f"{cenario:<22}{valores['ok']:>7}{sum(valores['erros'].values()):>7}{fmt(valores['p50'])}{fmt(valores['p90'])}{fmt(valores['p99'])}{fmt(valores['max'])}")
+        for erro, quantidade in valores["erros"].items():
+            print(f"  {erro}: {quantidade}")
+    print(f"Atraso do event loop: médio {metricas['atraso_loop_ms']['medio']} ms, pior intervalo {metricas['atraso_loop_ms']['max']} ms")
+    print(f"Fila do executor (pico): {metricas['fila_executor_max']}")
+    print(f"Memória da API: {metricas['rss_mb']['inicio']} -> {metricas['rss_mb']['fim']} MB (pico {metricas['rss_mb']['pico']} MB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga da API (/scrape/, SSE de /progresso e /imagens_ifood) com o scraper simulado.")
+    parser.add_argument("--url", type=str, default=None, help="API já em execução (com IFOOD_SIMULACAO definido); sem isso sobe uma local")
+    parser.add_argument("--clientes", type=int, default=200, help="Clientes simultâneos")
+    parser.add_argument("--duracao", type=float, default=60, help="Segundos de teste")
+    parser.add_argument("--rampa", type=float, default=10, help="Segundos para todos os clientes entrarem")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Pausa máxima aleatória entre requisições de um cliente")
+    parser.add_argument("--peso-scrape", type=float, default=1)
+    parser.add_argument("--peso-sse", type=float, default=3)
+    parser.add_argument("--peso-imagem", type=float, default=10)
+    parser.add_argument("--itens", type=int, default=3, help="Itens por cesta")
+    parser.add_argument("--max-produtos", type=int, default=10)
+    parser.add_argument("--duracao-scrape", type=float, default=5.0, help="Duração de cada scrape simulado, em segundos")
+    parser.add_argument("--mercados", type=int, default=20, help="Mercados por resultado simulado")
+    parser.add_argument("--imagens", type=int, default=50, help="Arquivos de imagem distintos servidos")
+    parser.add_argument("--tamanho-imagem-kb", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--intervalo-monitor", type=float, default=1.0, help="Segundos entre leituras de /metrics")
+    parser.add_argument("--saida", type=str, default=RESULTADOS_PADRAO, help="Arquivo JSONL onde os resultados são acumulados")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    processo = None
+    url = args.url
+    if url is None:
+        processo, url = iniciar_api(args)
+    try:
+        parametros = {k: v for k, v in vars(args).items() if k not in ("url", "saida")}
+        resultado = {
+            "commit": commit_atual(),
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "parametros": parametros,
+            "metricas": executar_teste(url.rstrip("/"), args)
+        }
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=10)
+    salvar_resultado(resultado, args.saida)
+    imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# test_api_fila.py
+import asyncio
+
+import pytest
+
+import api
+import progresso
+from fila import FilaSQLite
+
+
+@pytest.fixture
+def fila(monkeypatch, tmp_path):
+    fila = FilaSQLite(str(tmp_path / "fila.db"))
+    monkeypatch.setattr(api, "fila", fila)
+    yield fila
+    progresso.limpar_task("tarefa-fila")
+
+
+async def worker_conclui(fila, resultado=None, erro=None):
+    tarefa = None
+    while tarefa is None:
+        tarefa = await asyncio.to_thread(fila.reservar, "worker-teste", 0.1)
+    if erro:
+        fila.falhar(tarefa["task_id"], erro)
+    else:
+        fila.concluir(tarefa["task_id"], resultado)
+
+
+def test_estado_final_da_fila_chega_ao_armazenamento_e_ao_progresso(fila):
+    progresso.definir_status("tarefa-fila", progresso.STATUS_EXECUTANDO)
+
+    async def cenario():
+        return await asyncio.gather(
+            api.executar_scraping("M", 5, [{"item": "arroz", "quantidade": 1}], "tarefa-fila"),
+            worker_conclui(fila, resultado={"mercados": []})
+        )
+
+    resultado, _ = asyncio.run(cenario())
+    assert resultado == {"mercados": []}
+    assert progresso.obter_progresso("tarefa-fila")["status"] == progresso.STATUS_CONCLUIDO
+    assert progresso.obter_resultado("tarefa-fila") == {"mercados": []}
+    assert asyncio.run(api.obter_progresso_task("tarefa-fila"))["status"] == progresso.STATUS_CONCLUIDO
+
+
+def test_erro_do_worker_marca_a_tarefa_com_erro(fila):
+    progresso.definir_status("tarefa-fila", progresso.STATUS_EXECUTANDO)
+
+    async def cenario():
+        return await asyncio.gather(
+            api.executar_scraping("M", 5, [{"item": "arroz", "quantidade": 1}], "tarefa-fila"),
+            worker_conclui(fila, erro="navegador caiu"),
+            return_exceptions=True
+        )
+
+    excecao, _ = asyncio.run(cenario())
+    assert "navegador caiu" in str(excecao)
+    assert progresso.obter_progresso("tarefa-fila")["status"] == progresso.STATUS_ERRO
+
+
+def test_progresso_de_tarefa_enfileirada_vem_da_fila(fila):
+    progresso.definir_status("tarefa-fila", progresso.STATUS_EXECUTANDO)
+    fila.enfileirar("tarefa-fila", {})
+    fila.atualizar_progresso("tarefa-fila", 55, "coletando")
+    assert asyncio.run(api.obter_progresso_task("tarefa-fila"))["percentual"] == 55
+
+
+def test_startup_recusa_fila_com_progresso_em_memoria(fila, monkeypatch, tmp_path):
+    with pytest.raises(RuntimeError, match="IFOOD_PROGRESSO"):
+        asyncio.run(api.verificar_backends())
+    monkeypatch.setattr(progresso, "armazenamento", progresso.ProgressoSQLite(str(tmp_path / "progresso.db")))
+    asyncio.run(api.verificar_backends())
@@ -0,0 +1,63 @@
+# test_cache_itens.py
+import os
+import time
+
+from cache_itens import CacheItens
+
+ITENS = [{"item": "Arroz", "quantidade": 2}, {"item": "feijão", "quantidade": 1}]
+
+
+def mercado(id_mercado, url, **produtos):
+    return {
+        "id": id_mercado,
+        "nome": f"Mercado {id_mercado}",
+        "rating": "4.5",
+        "distancia": "1.0 km",
+        "tempo_entrega": "30-40 min",
+        "custo_entrega": "Grátis",
+        "imagem_url": None,
+        "imagem_local": "/imagens_ifood/tarefa/mercado.png",
+        "url": url,
+        "produtos": {
+            item: [{"id": 1, "nome": f"{item} 1kg", "preco": preco, "imagem_local": "/imagens_ifood/x.png"}]
+            for item, preco in produtos.items()
+        }
+    }
+
+
+def test_ida_e_volta_pelo_disco(tmp_path):
+    CacheItens(str(tmp_path)).guardar("joinville", "M", [mercado(1, "https://a", Arroz="R$ 5,99", feijão="R$ 7,49")], ITENS, 5)
+    mercados = CacheItens(str(tmp_path)).montar_mercados("joinville", "M", [{"item": " arroz "}, {"item": "FEIJÃO"}], 5)
+    assert [m["url"] for m in mercados] == ["https://a"]
+    assert mercados[0]["produtos"][" arroz "] == [{"id": 1, "nome": "Arroz 1kg", "preco": "R$ 5,99"}]
+    assert mercados[0]["produtos"]["FEIJÃO"][0]["preco"] == "R$ 7,49"
+    assert "imagem_local" not in mercados[0]
+
+
+def test_mercado_sem_url_fica_de_fora(tmp_path):
+    mercados = [mercado(1, None, Arroz="R$ 4,99", feijão="R$ 6,99"), mercado(2, "https://b", Arroz="R$ 5,99", feijão="R$ 7,49")]
+    CacheItens(str(tmp_path)).guardar("joinville", "M", mercados, ITENS, 5)
+    recarregado = CacheItens(str(tmp_path)).montar_mercados("joinville", "M", ITENS, 5)
+    assert [m["url"] for m in recarregado] == ["https://b"]
+    assert set(recarregado[0]["produtos"]) == {"Arroz", "feijão"}
+
+
+def test_expirado_ou_com_menos_produtos_nao_responde(tmp_path):
+    cache = CacheItens(str(tmp_path), ttl=60)
+    cache.guardar("joinville", "M", [mercado(1, "https://a", Arroz="R$ 5,99", feijão="R$ 7,49")], ITENS, 5)
+    assert cache.montar_mercados("joinville", "M", ITENS, 10) is None
+    assert cache.montar_mercados("curitiba", "M", ITENS, 5) is None
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.montar_mercados("joinville", "M", ITENS, 5) is None
+
+
+def test_le_de_novo_o_que_outro_processo_gravou(tmp_path):
+    leitor = CacheItens(str(tmp_path))
+    escritor = CacheItens(str(tmp_path))
+    escritor.guardar("joinville", "M", [mercado(1, "https://a", Arroz="R$ 5,99")], ITENS[:1], 5)
+    assert leitor.montar_mercados("joinville", "M", ITENS[:1], 5)[0]["produtos"]["Arroz"][0]["preco"] == "R$ 5,99"
+    escritor.guardar("joinville", "M", [mercado(1, "https://a", Arroz="R$ 4,49")], ITENS[:1], 5)
+    caminho = escritor._caminho(escritor.chave("joinville", "M", "Arroz"))
+    os.utime(caminho, (time.time() + 10, time.time() + 10))  # mtime diferente mesmo em disco de baixa resolução
+    assert leitor.montar_mercados("joinville", "M", ITENS[:1], 5)[0]["produtos"]["Arroz"][0]["preco"] == "R$ 4,49"
@@ -0,0 +1,48 @@
+# test_checkpoint.py
+from checkpoint import CheckpointScraping
+
+PARAMETROS = {"type_search": "M", "itens": ["arroz", "feijão"], "max_produtos": 5}
+MERCADOS = [{"id": 1, "nome": "Mercado A", "url": "https://a"}, {"id": 2, "nome": "Mercado B", "url": "https://b"}]
+PRODUTOS = [{"id": 1, "nome": "Arroz 1kg", "preco": "R$ 5,99"}]
+
+
+def test_nova_tentativa_retoma_mercados_e_pesquisas_concluidas(tmp_path):
+    checkpoint = CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path))
+    assert checkpoint.mercados() is None
+    checkpoint.salvar_mercados(MERCADOS)
+    checkpoint.salvar_produtos(1, "arroz", PRODUTOS)
+    checkpoint.salvar_produtos(2, "arroz", [])
+
+    retomado = CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path))
+    assert retomado.mercados() == MERCADOS
+    assert retomado.produtos(1, "arroz") == PRODUTOS
+    assert retomado.produtos(2, "arroz") == []
+    assert retomado.produtos(1, "feijão") is None
+
+
+def test_parametros_diferentes_descartam_o_checkpoint(tmp_path):
+    CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path)).salvar_mercados(MERCADOS)
+    outro = CheckpointScraping("tarefa-1", {**PARAMETROS, "max_produtos": 10}, str(tmp_path))
+    assert outro.mercados() is None
+    assert CheckpointScraping("tarefa-1", {**PARAMETROS, "max_produtos": 10}, str(tmp_path)).mercados() is None
+
+
+def test_linha_incompleta_no_fim_e_ignorada(tmp_path):
+    checkpoint = CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path))
+    checkpoint.salvar_mercados(MERCADOS)
+    checkpoint.salvar_produtos(1, "arroz", PRODUTOS)
+    with open(checkpoint.caminho, "a", encoding="utf-8") as f:
+        f.write('{"tipo": "produtos", "dados": {"mercado_id": 2')  # processo morreu no meio da escrita
+    retomado = CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path))
+    assert retomado.mercados() == MERCADOS
+    assert retomado.produtos(1, "arroz") == PRODUTOS
+    assert retomado.produtos(2, "arroz") is None
+    retomado.salvar_produtos(2, "arroz", PRODUTOS)
+    assert CheckpointScraping("tarefa-1", PARAMETROS, str(tmp_path)).produtos(2, "arroz") == PRODUTOS
+
+
+def test_remover_apaga_e_task_id_nao_escapa_da_pasta(tmp_path):
+    checkpoint = CheckpointScraping("../../fora", PARAMETROS, str(tmp_path))
+    assert checkpoint.caminho == str(tmp_path / "fora.jsonl")
+    checkpoint.remover()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,60 @@
+# test_disjuntor.py
+import pytest
+
+import disjuntor
+from disjuntor import DisjuntorMercados
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(disjuntor.time, "monotonic", lambda: agora[0])
+    return agora
+
+
+def test_abre_apos_falhas_seguidas_e_meio_abre_apos_resfriamento(relogio):
+    d = DisjuntorMercados(falhas_para_abrir=2, tempo_resfriamento=60)
+    d.registrar_falha("m", "timeout")
+    assert d.motivo_abertura("m") is None
+    d.registrar_falha("m", "timeout")
+    assert d.motivo_abertura("m") == "timeout"
+    relogio[0] += 61
+    assert d.motivo_abertura("m") is None  # meio-aberto: uma tentativa
+    d.registrar_falha("m", "de novo")
+    assert d.motivo_abertura("m") == "de novo"
+
+
+def test_sucesso_zera_as_falhas(relogio):
+    d = DisjuntorMercados(falhas_para_abrir=2)
+    d.registrar_falha("m", "timeout")
+    d.registrar_sucesso("m")
+    d.registrar_falha("m", "timeout")
+    assert d.motivo_abertura("m") is None
+    assert d.resumo()["m"]["falhas"] == 1
+
+
+def test_importar_aplica_o_estado_do_filho(relogio):
+    pai = DisjuntorMercados(falhas_para_abrir=2)
+    pai.registrar_falha("a", "timeout")
+    pai.registrar_falha("b", "timeout")
+    enviado = pai.exportar()
+
+    filho = DisjuntorMercados(falhas_para_abrir=2)
+    filho.importar(enviado)
+    filho.registrar_sucesso("a")
+    filho.registrar_falha("b", "timeout")
+    filho.registrar_falha("c", "erro 500")
+
+    pai.importar(filho.exportar(), enviado=enviado)
+    resumo = pai.resumo()
+    assert "a" not in resumo
+    assert resumo["b"]["aberto"] is True
+    assert resumo["c"]["falhas"] == 1
+
+
+def test_importar_preserva_mercados_que_o_filho_nao_conhecia(relogio):
+    pai = DisjuntorMercados()
+    enviado = pai.exportar()
+    pai.registrar_falha("outro", "timeout")  # de outro processo, depois do envio
+    pai.importar({}, enviado=enviado)
+    assert pai.resumo()["outro"]["falhas"] == 1
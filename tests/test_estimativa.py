@@ -0,0 +1,34 @@
+# test_estimativa.py
+from ifood_scraper import EstimativaMelhorCompra
+
+ITENS = [{"item": "arroz", "quantidade": 1}, {"item": "feijao", "quantidade": 1}]
+
+
+def mercado(id_mercado, nome, entrega, produtos):
+    return {"id": id_mercado, "nome": nome, "custo_entrega": entrega, "produtos": produtos}
+
+
+def test_mercado_parcial_nao_passa_a_frente_de_cesta_completa():
+    estimativa = EstimativaMelhorCompra(ITENS, 2)
+    completo = mercado(1, "Completo", "R$ 5,00", {
+        "arroz": [{"nome": "Arroz", "preco": "R$ 20,00"}],
+        "feijao": [{"nome": "Feijão", "preco": "R$ 8,00"}]
+    })
+    # Só o arroz foi raspado até agora: somando só ele o total fica menor que o da cesta completa
+    parcial = mercado(2, "Parcial", "Grátis", {"arroz": [{"nome": "Arroz", "preco": "R$ 10,00"}]})
+    estimativa.atualizar(completo)
+    resultado = estimativa.atualizar(parcial)
+    assert resultado["mercado"] == "Completo"
+    assert resultado["itens_encontrados"] == 2
+    assert resultado["itens_total"] == 2
+    assert resultado["itens_pendentes"] == []
+    assert resultado["mercados_avaliados"] == 2
+
+
+def test_com_a_mesma_cobertura_vence_o_mais_barato():
+    estimativa = EstimativaMelhorCompra(ITENS, 2)
+    estimativa.atualizar(mercado(1, "Caro", "R$ 5,00", {"arroz": [{"nome": "Arroz", "preco": "R$ 20,00"}]}))
+    resultado = estimativa.atualizar(mercado(2, "Barato", "Grátis", {"arroz": [{"nome": "Arroz", "preco": "R$ 10,00"}]}))
+    assert resultado["mercado"] == "Barato"
+    assert resultado["itens_encontrados"] == 1
+    assert resultado["itens_pendentes"] == ["feijao"]
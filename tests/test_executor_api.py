@@ -0,0 +1,43 @@
+# test_executor_api.py
+import threading
+
+from api import ExecutorMonitorado
+
+
+def test_conta_chamadas_esperando_por_thread_livre():
+    executor = ExecutorMonitorado(max_workers=2, thread_name_prefix="teste")
+    liberar = threading.Event()
+    iniciadas = threading.Semaphore(0)
+
+    def bloqueia():
+        iniciadas.release()
+        liberar.wait(5)
+
+    try:
+        futuros = [executor.submit(bloqueia) for _ in range(5)]
+        iniciadas.acquire(timeout=5)
+        iniciadas.acquire(timeout=5)
+        assert executor.esperando() == 3
+        liberar.set()
+        for futuro in futuros:
+            futuro.result(timeout=5)
+        assert executor.esperando() == 0
+        assert executor.terminadas == 5
+    finally:
+        liberar.set()
+        executor.shutdown(wait=True)
+
+
+def test_chamada_cancelada_sai_da_espera():
+    executor = ExecutorMonitorado(max_workers=1)
+    liberar = threading.Event()
+    try:
+        executor.submit(liberar.wait, 5)
+        pendente = executor.submit(lambda: None)
+        assert pendente.cancel()
+        assert executor.esperando() <= 1
+        liberar.set()
+    finally:
+        liberar.set()
+        executor.shutdown(wait=True)
+    assert executor.esperando() == 0
@@ -0,0 +1,97 @@
+# test_fila_redis.py
+import threading
+
+from fila import STATUS_CONCLUIDO, STATUS_EXECUTANDO, STATUS_PENDENTE, FilaRedis
+
+
+class ClienteMemoria:
+    """Só os comandos de lista e de hash que a FilaRedis usa, com a semântica do Redis."""
+
+    def __init__(self):
+        self.listas = {}
+        self.hashes = {}
+        self.lock = threading.Lock()
+
+    def lpush(self, chave, valor):
+        with self.lock:
+            self.listas.setdefault(chave, []).insert(0, valor)
+
+    def rpush(self, chave, valor):
+        with self.lock:
+            self.listas.setdefault(chave, []).append(valor)
+
+    def brpoplpush(self, origem, destino, timeout=0):
+        with self.lock:
+            if not self.listas.get(origem):
+                return None
+            valor = self.listas[origem].pop()
+            self.listas.setdefault(destino, []).insert(0, valor)
+            return valor
+
+    def lrange(self, chave, inicio, fim):
+        with self.lock:
+            lista = list(self.listas.get(chave, []))
+        return lista[inicio:] if fim == -1 else lista[inicio:fim + 1]
+
+    def lrem(self, chave, quantidade, valor):
+        with self.lock:
+            lista = self.listas.get(chave, [])
+            removidos = 0
+            while valor in lista and (quantidade == 0 or removidos < quantidade):
+                lista.remove(valor)
+                removidos += 1
+            return removidos
+
+    def hset(self, chave, mapping):
+        with self.lock:
+            self.hashes.setdefault(chave, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hsetnx(self, chave, campo, valor):
+        with self.lock:
+            self.hashes.setdefault(chave, {}).setdefault(campo, str(valor))
+
+    def hdel(self, chave, campo):
+        with self.lock:
+            self.hashes.get(chave, {}).pop(campo, None)
+
+    def hgetall(self, chave):
+        with self.lock:
+            return dict(self.hashes.get(chave, {}))
+
+
+def test_tarefa_de_worker_que_caiu_volta_para_a_fila():
+    fila = FilaRedis(cliente=ClienteMemoria(), tempo_reserva=60)
+    fila.enfileirar("tarefa-1", {"max_items": 3})
+    assert fila.reservar("worker-que-caiu")["task_id"] == "tarefa-1"
+    assert fila.obter("tarefa-1")["status"] == STATUS_EXECUTANDO
+    # Nada a recuperar enquanto a reserva está dentro do prazo
+    assert fila.reservar("worker-2", timeout=0) is None
+
+    fila.cliente.hset(fila._chave("tarefa-1"), mapping={"reservado_em": 0})
+    tarefa = fila.reservar("worker-2", timeout=0)
+    assert tarefa == {"task_id": "tarefa-1", "parametros": {"max_items": 3}}
+    assert fila._hgetall("tarefa-1")["worker_id"] == "worker-2"
+    assert fila.cliente.lrange(fila.chave_processando, 0, -1) == ["tarefa-1"]
+
+
+def test_progresso_renova_a_reserva_e_conclusao_sai_do_processamento():
+    fila = FilaRedis(cliente=ClienteMemoria(), tempo_reserva=60)
+    fila.enfileirar("tarefa-1", {})
+    fila.reservar("worker-1", timeout=0)
+    fila.cliente.hset(fila._chave("tarefa-1"), mapping={"reservado_em": 0})
+    fila.atualizar_progresso("tarefa-1", 50, "metade")
+    assert fila.recuperar_expiradas() == 0
+
+    fila.concluir("tarefa-1", {"mercados": []})
+    assert fila.cliente.lrange(fila.chave_processando, 0, -1) == []
+    assert fila.obter("tarefa-1")["status"] == STATUS_CONCLUIDO
+
+
+def test_reserva_sem_marca_de_tempo_nao_volta_na_hora():
+    fila = FilaRedis(cliente=ClienteMemoria(), tempo_reserva=60)
+    fila.enfileirar("tarefa-1", {})
+    # Worker caiu logo depois do BRPOPLPUSH, antes de gravar reservado_em
+    fila.cliente.brpoplpush(fila.chave_fila, fila.chave_processando)
+    assert fila.recuperar_expiradas() == 0
+    assert "reservado_em" in fila._hgetall("tarefa-1")
+    assert fila.obter("tarefa-1")["status"] == STATUS_PENDENTE
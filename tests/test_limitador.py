@@ -0,0 +1,69 @@
+# test_limitador.py
+import pytest
+
+import limitador
+from limitador import CONFIG_PADRAO, LimitadorHost, LimitadorTaxa
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(limitador.time, "monotonic", lambda: agora[0])
+    return agora
+
+
+def host(**config):
+    return LimitadorHost("www.ifood.com.br", {**CONFIG_PADRAO, **config})
+
+
+def test_resposta_saudavel_aumenta_a_taxa_ate_o_maximo(relogio):
+    limitador_host = host(taxa_inicial=4.85, aumento_aditivo=0.1, taxa_maxima=5.0)
+    limitador_host.registrar_resposta(True, 200, 0.5)
+    assert limitador_host.taxa == pytest.approx(4.95)
+    limitador_host.registrar_resposta(True, 200, 0.5)
+    assert limitador_host.taxa == 5.0
+
+
+@pytest.mark.parametrize("sucesso,status,duracao", [(False, 429, 0.5), (False, 503, 0.5), (True, 200, 9.0), (False, None, 0.5)])
+def test_sobrecarga_reduz_a_taxa_multiplicativamente(relogio, sucesso, status, duracao):
+    limitador_host = host(taxa_inicial=2.0, fator_reducao=0.5)
+    limitador_host.registrar_resposta(sucesso, status, duracao)
+    assert limitador_host.taxa == 1.0
+
+
+def test_404_nao_freia_o_host(relogio):
+    limitador_host = host(taxa_inicial=2.0)
+    limitador_host.registrar_resposta(False, 404, 0.5)
+    assert limitador_host.taxa > 2.0
+    assert limitador_host.metricas()["erros"] == 1
+
+
+def test_uma_reducao_por_janela_e_piso_na_taxa_minima(relogio):
+    limitador_host = host(taxa_inicial=1.0, taxa_minima=0.2, fator_reducao=0.5)
+    limitador_host.registrar_resposta(False, 429, 0.5)
+    limitador_host.registrar_resposta(False, 429, 0.5)  # mesma janela: ignorada
+    assert limitador_host.taxa == 0.5
+    for _ in range(5):
+        relogio[0] += 10
+        limitador_host.registrar_resposta(False, 429, 0.5)
+    assert limitador_host.taxa == 0.2
+
+
+def test_exportar_e_importar_devolvem_a_taxa_e_somam_os_contadores(relogio):
+    pai = LimitadorTaxa()
+    pai.para_host("www.ifood.com.br").registrar_resposta(False, 500, 0.5)
+    enviado = pai.exportar()
+
+    filho = LimitadorTaxa()
+    filho.importar(enviado)
+    limitador_filho = filho.para_host("www.ifood.com.br")
+    assert limitador_filho.taxa == pai.para_host("www.ifood.com.br").taxa
+    limitador_filho.adquirir()
+    limitador_filho.registrar_resposta(False, 429, 0.5)
+
+    pai.para_host("www.ifood.com.br").adquirir()  # requisição de outra tarefa enquanto o filho rodava
+    pai.importar(filho.exportar(), enviado=enviado)
+    metricas = pai.metricas()["www.ifood.com.br"]
+    assert metricas["taxa_atual"] == pytest.approx(limitador_filho.taxa)
+    assert metricas["requisicoes"] == 2
+    assert metricas["erros"] == 2
@@ -0,0 +1,54 @@
+# test_motor_custos.py
+import copy
+
+import pytest
+
+from benchmark_custos import gerar_dados
+from motor_custos import MatrizPrecos, converter_custo_entrega
+from parser_produtos import converter_preco
+
+INF = float("inf")
+
+
+def referencia(dados, itens_pesquisa, max_alternativas):
+    """Cálculo direto em Python, mercado a mercado, do que MatrizPrecos faz com arrays."""
+    totais = []
+    for mercado in dados:
+        escolhidos, alternativas = [], []
+        for item_data in itens_pesquisa:
+            item, quantidade = item_data["item"], item_data["quantidade"]
+            validos = [p for p in mercado["produtos"].get(item, []) if p.get("preco") and converter_preco(p["preco"]) != INF]
+            validos.sort(key=lambda p: converter_preco(p["preco"]))
+            if validos:
+                escolhidos.append((item, converter_preco(validos[0]["preco"]) * quantidade, validos[0]))
+                alternativas += [(item, converter_preco(p["preco"]) * quantidade, p) for p in validos[1:max_alternativas + 1]]
+        custo = sum(c for _, c, _ in escolhidos) + converter_custo_entrega(mercado["custo_entrega"]) if escolhidos else INF
+        totais.append((custo, escolhidos, alternativas))
+    return totais
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_matriz_igual_ao_calculo_direto(semente):
+    dados, itens_pesquisa = gerar_dados(8, 4, 5, semente)
+    esperado = referencia(dados, itens_pesquisa, 2)
+    dados = copy.deepcopy(dados)
+    matriz = MatrizPrecos(dados, itens_pesquisa)
+    totais = matriz.resumir_mercados(2)
+    for mercado, total, (custo, escolhidos, alternativas) in zip(dados, totais, esperado):
+        assert total == pytest.approx(custo)
+        assert [(p["item"], p["produto"]) for p in mercado["produtos_escolhidos"]] == [(i, p) for i, _, p in escolhidos]
+        assert [p["custo"] for p in mercado["produtos_escolhidos"]] == pytest.approx([c for _, c, _ in escolhidos])
+        assert sorted(p["custo"] for p in mercado["combinacoes"]) == pytest.approx(sorted(c for _, c, _ in alternativas))
+    assert matriz.ranking().tolist() == sorted(range(len(dados)), key=lambda m: esperado[m][0])
+
+
+def test_empate_mantem_a_ordem_da_pagina_e_mercado_vazio_fica_por_ultimo():
+    dados = [
+        {"nome": "Vazio", "custo_entrega": "Grátis", "produtos": {"arroz": [{"preco": "Não disponível"}]}},
+        {"nome": "A", "custo_entrega": "R$ 5,00", "produtos": {"arroz": [{"nome": "1º", "preco": "R$ 5,00"}, {"nome": "2º", "preco": "R$ 5,00"}]}},
+    ]
+    matriz = MatrizPrecos(dados, [{"item": "arroz", "quantidade": 2}])
+    assert matriz.custos_totais().tolist() == [INF, 15.0]
+    assert matriz.ranking().tolist() == [1, 0]
+    assert matriz.produto_mais_barato(1, 0)["nome"] == "1º"
+    assert matriz.produto_mais_barato(0, 0) is None
@@ -0,0 +1,98 @@
+# test_otimizador_multi.py
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from motor_custos import MatrizPrecos
+from otimizador_multi import (
+    _cobertura_conjunto, _custo_conjunto, calcular_melhor_compra_multi, otimizar_cobertura_parcial, otimizar_exato, otimizar_guloso
+)
+
+
+def forca_bruta(custos, entrega, max_lojas):
+    """Menor custo entre todos os subconjuntos de até max_lojas lojas que cobrem todos os itens."""
+    melhor = None
+    for tamanho in range(1, max_lojas + 1):
+        for lojas in itertools.combinations(range(custos.shape[0]), tamanho):
+            if not np.isfinite(custos[list(lojas)].min(axis=0)).all():
+                continue
+            custo = _custo_conjunto(custos, entrega, list(lojas))
+            if melhor is None or custo < melhor:
+                melhor = custo
+    return melhor
+
+
+def instancia(semente):
+    gerador = random.Random(semente)
+    num_lojas, num_itens = gerador.randint(1, 7), gerador.randint(1, 5)
+    custos = np.array([
+        [np.inf if gerador.random() < 0.3 else round(gerador.uniform(1, 50), 2) for _ in range(num_itens)]
+        for _ in range(num_lojas)
+    ])
+    entrega = np.array([gerador.choice([0.0, 4.99, 9.9, 15.0]) for _ in range(num_lojas)])
+    return custos, entrega, gerador.randint(1, 3)
+
+
+@pytest.mark.parametrize("semente", range(200))
+def test_exato_igual_a_forca_bruta(semente):
+    custos, entrega, max_lojas = instancia(semente)
+    esperado = forca_bruta(custos, entrega, max_lojas)
+    guloso = otimizar_guloso(custos, entrega, max_lojas)
+    if guloso is not None and not np.isfinite(custos[guloso].min(axis=0)).all():
+        guloso = None
+    for incumbente in (None, guloso):
+        lojas, otimo = otimizar_exato(custos, entrega, max_lojas, incumbente, tempo_limite=10)
+        assert otimo
+        if esperado is None:
+            assert lojas is None
+        else:
+            assert len(lojas) <= max_lojas
+            assert _custo_conjunto(custos, entrega, lojas) == pytest.approx(esperado)
+    if guloso is not None:
+        assert _custo_conjunto(custos, entrega, guloso) >= esperado - 1e-9
+
+
+def test_divide_a_compra_quando_a_taxa_compensa():
+    dados = [
+        {"nome": "A", "custo_entrega": "Grátis", "produtos": {"arroz": [{"preco": "R$ 10,00"}], "feijão": [{"preco": "R$ 30,00"}]}},
+        {"nome": "B", "custo_entrega": "R$ 2,00", "produtos": {"arroz": [{"preco": "R$ 30,00"}], "feijão": [{"preco": "R$ 8,00"}]}},
+        {"nome": "C", "custo_entrega": "Não disponível", "produtos": {"arroz": [{"preco": "R$ 1,00"}]}},
+    ]
+    itens = [{"item": "arroz", "quantidade": 1}, {"item": "feijão", "quantidade": 2}]
+    resultado = calcular_melhor_compra_multi(MatrizPrecos(dados, itens), max_lojas=2)
+    assert resultado["custo_total"] == "R$ 28.00"
+    assert resultado["otimo"] is True
+    assert [mercado["mercado"] for mercado in resultado["mercados"]] == ["A", "B"]
+    assert resultado["itens_faltantes"] == []
+
+
+@pytest.mark.parametrize("semente", range(200))
+def test_cobertura_parcial_igual_a_forca_bruta(semente):
+    custos, entrega, max_lojas = instancia(semente)
+    esperado = min(
+        (-cobertos, custo)
+        for tamanho in range(1, max_lojas + 1)
+        for lojas in itertools.combinations(range(custos.shape[0]), tamanho)
+        for cobertos, custo in [_cobertura_conjunto(custos, entrega, list(lojas))]
+    )
+    lojas, otimo = otimizar_cobertura_parcial(custos, entrega, max_lojas, otimizar_guloso(custos, entrega, max_lojas), tempo_limite=10)
+    assert otimo
+    assert len(lojas) <= max_lojas
+    cobertos, custo = _cobertura_conjunto(custos, entrega, lojas)
+    assert cobertos == -esperado[0]
+    assert custo == pytest.approx(esperado[1])
+
+
+def test_sem_cobertura_completa_devolve_a_melhor_parcial():
+    dados = [
+        {"nome": "A", "custo_entrega": "R$ 5,00", "produtos": {"arroz": [{"preco": "R$ 10,00"}], "feijão": [{"preco": "R$ 8,00"}]}},
+        {"nome": "B", "custo_entrega": "Grátis", "produtos": {"óleo": [{"preco": "R$ 7,00"}]}},
+    ]
+    itens = [{"item": "arroz", "quantidade": 1}, {"item": "feijão", "quantidade": 1}, {"item": "óleo", "quantidade": 1}]
+    resultado = calcular_melhor_compra_multi(MatrizPrecos(dados, itens), max_lojas=1)
+    assert resultado["metodo"] == "cobertura_parcial"
+    assert [mercado["mercado"] for mercado in resultado["mercados"]] == ["A"]
+    assert resultado["custo_total"] == "R$ 23.00"
+    assert resultado["itens_faltantes"] == ["óleo"]
@@ -0,0 +1,66 @@
+# test_parser_produtos.py
+import math
+
+import pytest
+
+from parser_produtos import analisar_produto, compilar_filtro, converter_preco
+
+
+@pytest.mark.parametrize("texto,esperado", [
+    ("R$ 12,90", 12.90),
+    ("R$ 1.299,90", 1299.90),
+    ("R$5,49", 5.49),
+    ("$12.90", 12.90),
+    ("R$ 1.000", 1000.0),
+    ("R$ 9,90 R$ 12,90", 9.90),  # promoção: o primeiro é o preço atual
+])
+def test_converter_preco(texto, esperado):
+    assert converter_preco(texto) == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize("texto", ["", "Não disponível", "Grátis"])
+def test_preco_invalido_vira_infinito(texto):
+    assert math.isinf(converter_preco(texto))
+
+
+@pytest.mark.parametrize("nome,quantidade,unidade,embalagens", [
+    ("Coca-Cola Lata 350ml", 350, "ml", 1),
+    ("Refrigerante 1,5 L", 1500, "ml", 1),
+    ("Cerveja 6x350ml", 350, "ml", 6),
+    ("Cerveja Lata 350ml com 12 unidades", 350, "ml", 12),
+    ("Água Mineral 500ml Pack 6", 500, "ml", 6),
+    ("Arroz Branco 5 kg", 5000, "g", 1),
+    ("Ovos 12 unidades", 12, "un", 1),
+])
+def test_medida_da_embalagem(nome, quantidade, unidade, embalagens):
+    info = analisar_produto(nome)
+    assert (info.quantidade, info.unidade, info.embalagens) == (pytest.approx(quantidade), unidade, embalagens)
+
+
+def test_medida_dos_detalhes_e_preco_por_unidade():
+    info = analisar_produto("Leite Integral", "Caixa 1 litro", "R$ 4,50")
+    assert info.quantidade_total == 1000
+    assert info.preco_por_unidade == pytest.approx(4.50)
+    assert analisar_produto("Cerveja 6x350ml", "", "R$ 21,00").como_dict() == {
+        "quantidade": 350.0, "unidade": "ml", "embalagens": 6, "preco_por_unidade": 10.0, "unidade_referencia": "L"
+    }
+    assert analisar_produto("Pão francês").como_dict() is None
+
+
+def test_filtro_por_medida_normalizada():
+    filtro = compilar_filtro("leite 1l")
+    assert filtro.termo_principal == "leite"
+    assert filtro.aceita(analisar_produto("Leite Integral 1000ml"))
+    assert not filtro.aceita(analisar_produto("Leite Integral 500ml"))
+    assert not filtro.aceita(analisar_produto("Leite Integral"))
+
+
+def test_filtro_so_com_numero_e_embalagens():
+    filtro = compilar_filtro("coca 350")
+    assert filtro.aceita(analisar_produto("Coca-Cola Lata 350"))
+    assert filtro.aceita(analisar_produto("Coca-Cola 350ml"))
+    assert not filtro.aceita(analisar_produto("Coca-Cola 2L"))
+    pack = compilar_filtro("cerveja 6x350ml")
+    assert pack.aceita(analisar_produto("Cerveja 6x350ml"))
+    assert not pack.aceita(analisar_produto("Cerveja 12x350ml"))
+    assert compilar_filtro("arroz").aceita(analisar_produto("Arroz 5kg"))
@@ -0,0 +1,88 @@
+# test_pool_sessoes.py
+import pytest
+
+import ifood_scraper
+from ifood_scraper import PoolSessoes
+from localizacao import Localizacao
+from rastreamento import instrumentar_driver, rastrear_tarefa
+
+
+class DriverFalso:
+    """Só o necessário para PoolSessoes.devolver fechar abas extras."""
+
+    def __init__(self, nome: str) -> None:
+        self.nome = nome
+        self.current_window_handle = "principal"
+        self.window_handles = ["principal"]
+        self.switch_to = self
+
+    def window(self, aba: str) -> None:
+        pass
+
+    def execute(self, comando: str, params: dict = None) -> None:
+        pass
+
+    def __repr__(self) -> str:
+        return self.nome
+
+
+@pytest.fixture
+def encerrados(monkeypatch):
+    lista = []
+    monkeypatch.setattr(ifood_scraper, "encerrar_driver", lista.append)
+    return lista
+
+
+def config(**sessoes):
+    return {"sessoes": {"reutilizar": True, "ttl_ocioso": 600, "max_ociosos": 2, **sessoes}}
+
+
+def test_devolver_acima_de_max_ociosos_encerra_os_mais_antigos(encerrados):
+    pool = PoolSessoes()
+    joinville = Localizacao("joinville", -26.3045, -48.8487)
+    curitiba = Localizacao("curitiba", -25.4284, -49.2733)
+    drivers = [DriverFalso(f"d{i}") for i in range(4)]
+    pool._em_uso = len(drivers)
+    for driver, localizacao in zip(drivers, [joinville, curitiba, joinville, curitiba]):
+        pool.devolver(driver, localizacao, config())
+    assert encerrados == drivers[:2]
+    ociosos = [driver for lista in pool._ociosos.values() for driver, _ in lista]
+    assert sorted(ociosos, key=repr) == drivers[2:]
+    assert pool._em_uso == 0
+
+
+def test_devolver_sem_reutilizar_ou_com_falha_encerra(encerrados):
+    pool = PoolSessoes()
+    local = Localizacao("joinville", -26.3045, -48.8487)
+    pool._em_uso = 2
+    pool.devolver(DriverFalso("a"), local, config(reutilizar=False))
+    pool.devolver(DriverFalso("b"), local, config(), saudavel=False)
+    assert [repr(d) for d in encerrados] == ["a", "b"]
+    assert not pool._ociosos
+
+
+def test_obter_reaproveita_driver_ocioso_da_mesma_localizacao(encerrados, monkeypatch):
+    reabertos = []
+    monkeypatch.setattr(ifood_scraper, "reabrir_lista", lambda driver, type_search, cfg: reabertos.append(driver))
+    monkeypatch.setattr(ifood_scraper, "iniciar_sessao", lambda *args: pytest.fail("não deveria refazer o bootstrap"))
+    pool = PoolSessoes()
+    local = Localizacao("joinville", -26.3045, -48.8487)
+    driver = DriverFalso("d")
+    pool._em_uso = 1
+    pool.devolver(driver, local, config())
+    assert pool.obter("M", config(), local) is driver
+    assert reabertos == [driver]
+    assert pool._em_uso == 1
+
+
+def test_driver_reaproveitado_registra_no_rastreador_da_tarefa_atual(encerrados, monkeypatch):
+    monkeypatch.setattr(ifood_scraper, "reabrir_lista", lambda driver, type_search, cfg: None)
+    pool = PoolSessoes()
+    local = Localizacao("joinville", -26.3045, -48.8487)
+    with rastrear_tarefa("tarefa-1") as primeiro:
+        driver = instrumentar_driver(DriverFalso("d"))
+    assert driver._rastreador is primeiro
+    pool._em_uso = 1
+    pool.devolver(driver, local, config())
+    with rastrear_tarefa("tarefa-2") as segundo:
+        assert pool.obter("M", config(), local)._rastreador is segundo
@@ -0,0 +1,25 @@
+# test_relevancia_cards.py
+import ifood_scraper
+from ifood_scraper import candidatos_por_relevancia
+
+NOMES = ["Sabão em pó Omo 1kg", "Arroz Branco Tio João 5kg", "Biscoito de arroz", "Arroz Integral Camil 1kg"]
+
+
+def test_carrega_so_max_produtos_cards_e_descarta_os_irrelevantes(monkeypatch):
+    carregados = []
+
+    def rolar_pagina(driver, max_items, classe):
+        carregados.append(max_items)
+        return [f"card-{i}" for i in range(min(max_items, len(NOMES)))]
+
+    monkeypatch.setattr(ifood_scraper, "rolar_pagina", rolar_pagina)
+    monkeypatch.setattr(ifood_scraper, "ler_nomes_cards", lambda driver, items, classe: [NOMES[int(c[-1])] for c in items])
+    config = {"selectors": {"products": {"card": "card", "name": "nome"}}, "relevancia": {"habilitado": True, "limiar": 0.5}}
+    candidatos = candidatos_por_relevancia(None, "arroz", 4, config)
+    assert carregados == [4]
+    assert "card-0" not in [card for card, _, _ in candidatos]
+    assert all(relevancia >= 0.5 for _, _, relevancia in candidatos)
+
+    config["relevancia"]["habilitado"] = False
+    assert [card for card, _, _ in candidatos_por_relevancia(None, "arroz", 2, config)] == ["card-0", "card-1"]
+    assert carregados == [4, 2]
@@ -0,0 +1,64 @@
+# test_saidas_tarefa.py
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import api
+import progresso
+from ifood_scraper import limpar_diretorio_imagens, remover_saidas_antigas, url_imagem_local
+
+
+@pytest.fixture
+def pastas(monkeypatch, tmp_path):
+    monkeypatch.setattr(api, "fila", None)
+    monkeypatch.setattr(api, "TAREFAS_DIR", str(tmp_path / "dados_ifood" / "tarefas"))
+    monkeypatch.setattr(api, "IMAGENS_DIR", str(tmp_path / "imagens_ifood"))
+    yield tmp_path
+    for task_id in ("tarefa-a", "tarefa-b"):
+        progresso.limpar_task(task_id)
+
+
+def scraper_falso(type_search, max_items, max_produtos, itens_pesquisa, output_file, imagens_pasta, config, task_id, *args):
+    """Como scrape_ifood_mercados: limpa a pasta de imagens, grava uma imagem e o resultado."""
+    limpar_diretorio_imagens(imagens_pasta)
+    caminho = os.path.join(imagens_pasta, "mercado.png")
+    with open(caminho, "wb") as f:
+        f.write(b"png")
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({"task_id": task_id, "imagem": url_imagem_local(caminho)}, f)
+
+
+def test_tarefas_simultaneas_tem_saida_e_imagens_proprias(pastas, monkeypatch):
+    monkeypatch.setattr(api, "executar_scraping_supervisionado", scraper_falso)
+
+    async def cenario():
+        return await asyncio.gather(*(
+            api.executar_scraping("M", 5, [{"item": "arroz", "quantidade": 1}], task_id) for task_id in ("tarefa-a", "tarefa-b")
+        ))
+
+    resultado_a, resultado_b = asyncio.run(cenario())
+    assert resultado_a == {"task_id": "tarefa-a", "imagem": "/imagens_ifood/tarefa-a/mercado.png"}
+    assert resultado_b == {"task_id": "tarefa-b", "imagem": "/imagens_ifood/tarefa-b/mercado.png"}
+    assert os.path.exists(pastas / "imagens_ifood" / "tarefa-a" / "mercado.png")
+    assert sorted(os.listdir(pastas / "dados_ifood" / "tarefas")) == ["tarefa-a.json", "tarefa-b.json"]
+
+
+def test_task_id_nao_escapa_das_pastas(pastas):
+    arquivo, imagens = api.saidas_da_tarefa("../../etc/passwd")
+    assert os.path.dirname(arquivo) == api.TAREFAS_DIR
+    assert os.path.dirname(imagens) == api.IMAGENS_DIR
+
+
+def test_remover_saidas_antigas_mantem_as_recentes(tmp_path):
+    antiga = tmp_path / "antiga"
+    antiga.mkdir()
+    (antiga / "imagem.png").write_bytes(b"png")
+    recente = tmp_path / "recente.json"
+    recente.write_text("{}")
+    duas_horas_atras = time.time() - 2 * 3600
+    os.utime(antiga, (duas_horas_atras, duas_horas_atras))
+    remover_saidas_antigas(str(tmp_path), 1)
+    assert os.listdir(tmp_path) == ["recente.json"]
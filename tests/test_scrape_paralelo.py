@@ -0,0 +1,91 @@
+# test_scrape_paralelo.py
+import json
+import os
+
+import pytest
+
+import ifood_scraper
+from ifood_scraper import carregar_config, scrape_lote_localizacoes, scrape_multiplas_verticais
+from localizacao import Localizacao
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PoolFalso:
+    """Entrega um driver fictício sem abrir o Chrome e registra as devoluções."""
+
+    def __init__(self) -> None:
+        self.devolvidos = []
+        self.preparados = []
+
+    def obter(self, type_search, config, localizacao):
+        return object()
+
+    def devolver(self, driver, localizacao, config, saudavel=True):
+        self.devolvidos.append((localizacao.nome, saudavel))
+
+    def preparar(self, type_search, config, localizacao):
+        self.preparados.append((type_search, localizacao.nome))
+
+
+@pytest.fixture
+def scraper_sem_navegador(monkeypatch):
+    """scrape_ifood_mercados real, com as etapas que usam o navegador trocadas por dados fixos."""
+    monkeypatch.delenv("IFOOD_SIMULACAO", raising=False)
+    pool = PoolFalso()
+    monkeypatch.setattr(ifood_scraper, "pool_sessoes", pool)
+    monkeypatch.setattr(ifood_scraper, "rolar_pagina", lambda driver, max_items, classe: ["card"])
+    monkeypatch.setattr(ifood_scraper, "reciclar_driver_se_necessario", lambda driver, type_search, config: driver)
+
+    def coletar_mercados(items, imagens_pasta, config, task_id):
+        return [{
+            "id": 1,
+            "nome": "Mercado Teste",
+            "rating": "4.5",
+            "distancia": "1.0 km",
+            "tempo_entrega": "30-40 min",
+            "custo_entrega": "Grátis",
+            "imagem_url": None,
+            "url": "https://www.ifood.com.br/delivery/teste/mercado-teste"
+        }]
+
+    def scrape_produtos(driver, nome, url, item, max_produtos, imagens_pasta, config):
+        return [{"id": 1, "nome": f"{item} 1kg", "preco": "R$ 5,99", "detalhes": "", "imagem_url": None}]
+
+    monkeypatch.setattr(ifood_scraper, "coletar_mercados", coletar_mercados)
+    monkeypatch.setattr(ifood_scraper, "scrape_produtos_com_disjuntor", scrape_produtos)
+    config = carregar_config(os.path.join(RAIZ, "config.yaml"))
+    config["simulacao"] = {"habilitado": False}
+    config["cache_itens"] = {"habilitado": False}
+    config["rastreamento"] = {"habilitado": False}
+    config["catalogo"] = {"habilitado": False}
+    config["navegacao"] = {}
+    return pool, config
+
+
+def test_lote_de_localizacoes_no_scraper_real(scraper_sem_navegador, tmp_path):
+    pool, config = scraper_sem_navegador
+    saida = tmp_path / "lote.json"
+    localizacoes = [Localizacao("joinville", -26.3045, -48.8487), Localizacao("curitiba", -25.4284, -49.2733)]
+    scrape_lote_localizacoes("M", 5, 5, [{"item": "arroz", "quantidade": 2}], str(saida), str(tmp_path / "imagens"), config, None, localizacoes)
+    resultado = json.loads(saida.read_text(encoding="utf-8"))["localizacoes"]
+    assert set(resultado) == {"joinville", "curitiba"}
+    for nome, dados in resultado.items():
+        assert "erro" not in dados
+        assert dados["localizacao"]["nome"] == nome
+        assert dados["melhor_compra"]["custo_total"] == "R$ 11.98"
+    assert sorted(pool.devolvidos) == [("curitiba", True), ("joinville", True)]
+
+
+def test_multiplas_verticais_no_scraper_real(scraper_sem_navegador, tmp_path):
+    pool, config = scraper_sem_navegador
+    saida = tmp_path / "verticais.json"
+    local = Localizacao("joinville", -26.3045, -48.8487)
+    scrape_multiplas_verticais("M,D", 5, 5, [{"item": "cerveja", "quantidade": 1}], str(saida), str(tmp_path / "imagens"), config, None, local)
+    resultado = json.loads(saida.read_text(encoding="utf-8"))
+    assert pool.preparados == [("M", "joinville")]
+    assert set(resultado["verticais"]) == {"M", "D"}
+    assert all(secao["erro"] is None and secao["mercados"] == 1 for secao in resultado["verticais"].values())
+    assert sorted(mercado["vertical"] for mercado in resultado["mercados"]) == ["D", "M"]
+    assert [posicao["posicao"] for posicao in resultado["ranking"]] == [1, 2]
+    assert resultado["melhor_compra"]["vertical"] == resultado["ranking"][0]["vertical"]
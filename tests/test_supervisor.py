@@ -0,0 +1,86 @@
+# test_supervisor.py
+import time
+
+import pytest
+
+import progresso
+from limitador import limitador
+from metricas import drivers_ativos
+from supervisor import ErroProcessoIsolado, LimiteRecursosExcedido, executar_isolado
+
+
+def tarefa_com_progresso(task_id: str) -> str:
+    progresso.atualizar_progresso(task_id, 40, "metade")
+    progresso.publicar_evento(task_id, "mercado", {"nome": "Mercado Teste"})
+    return "ok"
+
+
+def tarefa_que_sobrecarrega_o_host() -> float:
+    limitador_host = limitador.para_host("teste.invalid")
+    limitador_host.registrar_resposta(False, 429, 0.5)
+    return limitador_host.taxa
+
+
+def tarefa_que_nao_para_de_publicar(task_id: str) -> None:
+    while True:
+        progresso.atualizar_progresso(task_id, 50, "trabalhando")
+        time.sleep(0.01)
+
+
+def tarefa_com_driver_aberto(task_id: str) -> str:
+    drivers_ativos.inc()
+    progresso.atualizar_progresso(task_id, 10, "driver aberto")
+    drivers_ativos.dec()
+    return "ok"
+
+
+def tarefa_com_erro() -> None:
+    raise ValueError("falhou no filho")
+
+
+@pytest.fixture
+def ouvinte():
+    recebidos = []
+    progresso.registrar_ouvinte(lambda *args: recebidos.append(args))
+    yield recebidos
+    progresso.ouvintes_progresso.clear()
+
+
+def test_progresso_do_filho_chega_aos_ouvintes_do_pai(ouvinte):
+    assert executar_isolado(tarefa_com_progresso, "tarefa-isolada", prazo_segundos=60) == "ok"
+    assert ouvinte == [("tarefa-isolada", 40, "metade")]
+    assert progresso.obter_progresso("tarefa-isolada")["percentual"] == 40
+    assert [evento["tipo"] for evento in progresso.obter_eventos("tarefa-isolada")] == ["mercado"]
+    progresso.limpar_task("tarefa-isolada")
+
+
+def test_erro_do_filho_vira_erro_processo_isolado():
+    with pytest.raises(ErroProcessoIsolado, match="falhou no filho"):
+        executar_isolado(tarefa_com_erro, prazo_segundos=60)
+
+
+def test_taxa_reduzida_no_filho_volta_ao_limitador_do_pai():
+    taxa_filho = executar_isolado(tarefa_que_sobrecarrega_o_host, prazo_segundos=60)
+    assert limitador.metricas()["teste.invalid"]["taxa_atual"] == pytest.approx(taxa_filho, abs=1e-3)
+    assert limitador.metricas()["teste.invalid"]["erros"] == 1
+
+
+def test_prazo_vale_mesmo_com_mensagens_constantes_do_filho():
+    inicio = time.monotonic()
+    with pytest.raises(LimiteRecursosExcedido, match="prazo"):
+        executar_isolado(tarefa_que_nao_para_de_publicar, "tarefa-ocupada", prazo_segundos=2, intervalo_verificacao=0.2)
+    assert time.monotonic() - inicio < 10
+    progresso.limpar_task("tarefa-ocupada")
+
+
+def test_drivers_do_filho_aparecem_no_pai_enquanto_ele_roda():
+    vistos = []
+    # Os ouvintes rodam no pai, na ordem em que as mensagens do filho chegam
+    progresso.registrar_ouvinte(lambda *args: vistos.append(drivers_ativos.exportar().get((), 0.0)))
+    try:
+        assert executar_isolado(tarefa_com_driver_aberto, "tarefa-driver", prazo_segundos=60) == "ok"
+    finally:
+        progresso.ouvintes_progresso.clear()
+        progresso.limpar_task("tarefa-driver")
+    assert vistos == [1.0]
+    assert drivers_ativos.exportar().get((), 0.0) == 0.0